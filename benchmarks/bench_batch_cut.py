@@ -0,0 +1,62 @@
+"""
+Benchmark cutting many clips from one source: one CutOperation per clip
+versus a single MultiCutOperation pass.
+
+Usage:
+    python benchmarks/bench_batch_cut.py [--seconds 120] [--clips 20] [--clip-seconds 4] [--width 1280] [--height 720]
+
+Clips start at random points (fixed seed), so some overlap. Reports wall
+time for each approach and how many source frames each has to decode
+(excluding the lead-in from the keyframe before each seek).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from video_editing_api.video_processor import CutOperation, MultiCutOperation
+from bench_cut import create_video
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=120, help="Length of the synthetic source video")
+    parser.add_argument("--clips", type=int, default=20)
+    parser.add_argument("--clip-seconds", type=float, default=4.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cuts = []
+    for _ in range(args.clips):
+        start = round(rng.uniform(0, args.seconds - args.clip_seconds - 0.1), 2)
+        cuts.append({"start_time": start, "end_time": start + args.clip_seconds})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_source.mp4")
+        print(f"Creating {args.seconds}s {args.width}x{args.height} source video...")
+        create_video(path, args.seconds, args.width, args.height)
+
+        start = time.perf_counter()
+        for cut in cuts:
+            os.remove(CutOperation(path, cut["start_time"], cut["end_time"], mode="reencode").process())
+        separate = time.perf_counter() - start
+
+        start = time.perf_counter()
+        operation = MultiCutOperation(path, cuts)
+        for output_path in operation.process():
+            os.remove(output_path)
+        batch = time.perf_counter() - start
+
+        clip_frames = sum(end - start for start, end in operation.clips)
+        span_frames = sum(end - start for start, end in operation.spans())
+        print(f"{'approach':<16}{'seconds':>10}{'source frames':>16}")
+        print(f"{'separate cuts':<16}{separate:>10.2f}{clip_frames:>16}")
+        print(f"{'batch':<16}{batch:>10.2f}{span_frames:>16}")
+        print(f"Speed-up: {separate / batch:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark CutOperation modes (copy, smart, reencode, parallel) on a synthetic video.
+
+Usage:
+    python benchmarks/bench_cut.py [--seconds 300] [--width 1280] [--height 720] [--runs 3]
+
+Reports wall time and process CPU time (all threads) per mode, plus the
+speed-up of each mode relative to the re-encode frame loop. The parallel
+mode uses SEGMENT_WORKERS processes (default: one per core); its CPU time
+only counts the parent process, so compare it on wall time.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from video_editing_api.video_processor import CutOperation
+
+
+def create_video(path: str, seconds: int, width: int, height: int, fps: int = 30) -> None:
+    """Write a synthetic mp4v video with moving content so GOPs are non-trivial."""
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(seconds * fps):
+        frame = np.full((height, width, 3), (i % 256, 64, 255 - i % 256), dtype=np.uint8)
+        cv2.putText(frame, f'Frame {i}', (width // 4, height // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        out.write(frame)
+    out.release()
+
+
+def run(path: str, start_time: float, end_time: float, mode: str, runs: int):
+    """Return the best (wall, cpu) seconds over several runs of a cut."""
+    best_wall, best_cpu = float("inf"), float("inf")
+    for _ in range(runs):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        output_path = CutOperation(path, start_time, end_time, mode=mode).process()
+        best_wall = min(best_wall, time.perf_counter() - wall_start)
+        best_cpu = min(best_cpu, time.process_time() - cpu_start)
+        os.remove(output_path)
+    return best_wall, best_cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=300, help="Length of the synthetic source video")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per mode; the best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_source.mp4")
+        print(f"Creating {args.seconds}s {args.width}x{args.height} source video...")
+        create_video(path, args.seconds, args.width, args.height)
+
+        # Trim a few seconds off each end with cut points that are not keyframe-aligned
+        start_time, end_time = 1.37, args.seconds - 2.11
+        results = {mode: run(path, start_time, end_time, mode, args.runs)
+                   for mode in ("reencode", "smart", "copy", "parallel")}
+
+    base_wall, base_cpu = results["reencode"]
+    print(f"\nCut {start_time}s -> {end_time}s (best of {args.runs})")
+    print(f"{'mode':<10}{'wall (s)':>10}{'cpu (s)':>10}{'wall x':>10}{'cpu x':>10}")
+    for mode, (wall, cpu) in results.items():
+        print(f"{mode:<10}{wall:>10.2f}{cpu:>10.2f}{base_wall / wall:>10.1f}{base_cpu / cpu:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark frame throughput of the threaded FramePipeline against the
+serial read/write loop, on the synthetic video from create_test_video.py.
+
+Usage:
+    python benchmarks/bench_frame_pipeline.py [--runs 3]
+
+Each scenario decodes the full video and re-encodes it, either unchanged
+("copy") or through a per-frame resize to 1280x960 ("resize").
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+
+from video_editing_api.frame_pipeline import FramePipeline
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def resize(frame):
+    return cv2.resize(frame, (1280, 960), interpolation=cv2.INTER_LINEAR)
+
+
+def open_video(source, output, transform):
+    cap = cv2.VideoCapture(source)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    size = (1280, 960) if transform else (width, height)
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), cap.get(cv2.CAP_PROP_FPS), size)
+    return cap, writer, (height, width, 3), int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+
+def serial(source, output, transform):
+    """The original single-threaded loop."""
+    cap, writer, _, total = open_video(source, output, transform)
+    frames = 0
+    while frames < total:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        writer.write(transform(frame) if transform else frame)
+        frames += 1
+    writer.release()
+    cap.release()
+    return frames
+
+
+def threaded(source, output, transform, workers):
+    cap, writer, shape, total = open_video(source, output, transform)
+    frames = FramePipeline(cap, writer, 0, total, shape, transform=transform, workers=workers).run()
+    writer.release()
+    cap.release()
+    return frames
+
+
+def best_fps(run, runs):
+    best = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        frames = run()
+        best = max(best, frames / (time.perf_counter() - start))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per scenario; the best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run([sys.executable, os.path.join(REPO_ROOT, "create_test_video.py")], cwd=tmp, check=True)
+        source = os.path.join(tmp, "test_video.mp4")
+        output = os.path.join(tmp, "out.mp4")
+
+        scenarios = []
+        for name, transform in (("copy", None), ("resize", resize)):
+            scenarios.append((name, "serial loop", lambda t=transform: serial(source, output, t)))
+            for workers in ((0,) if transform is None else (0, 2, 4)):
+                scenarios.append((name, f"threaded, {workers} workers",
+                                  lambda t=transform, w=workers: threaded(source, output, t, w)))
+
+        print(f"{'scenario':<10}{'pipeline':<24}{'fps':>10}")
+        for name, label, run in scenarios:
+            print(f"{name:<10}{label:<24}{best_fps(run, args.runs):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark HLS packaging of a multi-bitrate ladder on a synthetic video.
+
+Usage:
+    python benchmarks/bench_hls.py [--seconds 60] [--width 1280] [--height 720]
+        [--renditions 720 480 360] [--segment-seconds 6]
+
+Compares packaging every rendition in its own pass (one decode per
+rendition) against HlsOperation with the whole ladder, which decodes the
+source once and scales each decoded frame to every rendition.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from video_editing_api.video_processor import HlsOperation
+from bench_cut import create_video
+
+
+def package(path: str, renditions, segment_seconds: float) -> float:
+    """Package the source with the given renditions; returns the wall time."""
+    start = time.perf_counter()
+    output_dir = HlsOperation(path, renditions=renditions, segment_seconds=segment_seconds).process()
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(output_dir)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=60, help="Length of the synthetic source video")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--renditions", type=int, nargs="+", default=[720, 480, 360], help="Rendition heights")
+    parser.add_argument("--segment-seconds", type=float, default=6.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_source.mp4")
+        print(f"Creating {args.seconds}s {args.width}x{args.height} source video...")
+        create_video(path, args.seconds, args.width, args.height)
+
+        separate = sum(package(path, [height], args.segment_seconds) for height in args.renditions)
+        print(f"{'one pass per rendition':<24}{separate:>8.2f} s")
+
+        single = package(path, args.renditions, args.segment_seconds)
+        print(f"{'one pass for the ladder':<24}{single:>8.2f} s  ({separate / single:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
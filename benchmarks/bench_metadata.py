@@ -0,0 +1,116 @@
+"""
+Benchmark GET /api/v1/videos/{video_id}/info throughput for three lookups:
+
+    two queries   the original Video query followed by a ProcessedVideo query
+    one query     find_asset's single UNION ALL query (metadata cache disabled)
+    cached        find_asset behind the in-process metadata cache
+
+Usage:
+    python benchmarks/bench_metadata.py [--videos 1000] [--requests 5000] [--hot 50]
+
+The database is a fresh SQLite file in a temporary directory. Requests go
+through FastAPI's TestClient and cycle over --hot processed-video IDs, the
+case where the two-query lookup always pays for a miss on the first table.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def two_query_lookup(db, video_id):
+    """The lookup get_video_info used before find_asset."""
+    from sqlalchemy import select
+    from video_editing_api.database import Video, ProcessedVideo
+    db_video = await db.scalar(select(Video).where(Video.video_id == video_id))
+    db_processed = await db.scalar(select(ProcessedVideo).where(ProcessedVideo.processed_video_id == video_id))
+    video_data = db_processed if db_processed else db_video
+    if video_data is None:
+        return None
+    return {
+        "video_id": video_id,
+        "s3_key": video_data.s3_key,
+        "filename": video_data.filename,
+        "content_type": video_data.content_type,
+        "duration": video_data.duration,
+        "width": video_data.width,
+        "height": video_data.height,
+        "fps": video_data.fps,
+        "total_frames": video_data.total_frames,
+        "created_at": video_data.created_at,
+        "updated_at": video_data.updated_at,
+        "operation_type": getattr(video_data, "operation_type", None),
+        "operation_params": getattr(video_data, "operation_params", None)
+    }
+
+
+def populate(count):
+    """Insert count original videos, each with one processed video; return the processed IDs."""
+    from video_editing_api.database import SessionLocal, engine, create_schema, Video, ProcessedVideo
+    with engine.begin() as conn:
+        create_schema(conn)
+    db = SessionLocal()
+    processed_ids = []
+    for _ in range(count):
+        video_id, processed_id = str(uuid.uuid4()), str(uuid.uuid4())
+        common = dict(content_type="video/mp4", duration=10.0, width=1280, height=720, fps=30.0, total_frames=300)
+        db.add(Video(video_id=video_id, filename=f"{video_id}.mp4", s3_key=f"videos/{video_id}.mp4", **common))
+        db.add(ProcessedVideo(processed_video_id=processed_id, original_video_id=video_id,
+                              filename=f"{processed_id}.mp4", s3_key=f"processed/{processed_id}.mp4",
+                              operation_type="cut", operation_params={"start_time": 1.0, "end_time": 5.0},
+                              **common))
+        processed_ids.append(processed_id)
+    db.commit()
+    db.close()
+    return processed_ids
+
+
+def requests_per_second(client, ids, requests):
+    start = time.perf_counter()
+    for i in range(requests):
+        response = client.get(f"/api/v1/videos/{ids[i % len(ids)]}/info")
+        assert response.status_code == 200
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=1000, help="Videos (and processed videos) in the database")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per scenario")
+    parser.add_argument("--hot", type=int, default=50, help="Distinct IDs requested")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The database lives under ./data, so import from inside the temp dir
+        os.chdir(tmp)
+        sys.path.insert(0, REPO_ROOT)
+        import logging
+        from fastapi.testclient import TestClient
+        from video_editing_api import main as api
+        from video_editing_api.database import find_asset
+        logging.disable(logging.INFO)
+
+        hot_ids = populate(args.videos)[:args.hot]
+
+        scenarios = (
+            ("two queries", two_query_lookup, 0),
+            ("one query", find_asset, 0),
+            ("cached", find_asset, api.metadata_cache.ttl or 60)
+        )
+        print(f"{'lookup':<14}{'req/s':>10}")
+        # One client (and event loop thread) for every request
+        with TestClient(api.app) as client:
+            for name, lookup, ttl in scenarios:
+                api.find_asset = lookup
+                api.metadata_cache.ttl = ttl
+                api.metadata_cache.clear()
+                requests_per_second(client, hot_ids, min(args.requests, 200))  # Warm up
+                print(f"{name:<14}{requests_per_second(client, hot_ids, args.requests):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark video metadata probing on a synthetic video.
+
+Usage:
+    python benchmarks/bench_probe.py [--seconds 300] [--width 1280] [--height 720] [--runs 20]
+
+Compares the OpenCV capture that get_video_info used to open, a full packet
+scan (FrameIndex.build), probe_video reading only the MP4 headers, the demux
+fallback used for other containers, and a memoized probe_video call.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+from video_editing_api.frame_index import FrameIndex
+from video_editing_api import probe
+from bench_cut import create_video
+
+
+def opencv_info(path: str) -> dict:
+    """The metadata read get_video_info did before probe_video."""
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return {"fps": fps, "total_frames": total_frames, "duration": total_frames / fps}
+    finally:
+        cap.release()
+
+
+def best_ms(fn, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=300, help="Length of the synthetic source video")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--runs", type=int, default=20, help="Runs per method; the best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_source.mp4")
+        print(f"Creating {args.seconds}s {args.width}x{args.height} source video...")
+        create_video(path, args.seconds, args.width, args.height)
+
+        def cold_probe():
+            probe._probe_cache.clear()
+            probe.probe_video(path)
+
+        methods = (
+            ("opencv capture", lambda: opencv_info(path)),
+            ("packet scan", lambda: FrameIndex.build(path)),
+            ("mp4 headers", cold_probe),
+            ("demux fallback", lambda: probe._probe_demux(path)),
+            ("memoized", lambda: probe.probe_video(path))
+        )
+        print(f"{'method':<16}{'ms':>10}")
+        for name, fn in methods:
+            print(f"{name:<16}{best_ms(fn, args.runs):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
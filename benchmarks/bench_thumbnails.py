@@ -0,0 +1,67 @@
+"""
+Benchmark thumbnail sprite rendering on a synthetic video.
+
+Usage:
+    python benchmarks/bench_thumbnails.py [--seconds 600] [--width 1280] [--height 720]
+        [--interval 10] [--tile-width 160]
+
+Compares decoding every frame with OpenCV and resizing one per interval
+against render_sprite, which seeks to and decodes only the keyframes it
+shows and scales them in the decoder.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+from video_editing_api.frame_index import FrameIndex
+from video_editing_api.thumbnails import render_sprite
+from bench_cut import create_video
+
+
+def decode_all(path: str, interval: float, tile_width: int) -> int:
+    """Read every frame with OpenCV, keeping one resized frame per interval."""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    step = max(1, int(round(interval * fps)))
+    tiles, i = [], 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if i % step == 0:
+            height = int(round(tile_width * frame.shape[0] / frame.shape[1]))
+            tiles.append(cv2.resize(frame, (tile_width, height), interpolation=cv2.INTER_AREA))
+        i += 1
+    cap.release()
+    return len(tiles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=600, help="Length of the synthetic source video")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between thumbnails")
+    parser.add_argument("--tile-width", type=int, default=160)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_source.mp4")
+        print(f"Creating {args.seconds}s {args.width}x{args.height} source video...")
+        create_video(path, args.seconds, args.width, args.height)
+        index = FrameIndex.build(path)
+
+        start = time.perf_counter()
+        count = decode_all(path, args.interval, args.tile_width)
+        print(f"{'decode every frame':<22}{time.perf_counter() - start:>8.2f} s  ({count} tiles)")
+
+        start = time.perf_counter()
+        jpeg, cues = render_sprite(path, index, args.interval, args.tile_width)
+        print(f"{'keyframe sprite':<22}{time.perf_counter() - start:>8.2f} s  ({len(cues)} tiles, {len(jpeg) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,10 +12,13 @@ setup(
         "python-jose==3.3.0",
         "python-dotenv==1.0.0",
         "opencv-python==4.8.1.78",
+        "av==12.0.0",
         "numpy==1.26.2",
         "boto3==1.34.34",
-        "sqlalchemy==2.0.27",
+        "sqlalchemy[asyncio]==2.0.27",
+        "aiosqlite==0.19.0",
         "python-magic==0.4.27",
+        "prometheus-client==0.19.0",
     ],
     extras_require={
         "dev": [
@@ -23,6 +26,7 @@ setup(
             "pytest-asyncio==0.21.1",
             "httpx==0.25.1",
             "pytest-cov==4.1.0",
+            "moto[s3]==5.0.2",
         ],
     },
     python_requires=">=3.8",
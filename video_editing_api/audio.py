@@ -0,0 +1,173 @@
+import av
+from fractions import Fraction
+from typing import Callable, Iterator, Optional
+from video_editing_api.config import AUDIO_SETTINGS
+
+# Audio codecs an MP4 output can carry without re-encoding
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "alac"}
+
+# How far before the start a trim seeks, so the packet before it (decoder
+# preroll) is demuxed too
+SEEK_MARGIN = 1.0
+
+class AudioTrack:
+    """
+    The [start, end) range of a source's first audio stream, muxed into an
+    output container next to the video, in the same pass that writes it.
+
+    Only audio packets are demuxed; no video frame is decoded. Packets are
+    stream-copied when the codec fits MP4 and the range allows it: the
+    start is always trimmed to the sample by the MP4 edit list (the packet
+    before it goes in as decoder preroll, with a negative timestamp), but
+    the end can only be cut between packets. So exact cuts copy when the
+    end falls on a packet boundary or the end of the source, and approximate
+    ones (copy mode) always do. Otherwise the range is decoded, trimmed to
+    the sample and encoded with AUDIO_SETTINGS.
+    """
+
+    def __init__(self, source_path: str, start: float, end: Optional[float], exact: bool = True,
+                 on_packet: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            source_path: Source file
+            start, end: Range in seconds on the source timeline (the video's
+                timestamps); end None runs to the end of the source
+            exact: Whether the end must be sample-accurate
+            on_packet: Called after each packet is muxed
+        """
+        self.source = av.open(source_path)
+        self.in_stream = self.source.streams.audio[0]
+        self.sample_rate = self.in_stream.codec_context.sample_rate
+        time_base = self.in_stream.time_base
+        self.start_pts = int(round(start / time_base))
+        self.end_pts = None if end is None else int(round(end / time_base))
+        self.on_packet = on_packet
+        self.packets = 0
+
+        self.copy = (
+            AUDIO_SETTINGS["copy"]
+            and self.in_stream.codec_context.name in MP4_AUDIO_CODECS
+            and (not exact or self.end_pts is None or self._is_packet_boundary(self.end_pts))
+        )
+        self.output = None
+        self.out_stream = None
+        self._packets: Iterator[av.Packet] = iter(())
+        self._pending: Optional[av.Packet] = None
+
+    @classmethod
+    def open(cls, source_path: str, start: float, end: Optional[float], exact: bool = True,
+             on_packet: Optional[Callable[[], None]] = None) -> Optional["AudioTrack"]:
+        """An AudioTrack for the range, or None when the source has no audio."""
+        with av.open(source_path) as container:
+            if not container.streams.audio:
+                return None
+        return cls(source_path, start, end, exact, on_packet)
+
+    def attach(self, output) -> None:
+        """Add the audio stream to an output container; call before its first packet is muxed."""
+        self.output = output
+        if self.copy:
+            self.out_stream = output.add_stream(template=self.in_stream)
+            self._packets = self._copied()
+        else:
+            self.out_stream = output.add_stream(AUDIO_SETTINGS["codec"], rate=self.sample_rate)
+            self.out_stream.layout = self.in_stream.codec_context.layout.name
+            self.out_stream.bit_rate = AUDIO_SETTINGS["bit_rate"]
+            self._packets = self._encoded()
+
+    def mux_until(self, time: Optional[float]) -> None:
+        """Mux the packets that start before time (seconds into the output); None muxes the rest."""
+        while True:
+            if self._pending is None:
+                self._pending = next(self._packets, None)
+                if self._pending is None:
+                    return
+            if time is not None and self._pending.pts * self._pending.time_base >= time:
+                return
+            self.output.mux(self._pending)
+            self._pending = None
+            self.packets += 1
+            if self.on_packet:
+                self.on_packet()
+
+    def close(self) -> None:
+        self.source.close()
+
+    def _seek_to_start(self) -> None:
+        # Sources with a short start are read from the top, keeping the
+        # encoder priming packets their own edit list skips
+        margin = int(SEEK_MARGIN / self.in_stream.time_base)
+        if self.start_pts > margin:
+            self.source.seek(self.start_pts - margin, stream=self.in_stream, backward=True)
+
+    def _is_packet_boundary(self, pts: int) -> bool:
+        """Whether a packet starts at pts (within half a sample)."""
+        tolerance = 0.5 / self.sample_rate / self.in_stream.time_base
+        # A second demuxer, so the track's own still starts from the top
+        with av.open(self.source.name) as container:
+            stream = container.streams.audio[0]
+            container.seek(pts, stream=stream, backward=True)
+            for packet in container.demux(stream):
+                if packet.dts is None or packet.pts > pts + tolerance:
+                    return False
+                if abs(packet.pts - pts) <= tolerance:
+                    return True
+        return False
+
+    def _copied(self) -> Iterator[av.Packet]:
+        """Source packets overlapping the range, plus the one before it, shifted to start at 0."""
+        self._seek_to_start()
+        preroll = None
+        for packet in self.source.demux(self.in_stream):
+            # The demuxer yields an empty flush packet at EOF
+            if packet.dts is None:
+                continue
+            if packet.pts + (packet.duration or 0) <= self.start_pts:
+                preroll = packet
+                continue
+            if self.end_pts is not None and packet.pts >= self.end_pts:
+                break
+            for out in (preroll, packet):
+                if out is not None:
+                    out.pts -= self.start_pts
+                    out.dts -= self.start_pts
+                    out.stream = self.out_stream
+                    yield out
+            preroll = None
+
+    def _encoded(self) -> Iterator[av.Packet]:
+        """Decode the range, cut it to the sample and encode it."""
+        time_base = self.in_stream.time_base
+        start = int(round(self.start_pts * time_base * self.sample_rate))
+        end = None if self.end_pts is None else int(round(self.end_pts * time_base * self.sample_rate))
+        layout = self.in_stream.codec_context.layout.name
+        resampler = av.AudioResampler(format="fltp", layout=layout, rate=self.sample_rate)
+        written = 0
+
+        self._seek_to_start()
+        for frame in self.source.decode(self.in_stream):
+            if frame.pts is None:
+                continue
+            first = int(round(frame.pts * time_base * self.sample_rate))
+            if end is not None and first >= end:
+                break
+            for converted in resampler.resample(frame):
+                samples = converted.to_ndarray()
+                lo = max(start - first, 0)
+                hi = samples.shape[1] if end is None else min(samples.shape[1], end - first)
+                first += samples.shape[1]
+                if hi <= lo:
+                    continue
+                trimmed = av.AudioFrame.from_ndarray(samples[:, lo:hi].copy(), format="fltp", layout=layout)
+                trimmed.sample_rate = self.sample_rate
+                trimmed.pts = written
+                trimmed.time_base = Fraction(1, self.sample_rate)
+                written += hi - lo
+                yield from self.out_stream.encode(trimmed)
+
+        yield from self.out_stream.encode(None)
+
+def audio_duration(path: str) -> float:
+    """Duration in seconds of an audio-only file, from its container headers."""
+    with av.open(path) as container:
+        return float(container.duration / av.time_base) if container.duration else 0.0
@@ -0,0 +1,234 @@
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+from video_editing_api.config import SOURCE_CACHE_DIR, SOURCE_CACHE_MAX_BYTES
+
+class SourceCache:
+    """
+    On-disk, content-addressed cache of S3 source videos with LRU eviction.
+
+    Entries are keyed by (s3_key, ETag), so a replaced object never serves
+    stale bytes. Coordination uses file locks, which makes the cache safe to
+    share between the API process and the job worker processes:
+
+    - <entry>.lock: held shared by every reader while it uses the file, and
+      taken exclusively (non-blocking) by eviction, so pinned entries are
+      never deleted from under a running operation.
+    - <entry>.download: serialises downloads, so concurrent misses for the
+      same object fetch it from S3 once.
+
+    Both are deleted with their entry on eviction, and after a failed
+    download, so they do not pile up. A process that locked a lock file just
+    as it was deleted notices and locks the new one instead.
+
+    Recency is tracked through the entry's mtime.
+    """
+
+    COUNTERS = ("hits", "misses", "evictions")
+
+    def __init__(self, s3_service, cache_dir: str = SOURCE_CACHE_DIR,
+                 max_bytes: int = SOURCE_CACHE_MAX_BYTES):
+        self.s3_service = s3_service
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @contextmanager
+    def open(self, s3_key: str, etag: Optional[str] = None,
+             download: bool = True) -> Iterator[Optional[str]]:
+        """
+        Yield a local path to the S3 object, downloading it on a miss.
+
+        The entry is pinned against eviction until the context exits.
+
+        Args:
+            s3_key: The S3 key (path) of the source video
+            etag: The object's ETag, if already known (saves a HEAD request)
+            download: When False, a miss yields None instead of downloading
+        """
+        if etag is None:
+            etag = self.s3_service.get_etag(s3_key)
+            if etag is None:
+                raise RuntimeError(f"Failed to read S3 metadata for {s3_key}")
+
+        path = self._entry_path(s3_key, etag)
+        if not download and not os.path.exists(path):
+            # Don't leave a lock file behind for every lookup that misses
+            yield None
+            return
+
+        pin = _lock_file(f"{path}.lock", fcntl.LOCK_SH)
+        try:
+            if os.path.exists(path):
+                self._bump("hits")
+            elif not download:
+                # Evicted since the check above
+                yield None
+                return
+            else:
+                # Release the pin while downloading so eviction of other
+                # entries is never blocked behind a slow transfer.
+                while not os.path.exists(path):
+                    pin.close()
+                    self._download(s3_key, path)
+                    pin = _lock_file(f"{path}.lock", fcntl.LOCK_SH)
+
+            os.utime(path)
+            yield path
+        finally:
+            pin.close()
+
+    def put(self, s3_key: str, etag: str, file_path: str) -> str:
+        """
+        Move an existing local copy of an S3 object into the cache.
+
+        Used after uploads so the first operation on a new video is a hit.
+
+        Returns:
+            str: The cached path
+        """
+        path = self._entry_path(s3_key, etag)
+        with _lock_file(f"{path}.download", fcntl.LOCK_EX):
+            if os.path.exists(path):
+                os.remove(file_path)
+            else:
+                shutil.move(file_path, path)
+        self._evict(keep=path)
+        return path
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters plus current size and entry count."""
+        with open(self._stats_path() + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            stats = self._read_stats()
+
+        entries = self._entries()
+        stats["entries"] = len(entries)
+        stats["bytes"] = sum(size for _, size, _ in entries)
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    def _download(self, s3_key: str, path: str) -> None:
+        """Fetch an object into the cache unless another process already did."""
+        with _lock_file(f"{path}.download", fcntl.LOCK_EX):
+            if os.path.exists(path):
+                self._bump("hits")
+                return
+
+            partial_path = f"{path}.part"
+            try:
+                if not self.s3_service.download_to_path(s3_key, partial_path):
+                    raise RuntimeError(f"Failed to download {s3_key} from S3")
+            except BaseException:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                self._remove_lock_files(path, held=f"{path}.download")
+                raise
+            os.replace(partial_path, path)
+            self._bump("misses")
+
+        self._evict(keep=path)
+
+    def _evict(self, keep: str) -> None:
+        """Delete least recently used, unpinned entries until under budget."""
+        with open(os.path.join(self.cache_dir, ".evict.lock"), "a") as evict_lock:
+            fcntl.flock(evict_lock, fcntl.LOCK_EX)
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+
+            for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    pin = _lock_file(f"{path}.lock", fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # In use by a running operation
+                with pin:
+                    os.remove(path)
+                    self._remove_lock_files(path, held=f"{path}.lock")
+                total -= size
+                self._bump("evictions")
+
+    def _remove_lock_files(self, path: str, held: str) -> None:
+        """
+        Delete the lock files of an entry that is gone: held, which the caller
+        has locked exclusively, and the other one unless someone holds it.
+        """
+        os.remove(held)
+        for lock_path in (f"{path}.lock", f"{path}.download"):
+            if lock_path == held:
+                continue
+            try:
+                with _lock_file(lock_path, fcntl.LOCK_EX | fcntl.LOCK_NB, create=False):
+                    os.remove(lock_path)
+            except (BlockingIOError, FileNotFoundError):
+                continue
+
+    def _entries(self):
+        """List (path, size, mtime) for every complete cache entry."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(".") or name.endswith((".lock", ".download", ".part")):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _entry_path(self, s3_key: str, etag: str) -> str:
+        """Content address of an object version, keeping its extension for demuxers."""
+        digest = hashlib.sha256(f"{s3_key}\0{etag}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest + os.path.splitext(s3_key)[1].lower())
+
+    def _stats_path(self) -> str:
+        return os.path.join(self.cache_dir, ".stats.json")
+
+    def _read_stats(self) -> dict:
+        try:
+            with open(self._stats_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {counter: 0 for counter in self.COUNTERS}
+
+    def _bump(self, counter: str) -> None:
+        """Increment a counter shared by every process using this cache directory."""
+        with open(self._stats_path() + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            stats = self._read_stats()
+            stats[counter] = stats.get(counter, 0) + 1
+            with open(self._stats_path(), "w") as f:
+                json.dump(stats, f)
+
+def _lock_file(lock_path: str, operation: int, create: bool = True) -> IO:
+    """
+    Open lock_path and flock it. Lock files are deleted along with their
+    entry, so if the file turns out to have been deleted while this waited
+    for it, the lock is taken on the file now at lock_path instead.
+
+    Raises:
+        BlockingIOError: If operation includes LOCK_NB and the lock is held
+        FileNotFoundError: If create is False and lock_path does not exist
+    """
+    while True:
+        lock_file = open(lock_path, "a" if create else "r")
+        try:
+            fcntl.flock(lock_file, operation)
+            if os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_path)):
+                return lock_file
+        except FileNotFoundError:
+            if not create:
+                lock_file.close()
+                raise
+        except BaseException:
+            lock_file.close()
+            raise
+        lock_file.close()
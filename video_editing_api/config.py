@@ -3,6 +3,19 @@ import os
 # Maximum file size (100MB)
 MAX_FILE_SIZE = 100 * 1024 * 1024
 
+# Bytes read from an upload and written to disk at a time
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+# Resumable uploads (init, PUT parts, complete) map each part onto an S3
+# multipart part: the preferred part size (raised for very large files to stay
+# within S3's 10,000 part limit), the largest source accepted, and how long
+# the presigned URLs of direct-to-S3 uploads stay valid (seconds)
+RESUMABLE_UPLOAD_SETTINGS = {
+    "part_size": int(os.getenv("RESUMABLE_PART_SIZE", 16 * 1024 * 1024)),
+    "max_file_size": int(os.getenv("RESUMABLE_MAX_FILE_SIZE", 50 * 1024 * 1024 * 1024)),
+    "url_expiration": int(os.getenv("DIRECT_UPLOAD_URL_EXPIRATION", "3600"))
+}
+
 # Allowed video formats
 ALLOWED_VIDEO_FORMATS = [
     "video/mp4",
@@ -11,12 +24,170 @@ ALLOWED_VIDEO_FORMATS = [
     "video/x-matroska"
 ]
 
-# Video processing settings
+# Video processing settings. codec picks the encoder backend for re-encoded
+# output ("h264", "hevc" or "mp4v"; see encoders.ENCODERS), quality maps to
+# its rate control through QUALITY_PRESETS, and preset is the x264/x265 speed
+# preset. All three can also be chosen per request.
 VIDEO_SETTINGS = {
     "output_format": "mp4",
-    "codec": "mp4v",
-    "quality": "high"
+    "codec": os.getenv("VIDEO_CODEC", "h264"),
+    "quality": os.getenv("VIDEO_QUALITY", "high"),
+    "preset": os.getenv("VIDEO_PRESET", "veryfast"),
+    # Default cut strategy: "reencode" (frame loop), "smart" (re-encode
+    # only the partial GOPs at the edges), "copy" (keyframe-aligned remux)
+    # or "parallel" (keyframe-aligned segments encoded across processes)
+    "cut_mode": "reencode"
+}
+
+# Rate control for each quality level: the constant rate factor of the H.264
+# and HEVC encoders (lower is better) and the fixed MPEG-4 quantiser (1-31)
+QUALITY_PRESETS = {
+    "low": {"crf": 28, "qscale": 10},
+    "medium": {"crf": 23, "qscale": 5},
+    "high": {"crf": 19, "qscale": 3}
+}
+
+# x264/x265 speed presets, fastest first; slower presets give smaller files
+ENCODER_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+
+# Audio in cut output: the source track is stream-copied when its codec fits
+# MP4 and the cut allows it (see audio.AudioTrack), and re-encoded with this
+# codec and bit rate otherwise
+AUDIO_SETTINGS = {
+    "copy": os.getenv("AUDIO_COPY", "true").lower() in ("1", "true", "yes"),
+    "codec": os.getenv("AUDIO_CODEC", "aac"),
+    "bit_rate": int(os.getenv("AUDIO_BIT_RATE", "128000"))
+}
+
+# Threaded decode/transform/encode loop: transform worker threads and the
+# capacity of each frame queue (which also sizes the reusable buffer ring)
+FRAME_PIPELINE_SETTINGS = {
+    "workers": int(os.getenv("FRAME_PIPELINE_WORKERS", "2")),
+    "queue_size": int(os.getenv("FRAME_PIPELINE_QUEUE_SIZE", "8"))
 }
 
+# Parallel cut encoding: worker processes and minimum frames per segment
+# (segments always start on a source keyframe)
+SEGMENT_SETTINGS = {
+    "workers": int(os.getenv("SEGMENT_WORKERS", os.cpu_count() or 1)),
+    "segment_frames": int(os.getenv("SEGMENT_FRAMES", "300"))
+}
+
+# Streamed trim responses: fragmented MP4 fragment length in seconds, and how
+# many written chunks may be buffered ahead of a slow client
+STREAMING_SETTINGS = {
+    "fragment_seconds": float(os.getenv("STREAM_FRAGMENT_SECONDS", "0.5")),
+    "buffered_chunks": int(os.getenv("STREAM_BUFFERED_CHUNKS", "32"))
+}
+
+# Supported cut strategies
+CUT_MODES = ["copy", "smart", "reencode", "parallel"]
+
+# Cut modes that re-encode the whole range, and so the only ones that take
+# encoder settings (copy and smart cuts keep the source's codec)
+ENCODER_CUT_MODES = ["reencode", "parallel"]
+
+# S3 bucket holding original and processed videos
+S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "my-app-unique-bucket-1742462086")
+
+# Multipart transfer tuning for S3 uploads and downloads. Objects above the
+# threshold are moved in ranged parts of multipart_chunksize bytes, up to
+# max_concurrency at a time, and streamed to/from disk in io_chunksize reads.
+S3_TRANSFER_SETTINGS = {
+    "multipart_threshold": int(os.getenv("S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024)),
+    "multipart_chunksize": int(os.getenv("S3_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024)),
+    "max_concurrency": int(os.getenv("S3_MAX_CONCURRENCY", "4")),
+    "io_chunksize": 256 * 1024,
+    "max_io_queue": 16
+}
+
+# Presigned download URLs are reused until they are this many seconds from expiry
+PRESIGNED_URL_REFRESH_MARGIN = int(os.getenv("PRESIGNED_URL_REFRESH_MARGIN", "300"))
+
+# Cache-Control sent when videos are served directly (video IDs never change content)
+VIDEO_CACHE_CONTROL = os.getenv("VIDEO_CACHE_CONTROL", "private, max-age=86400")
+
+# Local cache of source videos downloaded from S3
+SOURCE_CACHE_DIR = os.getenv("SOURCE_CACHE_DIR", "/tmp/video_cache")
+SOURCE_CACHE_MAX_BYTES = int(os.getenv("SOURCE_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# In-process cache of video metadata served by the lookup endpoints: seconds an
+# entry stays fresh (0 disables the cache) and the maximum number of entries
+METADATA_CACHE_SETTINGS = {
+    "ttl": float(os.getenv("METADATA_CACHE_TTL", "60")),
+    "max_entries": int(os.getenv("METADATA_CACHE_MAX_ENTRIES", "1024"))
+}
+
+# Container probe results memoized in-process, keyed by file fingerprint
+PROBE_CACHE_ENTRIES = int(os.getenv("PROBE_CACHE_ENTRIES", "256"))
+
+# SQLAlchemy URL of the metadata database. The API uses it through an async
+# driver (sqlite+aiosqlite, postgresql+asyncpg); job workers use the same
+# database through the dialect's default sync driver.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///data/video_editing.db")
+
+# Connection pool sizing for each engine, and how long a SQLite connection
+# waits on a locked database (busy_timeout) before failing
+DATABASE_SETTINGS = {
+    "pool_size": int(os.getenv("DATABASE_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", "20")),
+    "pool_recycle": int(os.getenv("DATABASE_POOL_RECYCLE", "1800")),
+    "sqlite_busy_timeout_ms": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+}
+
+# Proxy renditions generated for every upload and used for previews and
+# thumbnails: output height (sources are never scaled up), seconds between
+# keyframes, and the encoder settings (see VIDEO_SETTINGS)
+PROXY_SETTINGS = {
+    "enabled": os.getenv("PROXY_ENABLED", "true").lower() in ("1", "true", "yes"),
+    "height": int(os.getenv("PROXY_HEIGHT", "360")),
+    "keyframe_interval": float(os.getenv("PROXY_KEYFRAME_INTERVAL", "1")),
+    "codec": os.getenv("PROXY_CODEC", "h264"),
+    "quality": os.getenv("PROXY_QUALITY", "low"),
+    "preset": os.getenv("PROXY_PRESET", "veryfast")
+}
+
+# HLS packaging: segment duration (seconds), default rendition heights
+# (comma-separated; empty packages one rendition at the source size), each
+# rendition's bit rate cap in bits per pixel per frame, and the x264 quality
+# and speed preset the renditions are encoded with
+HLS_SETTINGS = {
+    "segment_seconds": float(os.getenv("HLS_SEGMENT_SECONDS", "6")),
+    "renditions": [int(h) for h in os.getenv("HLS_RENDITIONS", "").split(",") if h.strip()],
+    "bits_per_pixel": float(os.getenv("HLS_BITS_PER_PIXEL", "0.1")),
+    "quality": os.getenv("HLS_QUALITY", "medium"),
+    "preset": os.getenv("HLS_PRESET", "veryfast")
+}
+
+# Thumbnail sprite sheets: default seconds between thumbnails, tile width
+# (height keeps the aspect ratio), tiles per sprite row, JPEG quality and the
+# most tiles in one sheet
+THUMBNAIL_SETTINGS = {
+    "interval": float(os.getenv("THUMBNAIL_INTERVAL", "10")),
+    "width": int(os.getenv("THUMBNAIL_WIDTH", "160")),
+    "columns": int(os.getenv("THUMBNAIL_COLUMNS", "10")),
+    "jpeg_quality": int(os.getenv("THUMBNAIL_JPEG_QUALITY", "75")),
+    "max_tiles": int(os.getenv("THUMBNAIL_MAX_TILES", "1000"))
+}
+
+# Most clips accepted by one batch cut request
+MAX_BATCH_CUTS = int(os.getenv("MAX_BATCH_CUTS", "100"))
+
+# Number of worker processes used to run queued video jobs
+MAX_JOB_WORKERS = int(os.getenv("MAX_JOB_WORKERS", "2"))
+
+# Logging: level name, and format ("json": one JSON object per line with the
+# record's extra fields, "text": plain lines)
+LOG_SETTINGS = {
+    "level": os.getenv("LOG_LEVEL", "INFO").upper(),
+    "format": os.getenv("LOG_FORMAT", "json")
+}
+
+# Prometheus metrics served at /metrics. Job workers are separate processes,
+# so every process writes its samples to files in this directory and /metrics
+# merges them. video_editing_api.serve sets it up (exporting
+# PROMETHEUS_MULTIPROC_DIR and emptying it) before any process starts.
+METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/video_editing_metrics")
+
 # Create data directory for SQLite database
 os.makedirs("data", exist_ok=True) 
\ No newline at end of file
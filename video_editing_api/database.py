@@ -1,21 +1,66 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import create_engine, event, inspect, text, select, union_all, literal, null, Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from datetime import datetime
-import os
+from video_editing_api.config import DATABASE_URL, DATABASE_SETTINGS
 
-# Create database directory if it doesn't exist
-os.makedirs("data", exist_ok=True)
+def sync_url(url: str):
+    """The same database through the dialect's default (blocking) driver."""
+    url = make_url(url)
+    return url.set(drivername=url.get_backend_name())
 
-# Create SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///data/video_editing.db"
+def _engine_options(url, poolclass) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory databases live in a single connection; there is no pool to size
+        return {}
+    # Explicit pool class: some drivers (aiosqlite) default to opening a
+    # connection per checkout
+    return {
+        "poolclass": poolclass,
+        "pool_size": DATABASE_SETTINGS["pool_size"],
+        "max_overflow": DATABASE_SETTINGS["max_overflow"],
+        "pool_recycle": DATABASE_SETTINGS["pool_recycle"],
+        "pool_pre_ping": True
+    }
 
-# Create SQLAlchemy engine
+def _configure_sqlite(engine) -> None:
+    """
+    Put every new SQLite connection in WAL mode with a busy timeout, so API
+    reads are not blocked by job workers writing progress, and concurrent
+    writers wait for the lock instead of failing with "database is locked".
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={DATABASE_SETTINGS['sqlite_busy_timeout_ms']}")
+        # Safe with WAL: a power loss can only lose the last commits, never corrupt
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+# Async engine used by the API's request handlers
+async_engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL, AsyncAdaptedQueuePool))
+_configure_sqlite(async_engine.sync_engine)
+
+# Sync engine used by job worker processes and maintenance scripts
+SQLALCHEMY_DATABASE_URL = sync_url(DATABASE_URL)
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.get_backend_name() == "sqlite" else {},
+    **_engine_options(SQLALCHEMY_DATABASE_URL, QueuePool)
 )
+_configure_sqlite(engine)
 
-# Create SessionLocal class
+# Session factories; async sessions keep loaded attributes after commit so
+# handlers can read them without another round trip
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create Base class
@@ -34,6 +79,9 @@ class Video(Base):
     height = Column(Integer)
     fps = Column(Float)
     total_frames = Column(Integer)
+    frame_index = Column(JSON, nullable=True)  # FrameIndex.to_dict(): per-frame pts, keyframes, offsets
+    proxy_s3_key = Column(String, nullable=True)  # Low-resolution preview rendition, once generated
+    hls_s3_prefix = Column(String, nullable=True)  # HLS package (master.m3u8 and renditions), once packaged
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -51,24 +99,133 @@ class ProcessedVideo(Base):
     content_type = Column(String)
     operation_type = Column(String)
     operation_params = Column(JSON)
+    fingerprint = Column(String, index=True)
     duration = Column(Float)
     width = Column(Integer)
     height = Column(Integer)
     fps = Column(Float)
     total_frames = Column(Integer)
+    hls_s3_prefix = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     original_video = relationship("Video", back_populates="processed_videos")
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, unique=True, index=True)
+    video_id = Column(String, ForeignKey("videos.video_id"))
+    operation_type = Column(String)
+    operation_params = Column(JSON)
+    fingerprint = Column(String, index=True)
+    status = Column(String, default="queued", index=True)  # queued, running, done, failed
+    frames_written = Column(Integer, default=0)
+    total_frames = Column(Integer)
+    processed_video_id = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    notes = Column(JSON, nullable=True)  # How the output departs from the request, e.g. a smart cut re-encoded in full
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Upload(Base):
+    __tablename__ = "uploads"
+
+    id = Column(Integer, primary_key=True, index=True)
+    upload_id = Column(String, unique=True, index=True)
+    video_id = Column(String, unique=True)  # ID the video gets once the upload completes
+    filename = Column(String)
+    s3_key = Column(String)
+    s3_upload_id = Column(String)
+    content_type = Column(String)
+    size = Column(BigInteger)
+    part_size = Column(Integer)
+    status = Column(String, default="pending", index=True)  # pending, completing, complete, aborted
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Fields shared by original and processed videos, as returned by find_asset
+ASSET_FIELDS = (
+    "filename", "s3_key", "content_type", "duration", "width", "height",
+    "fps", "total_frames", "hls_s3_prefix", "created_at", "updated_at"
+)
+
+async def find_asset(db: AsyncSession, asset_id: str):
+    """
+    Look up an original or processed video by ID in a single query.
+    
+    Both IDs are UUIDs, so at most one table matches; if both ever did, the
+    processed video wins, as it always has.
+    
+    Returns:
+        dict with "video_id", the ASSET_FIELDS, "operation_type" and
+        "operation_params" (None for originals) and "proxy_s3_key" (None for
+        processed videos), or None if neither exists
+    """
+    processed = select(
+        literal(0).label("priority"),
+        ProcessedVideo.processed_video_id.label("video_id"),
+        *[getattr(ProcessedVideo, field) for field in ASSET_FIELDS],
+        ProcessedVideo.operation_type,
+        ProcessedVideo.operation_params,
+        null().label("proxy_s3_key")
+    ).where(ProcessedVideo.processed_video_id == asset_id)
+    
+    original = select(
+        literal(1).label("priority"),
+        Video.video_id.label("video_id"),
+        *[getattr(Video, field) for field in ASSET_FIELDS],
+        null().label("operation_type"),
+        null().label("operation_params"),
+        Video.proxy_s3_key
+    ).where(Video.video_id == asset_id)
+    
+    query = union_all(processed, original).order_by(text("priority")).limit(1)
+    row = (await db.execute(query)).mappings().first()
+    if row is None:
+        return None
+    asset = dict(row)
+    del asset["priority"]
+    return asset
+
+def add_missing_columns(conn):
+    """
+    Add columns that were introduced after a table was first created.
+    
+    create_all only creates missing tables, so existing databases need new
+    nullable columns (and their indexes) added explicitly.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            for index in table.indexes:
+                if column in index.columns.values():
+                    index.create(conn)
+
+def create_schema(conn):
+    """Create missing tables and columns on a sync connection."""
+    Base.metadata.create_all(bind=conn)
+    add_missing_columns(conn)
+
+async def init_db():
+    """Create the schema; run once at application startup, not at import."""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+async def close_db():
+    """Close pooled API connections at shutdown."""
+    await async_engine.dispose()
 
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -0,0 +1,169 @@
+import av
+import numpy as np
+from abc import ABC, abstractmethod
+from fractions import Fraction
+from typing import Any, Dict, Optional, Tuple
+from video_editing_api.config import VIDEO_SETTINGS, QUALITY_PRESETS, ENCODER_PRESETS
+from video_editing_api.audio import AudioTrack
+
+class EncoderBackend(ABC):
+    """
+    An FFmpeg video encoder, as used by VideoEncoder.
+
+    Subclasses name the codec and translate the "quality" and "preset"
+    settings into encoder options.
+    """
+
+    codec_name: str
+    # Whether frames must have even dimensions (4:2:0 chroma subsampling)
+    even_dimensions = False
+
+    @abstractmethod
+    def options(self, quality: str, preset: str) -> Dict[str, str]:
+        """FFmpeg encoder options for a QUALITY_PRESETS level and an ENCODER_PRESETS preset."""
+        pass
+
+class Mpeg4Backend(EncoderBackend):
+    """MPEG-4 Part 2 at a fixed quantiser; the fastest encoder and the largest files."""
+
+    codec_name = "mpeg4"
+
+    def options(self, quality, preset):
+        qscale = str(QUALITY_PRESETS[quality]["qscale"])
+        return {"qmin": qscale, "qmax": qscale}
+
+class X264Backend(EncoderBackend):
+    """H.264 (libx264) in constant rate factor mode; preset trades encode speed for size."""
+
+    codec_name = "libx264"
+    even_dimensions = True
+
+    def options(self, quality, preset):
+        return {"crf": str(QUALITY_PRESETS[quality]["crf"]), "preset": preset}
+
+class X265Backend(X264Backend):
+    """HEVC (libx265): smaller than H.264 at the same CRF, several times slower to encode."""
+
+    codec_name = "libx265"
+
+    def options(self, quality, preset):
+        options = super().options(quality, preset)
+        options["x265-params"] = "log-level=error"
+        options["tag"] = "hvc1"
+        return options
+
+# Encoders selectable through VIDEO_SETTINGS["codec"] or per request
+ENCODERS = {
+    "mp4v": Mpeg4Backend(),
+    "h264": X264Backend(),
+    "hevc": X265Backend()
+}
+
+def resolve_settings(codec: Optional[str] = None, quality: Optional[str] = None,
+                     preset: Optional[str] = None) -> Tuple[str, str, str]:
+    """
+    Fill in unset encoder settings from VIDEO_SETTINGS and validate them.
+
+    Raises:
+        ValueError: If a setting is not one of the supported values
+    """
+    codec = codec or VIDEO_SETTINGS["codec"]
+    quality = quality or VIDEO_SETTINGS["quality"]
+    preset = preset or VIDEO_SETTINGS["preset"]
+    if codec not in ENCODERS:
+        raise ValueError(f"Unsupported codec: {codec}. Allowed codecs: {list(ENCODERS)}")
+    if quality not in QUALITY_PRESETS:
+        raise ValueError(f"Unsupported quality: {quality}. Allowed values: {list(QUALITY_PRESETS)}")
+    if preset not in ENCODER_PRESETS:
+        raise ValueError(f"Unsupported preset: {preset}. Allowed presets: {ENCODER_PRESETS}")
+    return codec, quality, preset
+
+def encoder_options(codec: Optional[str] = None, quality: Optional[str] = None,
+                    preset: Optional[str] = None) -> Dict[str, str]:
+    """The FFmpeg codec name and options that the given settings encode with."""
+    codec, quality, preset = resolve_settings(codec, quality, preset)
+    backend = ENCODERS[codec]
+    return {"codec": backend.codec_name, **backend.options(quality, preset)}
+
+class VideoEncoder:
+    """
+    Encode BGR frames to an MP4 file with an EncoderBackend.
+
+    Implements the part of the cv2.VideoWriter interface the operations use
+    (write, release, isOpened), so it is a drop-in writer for FramePipeline.
+    Encoders that need even dimensions drop a trailing odd row or column.
+    An AudioTrack is interleaved with the frames as they are written.
+    """
+
+    def __init__(self, output_path: Any, fps: float, frame_size: Tuple[int, int],
+                 codec: Optional[str] = None, quality: Optional[str] = None,
+                 preset: Optional[str] = None, gop_size: Optional[int] = None,
+                 audio: Optional[AudioTrack] = None, first_frame: int = 0, threads: int = 0,
+                 container_options: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            output_path: MP4 file to write (a path, or a writable file object)
+            fps: Frame rate of the output
+            frame_size: (width, height) of the frames that will be written
+            codec, quality, preset: Encoder settings; unset ones come from VIDEO_SETTINGS
+            gop_size: Maximum frames between keyframes (encoder default if unset)
+            audio: Audio muxed alongside the frames; closed on release
+            first_frame: Frame number the first frame is timestamped with
+                (for pieces of a longer output, see segment_encoder)
+            threads: Encoder threads (0: one per core)
+            container_options: Options for the MP4 muxer
+        """
+        codec, quality, preset = resolve_settings(codec, quality, preset)
+        backend = ENCODERS[codec]
+
+        width, height = frame_size
+        if backend.even_dimensions:
+            width, height = width - width % 2, height - height % 2
+        self.frame_size = (width, height)
+
+        rate = Fraction(fps).limit_denominator(1001)
+        self.container = av.open(output_path, "w", format="mp4", options=container_options or {})
+        self.stream = self.container.add_stream(backend.codec_name, rate=rate)
+        self.stream.width, self.stream.height = width, height
+        self.stream.pix_fmt = "yuv420p"
+        self.stream.codec_context.time_base = 1 / rate
+        self.stream.codec_context.thread_count = threads
+        if gop_size:
+            self.stream.codec_context.gop_size = gop_size
+        self.stream.options = backend.options(quality, preset)
+        self.fps = fps
+        self.audio = audio
+        if audio:
+            audio.attach(self.container)
+        self.frames = 0
+        self._first_frame = first_frame
+        self._closed = False
+
+    def isOpened(self) -> bool:
+        return not self._closed
+
+    def write(self, frame: np.ndarray) -> None:
+        width, height = self.frame_size
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = frame[:height, :width]
+        video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+        video_frame.pts = self._first_frame + self.frames
+        video_frame.time_base = self.stream.codec_context.time_base
+        self.frames += 1
+        self.container.mux(self.stream.encode(video_frame))
+        if self.audio:
+            self.audio.mux_until(self.frames / self.fps)
+
+    def release(self) -> None:
+        """Flush the encoder and finish the file; safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.container.mux(self.stream.encode(None))
+            if self.audio:
+                self.audio.mux_until(None)
+        finally:
+            self.container.close()
+            if self.audio:
+                self.audio.close()
@@ -0,0 +1,212 @@
+import av
+import cv2
+import numpy as np
+from bisect import bisect_right
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple
+
+class FrameIndex:
+    """
+    Packet index of a video stream, built by demuxing once without decoding.
+
+    Holds the presentation timestamp, keyframe flag and byte offset of every
+    frame in display order, which gives exact frame counts and durations
+    (OpenCV's CAP_PROP_FRAME_COUNT is an estimate) and lets readers seek to
+    the keyframe before any frame. It is stored as JSON with the Video row.
+    """
+
+    def __init__(self, pts: List[int], keyframes: List[int], offsets: List[int],
+                 time_base: Fraction, fps: Fraction, last_duration: int):
+        """
+        Args:
+            pts: Presentation timestamp of every frame, in display order
+            keyframes: Indices (into pts) of the keyframes, ascending
+            offsets: Byte offset in the file of each frame's packet (-1 if unknown)
+            time_base: Time base of the timestamps
+            fps: Average frame rate of the stream
+            last_duration: Duration of the last frame, in time_base units
+        """
+        self.pts = pts
+        self.keyframes = keyframes
+        self.offsets = offsets
+        self.time_base = time_base
+        self.fps = fps
+        self.last_duration = last_duration
+
+    @classmethod
+    def build(cls, video_path: str) -> "FrameIndex":
+        """Demux the first video stream of a file and index its packets."""
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            packets = sorted(
+                (packet.pts, packet.is_keyframe, packet.pos if packet.pos is not None else -1,
+                 packet.duration or 0)
+                for packet in container.demux(stream)
+                if packet.pts is not None
+            )
+            time_base = stream.time_base
+            fps = stream.average_rate or stream.guessed_rate
+
+        if not packets:
+            raise ValueError(f"No video frames found in {video_path}")
+
+        last_duration = packets[-1][3]
+        if not last_duration and fps:
+            last_duration = int(round(1 / (fps * time_base)))
+
+        return cls(
+            pts=[packet[0] for packet in packets],
+            keyframes=[index for index, packet in enumerate(packets) if packet[1]] or [0],
+            offsets=[packet[2] for packet in packets],
+            time_base=time_base,
+            fps=fps,
+            last_duration=last_duration
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FrameIndex":
+        """Rebuild an index from its stored JSON form."""
+        return cls(
+            pts=data["pts"],
+            keyframes=data["keyframes"],
+            offsets=data["offsets"],
+            time_base=Fraction(*data["time_base"]),
+            fps=Fraction(*data["fps"]),
+            last_duration=data["last_duration"]
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable form, for the Video.frame_index column."""
+        return {
+            "pts": self.pts,
+            "keyframes": self.keyframes,
+            "offsets": self.offsets,
+            "time_base": [self.time_base.numerator, self.time_base.denominator],
+            "fps": [self.fps.numerator, self.fps.denominator],
+            "last_duration": self.last_duration
+        }
+
+    @property
+    def total_frames(self) -> int:
+        return len(self.pts)
+
+    @property
+    def duration(self) -> float:
+        """Exact stream duration in seconds, from the first frame to the end of the last."""
+        return float((self.pts[-1] - self.pts[0] + self.last_duration) * self.time_base)
+
+    @property
+    def keyframe_pts(self) -> List[int]:
+        return [self.pts[index] for index in self.keyframes]
+
+    def keyframe_before(self, frame: int) -> int:
+        """Index of the last keyframe at or before a frame index."""
+        position = bisect_right(self.keyframes, frame) - 1
+        return self.keyframes[max(position, 0)]
+
+class BgrConverter:
+    """
+    Converts decoded PyAV frames to BGR arrays, as every frame loop reads them.
+
+    yuv420p frames (what H.264, HEVC and MPEG-4 decode to) are converted by
+    OpenCV straight into a given array, so converting into a buffer
+    allocates no frame-sized array; other formats go through a converted
+    copy. Converting the same frame always gives the same pixels, whichever
+    reader does it.
+    """
+
+    def __init__(self):
+        # Reused buffer the planes of a yuv420p frame are packed into
+        self._i420: Optional[np.ndarray] = None
+
+    def convert(self, frame: av.VideoFrame, image: Optional[np.ndarray] = None) -> np.ndarray:
+        """The frame as BGR, written into image when it has the right shape."""
+        if image is None or image.shape != (frame.height, frame.width, 3):
+            image = np.empty((frame.height, frame.width, 3), dtype=np.uint8)
+        if frame.format.name == "yuv420p" and frame.width % 2 == 0 and frame.height % 2 == 0:
+            cv2.cvtColor(self._pack_i420(frame), cv2.COLOR_YUV2BGR_I420, dst=image)
+        else:
+            np.copyto(image, frame.to_ndarray(format="bgr24"))
+        return image
+
+    def _pack_i420(self, frame: av.VideoFrame) -> np.ndarray:
+        """Copy a yuv420p frame's planes, without their row padding, into the reused I420 buffer."""
+        width, height = frame.width, frame.height
+        if self._i420 is None or self._i420.shape != (height * 3 // 2, width):
+            self._i420 = np.empty((height * 3 // 2, width), dtype=np.uint8)
+        packed = self._i420.reshape(-1)
+        offset = 0
+        for plane, (plane_width, plane_height) in zip(
+            frame.planes, ((width, height), (width // 2, height // 2), (width // 2, height // 2))
+        ):
+            rows = np.frombuffer(plane, np.uint8, count=plane_height * plane.line_size)
+            size = plane_width * plane_height
+            packed[offset:offset + size].reshape(plane_height, plane_width)[...] = \
+                rows.reshape(plane_height, plane.line_size)[:, :plane_width]
+            offset += size
+        return self._i420
+
+class IndexedCapture:
+    """
+    Frame-accurate reader for FramePipeline, backed by a FrameIndex.
+
+    Implements the part of the cv2.VideoCapture interface the pipeline uses
+    (set(CAP_PROP_POS_FRAMES), grab, read, release). Seeking jumps to the
+    keyframe at or before the target frame and decodes forward only the
+    frames in between, skipping their colour conversion, instead of relying
+    on the backend's timestamp-based frame positioning.
+    """
+
+    def __init__(self, video_path: str, index: FrameIndex):
+        self.index = index
+        self.container = av.open(video_path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        self._frames = None
+        self._pending = None
+        self._converter = BgrConverter()
+
+    def set(self, prop: int, value: float) -> bool:
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self.seek(int(value))
+        return True
+
+    def seek(self, frame: int) -> None:
+        """Position the reader so that the next frame returned is `frame`."""
+        self._pending = None
+        if frame >= self.index.total_frames:
+            self._frames = iter(())
+            return
+
+        keyframe = self.index.keyframe_before(frame)
+        self.container.seek(self.index.pts[keyframe], stream=self.stream, backward=True)
+        self._frames = self.container.decode(self.stream)
+
+        target_pts = self.index.pts[frame]
+        for decoded in self._frames:
+            if decoded.pts is not None and decoded.pts >= target_pts:
+                self._pending = decoded
+                break
+
+    def grab(self) -> bool:
+        """Advance one frame without converting it."""
+        return self._next() is not None
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Decode the next frame as BGR, into image when it has the right shape (see BgrConverter)."""
+        frame = self._next()
+        if frame is None:
+            return False, None
+        return True, self._converter.convert(frame, image)
+
+    def release(self) -> None:
+        self.container.close()
+
+    def _next(self):
+        if self._frames is None:
+            self.seek(0)
+        if self._pending is not None:
+            frame, self._pending = self._pending, None
+            return frame
+        return next(self._frames, None)
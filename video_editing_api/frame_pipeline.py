@@ -0,0 +1,200 @@
+import time
+import heapq
+import queue
+import threading
+import cv2
+import numpy as np
+from typing import Any, Callable, List, Optional
+from video_editing_api.config import FRAME_PIPELINE_SETTINGS
+
+# Marks the end of the frame stream on a queue
+_END = object()
+
+class PipelineAborted(Exception):
+    """Raised inside a pipeline thread when another thread has failed."""
+
+class FramePipeline:
+    """
+    Overlap decoding, per-frame transforms and encoding on separate threads.
+
+    decoder thread -> [decoded queue] -> N transform workers -> [encode queue] -> encoder thread
+
+    Frames are decoded into a preallocated ring of buffers that cycle back
+    to the decoder once written (or transformed into a new array), so for a
+    plain copy the decode side allocates no frame-sized array in the steady
+    state (with cv2.VideoCapture, or IndexedCapture on yuv420p video). OpenCV
+    releases the GIL while decoding, resizing and encoding, so the stages
+    genuinely run in parallel. Workers may finish out of order; the encoder
+    restores the original order before writing. The decoder and encoder
+    threads add up the time they spend in the capture and the writer.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, writer: Any,
+                 start_frame: int, end_frame: int, frame_shape: tuple,
+                 transform: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 output_indices: Optional[Callable[[int], List[int]]] = None,
+                 on_frame: Optional[Callable[[], None]] = None,
+                 workers: Optional[int] = None, queue_size: Optional[int] = None):
+        """
+        Args:
+            cap: Open capture (cv2.VideoCapture or IndexedCapture); it is
+                positioned at start_frame by run()
+            writer: Open writer for the output (cv2.VideoWriter or encoders.VideoEncoder)
+            start_frame, end_frame: Source frame range to decode
+            frame_shape: (height, width, channels) of decoded frames
+            transform: Per-frame function applied by the workers
+            output_indices: Maps a source frame index to the output indices
+                it produces (empty to drop it, several to repeat it)
+            on_frame: Called after every frame written
+            workers: Transform threads (0 runs the transform on the encoder thread)
+            queue_size: Capacity of each queue
+        """
+        self.cap = cap
+        self.writer = writer
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.transform = transform
+        self.output_indices = output_indices
+        self.on_frame = on_frame
+        self.workers = FRAME_PIPELINE_SETTINGS["workers"] if workers is None else workers
+        if not transform:
+            self.workers = 0
+        size = queue_size or FRAME_PIPELINE_SETTINGS["queue_size"]
+
+        self.decoded = queue.Queue(maxsize=size)
+        self.encoded = queue.Queue(maxsize=size) if self.workers else self.decoded
+
+        # Enough buffers to fill both queues and keep every thread busy
+        self.free = queue.Queue()
+        for _ in range(2 * size + self.workers + 2):
+            self.free.put(np.empty(frame_shape, dtype=np.uint8))
+
+        self.frames_written = 0
+        # Seconds spent decoding (capture reads) and encoding (writer calls)
+        self.decode_seconds = 0.0
+        self.encode_seconds = 0.0
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def run(self) -> int:
+        """Process the range and return the number of frames written."""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+
+        threads = [threading.Thread(target=self._guard, args=(self._decode,), daemon=True)]
+        threads += [
+            threading.Thread(target=self._guard, args=(self._work,), daemon=True)
+            for _ in range(self.workers)
+        ]
+        threads.append(threading.Thread(target=self._guard, args=(self._encode,), daemon=True))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._error is not None:
+            raise self._error
+        return self.frames_written
+
+    def _guard(self, target: Callable[[], None]) -> None:
+        """Run a stage, recording the first failure and stopping the others."""
+        try:
+            target()
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+
+    def _put(self, q: queue.Queue, item) -> None:
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _decode(self) -> None:
+        sequence = 0
+        for index in range(self.start_frame, self.end_frame):
+            copies = 1
+            if self.output_indices:
+                copies = len(self.output_indices(index))
+                if copies == 0:
+                    # Advance without converting the frame to BGR
+                    started = time.perf_counter()
+                    grabbed = self.cap.grab()
+                    self.decode_seconds += time.perf_counter() - started
+                    if not grabbed:
+                        break
+                    continue
+
+            buffer = self._get(self.free)
+            started = time.perf_counter()
+            ret, frame = self.cap.read(buffer)
+            self.decode_seconds += time.perf_counter() - started
+            if not ret:
+                self.free.put(buffer)
+                break
+            self._put(self.decoded, (sequence, frame, buffer, copies))
+            sequence += 1
+
+        for _ in range(max(self.workers, 1)):
+            self._put(self.decoded, _END)
+
+    def _work(self) -> None:
+        while True:
+            item = self._get(self.decoded)
+            if item is _END:
+                self._put(self.encoded, _END)
+                return
+            sequence, frame, buffer, copies = item
+            self._put(self.encoded, (sequence,) + self._apply(frame, buffer) + (copies,))
+
+    def _apply(self, frame: np.ndarray, buffer: np.ndarray):
+        """Transform a frame, recycling its buffer as soon as it is no longer referenced."""
+        result = self.transform(frame)
+        if result is frame:
+            return result, buffer
+        self.free.put(buffer)
+        return result, None
+
+    def _encode(self) -> None:
+        pending = []
+        next_sequence = 0
+        remaining_ends = max(self.workers, 1)
+
+        while remaining_ends:
+            item = self._get(self.encoded)
+            if item is _END:
+                remaining_ends -= 1
+                continue
+            heapq.heappush(pending, (item[0], id(item), item))
+
+            # Write everything that is now in order
+            while pending and pending[0][0] == next_sequence:
+                _, _, (_, frame, buffer, copies) = heapq.heappop(pending)
+                if self.transform and not self.workers:
+                    frame, buffer = self._apply(frame, buffer)
+                for _ in range(copies):
+                    started = time.perf_counter()
+                    self.writer.write(frame)
+                    self.encode_seconds += time.perf_counter() - started
+                    self.frames_written += 1
+                    if self.on_frame:
+                        self.on_frame()
+                if buffer is not None:
+                    self.free.put(buffer)
+                next_sequence += 1
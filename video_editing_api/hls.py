@@ -0,0 +1,186 @@
+import os
+import re
+import av
+import numpy as np
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+from video_editing_api.encoders import ENCODERS
+
+# File names inside an HLS package: the master playlist at the root, and a
+# media playlist and its segments in one directory per rendition
+MASTER_PLAYLIST = "master.m3u8"
+MEDIA_PLAYLIST = "index.m3u8"
+SEGMENT_PATTERN = "segment_%05d.ts"
+
+# Paths that may be requested from a package (see rendition_name)
+PACKAGE_PATH = re.compile(r"master\.m3u8|\d+p/(index\.m3u8|segment_\d+\.ts)")
+
+CONTENT_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+
+def package_prefix(asset_id: str, fingerprint: str) -> str:
+    """S3 prefix of a package; each distinct packaging request of a video gets its own."""
+    return f"hls/{asset_id}/{fingerprint[:16]}/"
+
+def rendition_sizes(width: int, height: int, heights: Optional[List[int]]) -> List[Tuple[int, int]]:
+    """
+    Frame size of each rendition, tallest first.
+
+    Args:
+        width, height: Source frame size
+        heights: Rendition heights; heights above the source are dropped
+            (sources are never scaled up), and none means one rendition at
+            the source size
+
+    Returns:
+        list: (width, height) pairs, even and keeping the source aspect ratio
+
+    Raises:
+        ValueError: If a height is not positive
+    """
+    if any(h <= 0 for h in heights or []):
+        raise ValueError("Rendition heights must be positive")
+    kept = sorted({max(2, min(h, height) // 2 * 2) for h in heights or [height]}, reverse=True)
+    return [(max(2, int(round(width * h / height / 2)) * 2), h) for h in kept]
+
+def rendition_name(size: Tuple[int, int]) -> str:
+    return f"{size[1]}p"
+
+def codec_string(extradata: bytes) -> str:
+    """RFC 6381 codec of an H.264 stream (avc1.PPCCLL) from the SPS in its Annex B extradata."""
+    match = re.search(rb"\x00\x00\x01[\x27\x47\x67]", extradata or b"")
+    if not match or len(extradata) < match.end() + 3:
+        return "avc1.640028"
+    return "avc1." + extradata[match.end():match.end() + 3].hex()
+
+def parse_media_playlist(text: str) -> List[Tuple[float, str]]:
+    """(duration, URI) of every segment in a media playlist."""
+    segments = []
+    duration = None
+    for line in text.splitlines():
+        if line.startswith("#EXTINF:"):
+            duration = float(line[len("#EXTINF:"):].split(",")[0])
+        elif line and not line.startswith("#") and duration is not None:
+            segments.append((duration, line))
+            duration = None
+    return segments
+
+def master_playlist(variants: List[Dict]) -> str:
+    """
+    Master playlist listing each rendition.
+
+    Args:
+        variants: Per rendition: "uri", "bandwidth" (peak segment bit rate),
+            "average_bandwidth", "width", "height", "fps" and "codecs"
+    """
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for variant in variants:
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={variant['bandwidth']},"
+            f"AVERAGE-BANDWIDTH={variant['average_bandwidth']},"
+            f"RESOLUTION={variant['width']}x{variant['height']},"
+            f"FRAME-RATE={variant['fps']:.3f},"
+            f"CODECS=\"{variant['codecs']}\""
+        )
+        lines.append(variant["uri"])
+    return "\n".join(lines) + "\n"
+
+class HlsWriter:
+    """
+    Encode BGR frames into an HLS package of one or more H.264 renditions.
+
+    All renditions go through one FFmpeg hls muxer with a keyframe every
+    segment_seconds, so every rendition is cut at the same instants and
+    players can switch between them at any segment boundary. Each frame is
+    scaled and converted to YUV by swscale in one step per rendition.
+    Implements the writer interface FramePipeline uses (write, release,
+    isOpened); release writes the master playlist.
+    """
+
+    def __init__(self, output_dir: str, fps: float, sizes: List[Tuple[int, int]],
+                 segment_seconds: float, quality: str, preset: str, bits_per_pixel: float):
+        """
+        Args:
+            output_dir: Directory the package is written to
+            fps: Frame rate of the source
+            sizes: (width, height) of each rendition (see rendition_sizes)
+            segment_seconds: Segment duration
+            quality, preset: x264 rate control level and speed preset
+            bits_per_pixel: Bit rate cap of each rendition, in bits per pixel
+                per frame, so bandwidth scales with resolution and frame rate
+        """
+        self.output_dir = output_dir
+        self.fps = fps
+        self.sizes = sizes
+        self._frames = 0
+        self._closed = False
+
+        rate = Fraction(fps).limit_denominator(1001)
+        self.container = av.open(
+            os.path.join(output_dir, "%v", MEDIA_PLAYLIST), "w", format="hls",
+            options={
+                "hls_time": str(segment_seconds),
+                "hls_playlist_type": "vod",
+                "hls_segment_filename": os.path.join(output_dir, "%v", SEGMENT_PATTERN),
+                "var_stream_map": " ".join(f"v:{i},name:{rendition_name(size)}" for i, size in enumerate(sizes))
+            }
+        )
+        self.streams = []
+        for width, height in sizes:
+            stream = self.container.add_stream(ENCODERS["h264"].codec_name, rate=rate)
+            stream.width, stream.height = width, height
+            stream.pix_fmt = "yuv420p"
+            stream.codec_context.thread_count = 0
+            stream.codec_context.gop_size = max(1, int(round(fps * segment_seconds)))
+            max_rate = int(bits_per_pixel * width * height * fps)
+            stream.options = {
+                **ENCODERS["h264"].options(quality, preset),
+                # Capped CRF: quality-driven, but never above the rendition's bandwidth
+                "maxrate": str(max_rate),
+                "bufsize": str(2 * max_rate),
+                # Keyframes only at segment boundaries, never on scene cuts
+                "sc_threshold": "0"
+            }
+            self.streams.append(stream)
+
+    def isOpened(self) -> bool:
+        return not self._closed
+
+    def write(self, frame: np.ndarray) -> None:
+        source = av.VideoFrame.from_ndarray(frame, format="bgr24")
+        for stream in self.streams:
+            scaled = source.reformat(stream.width, stream.height, format="yuv420p", interpolation="AREA")
+            scaled.pts = self._frames
+            self.container.mux(stream.encode(scaled))
+        self._frames += 1
+
+    def release(self) -> None:
+        """Flush the encoders, finish the media playlists and write the master playlist; safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        # The encoders' SPS is gone once the container closes
+        codecs = [codec_string(stream.codec_context.extradata) for stream in self.streams]
+        try:
+            for stream in self.streams:
+                self.container.mux(stream.encode(None))
+        finally:
+            self.container.close()
+
+        variants = []
+        for size, codec in zip(self.sizes, codecs):
+            directory = os.path.join(self.output_dir, rendition_name(size))
+            with open(os.path.join(directory, MEDIA_PLAYLIST)) as f:
+                segments = parse_media_playlist(f.read())
+            sizes = [os.path.getsize(os.path.join(directory, uri)) for _, uri in segments]
+            total_duration = sum(duration for duration, _ in segments)
+            variants.append({
+                "uri": f"{rendition_name(size)}/{MEDIA_PLAYLIST}",
+                "bandwidth": int(max(8 * length / max(duration, 1 / self.fps) for (duration, _), length in zip(segments, sizes))),
+                "average_bandwidth": int(8 * sum(sizes) / total_duration),
+                "width": size[0],
+                "height": size[1],
+                "fps": self.fps,
+                "codecs": codec
+            })
+        with open(os.path.join(self.output_dir, MASTER_PLAYLIST), "w") as f:
+            f.write(master_playlist(variants))
@@ -0,0 +1,418 @@
+import os
+import time
+import shutil
+import uuid
+import logging
+import multiprocessing
+from contextlib import ExitStack
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from video_editing_api.config import MAX_JOB_WORKERS, S3_BUCKET_NAME, S3_TRANSFER_SETTINGS
+from video_editing_api.database import SessionLocal, engine, Job, Video, ProcessedVideo
+from video_editing_api.video_processor import OperationFactory, MultiCutOperation
+from video_editing_api.s3_service import S3Service
+from video_editing_api.cache import SourceCache
+from video_editing_api.frame_index import FrameIndex
+from video_editing_api.probe import probe_video
+from video_editing_api.hls import MASTER_PLAYLIST, CONTENT_TYPES, package_prefix
+from video_editing_api.audio import audio_duration
+from video_editing_api.metrics import StageTimer, JOBS_IN_FLIGHT
+from video_editing_api.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes to the jobs table
+PROGRESS_INTERVAL = 1.0
+
+# Content type of each kind of output file; audio extraction writes M4A
+OUTPUT_CONTENT_TYPES = {".mp4": "video/mp4", ".m4a": "audio/mp4"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_s3_service: Optional[S3Service] = None
+_source_cache: Optional[SourceCache] = None
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared worker pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        # Spawn rather than fork: the API process holds boto3 clients,
+        # DB connections and event-loop threads that are not fork-safe.
+        _executor = ProcessPoolExecutor(
+            max_workers=MAX_JOB_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+    return _executor
+
+def shutdown_executor() -> None:
+    """Stop the worker pool, waiting for running jobs to finish."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+def submit_job(job_id: str) -> None:
+    """Hand a queued job off to the worker pool."""
+    _submit(run_job, job_id, label=f"Job {job_id}")
+
+def submit_cut_batch(job_ids: List[str]) -> None:
+    """Hand queued cut jobs on one source video to a single worker."""
+    _submit(run_cut_batch, job_ids, label=f"Cut batch {', '.join(job_ids)}")
+
+def _submit(fn, arg, label: str) -> None:
+    future = get_executor().submit(fn, arg)
+
+    def log_crash(f) -> None:
+        # Jobs record their own failures; this only fires if the worker died
+        if f.exception():
+            logger.error(f"{label} crashed its worker: {f.exception()}")
+
+    future.add_done_callback(log_crash)
+
+def job_to_dict(job: Job) -> dict:
+    """Serialise a job row for the status endpoint."""
+    progress = 0.0
+    if job.status == "done":
+        progress = 1.0
+    elif job.total_frames:
+        progress = min(job.frames_written / job.total_frames, 1.0)
+
+    return {
+        "job_id": job.job_id,
+        "video_id": job.video_id,
+        "operation_type": job.operation_type,
+        "operation_params": job.operation_params,
+        "status": job.status,
+        "progress": progress,
+        "frames_written": job.frames_written,
+        "total_frames": job.total_frames,
+        "processed_video_id": job.processed_video_id,
+        "error": job.error,
+        "notes": job.notes or [],
+        "created_at": job.created_at,
+        "updated_at": job.updated_at
+    }
+
+def _init_worker() -> None:
+    """Per-process setup for pool workers."""
+    global _s3_service, _source_cache
+    # Spawned processes start with logging unconfigured
+    configure_logging()
+    # Never reuse pooled connections across processes
+    engine.dispose()
+    _s3_service = S3Service(S3_BUCKET_NAME)
+    _source_cache = SourceCache(_s3_service)
+
+def run_job(job_id: str) -> None:
+    """
+    Execute a job inside a worker process.
+
+    Reads the source through the local cache, runs the operation while recording
+    progress, uploads the result and records it as a ProcessedVideo. Each
+    stage is timed (see metrics.StageTimer) and logged when the job is done.
+    """
+    db = SessionLocal()
+    output_path = None
+    job = None
+    in_flight = None
+
+    try:
+        job = db.query(Job).filter(Job.job_id == job_id).first()
+        if not job:
+            logger.error(f"Job {job_id} not found")
+            return
+        timer = StageTimer(job.operation_type)
+
+        # Another API process may have queued the same work; reuse its output
+        if job.fingerprint:
+            existing = db.query(ProcessedVideo).filter(ProcessedVideo.fingerprint == job.fingerprint).first()
+            if existing:
+                job.processed_video_id = existing.processed_video_id
+                job.status = "done"
+                _commit(db, timer)
+                return
+
+        job.status = "running"
+        _commit(db, timer)
+        in_flight = JOBS_IN_FLIGHT.labels(job.operation_type)
+        in_flight.inc()
+
+        db_video = db.query(Video).filter(Video.video_id == job.video_id).first()
+        if not db_video:
+            raise ValueError(f"Video not found: {job.video_id}")
+
+        params = dict(job.operation_params)
+        params.pop("output_format", None)
+
+        # HLS packaging may read one of the video's processed outputs instead
+        source = db_video
+        source_id = params.pop("source_id", None)
+        if source_id:
+            source = db.query(ProcessedVideo).filter(ProcessedVideo.processed_video_id == source_id).first()
+            if not source:
+                raise ValueError(f"Processed video not found: {source_id}")
+
+        # Read the source through the shared cache; it stays pinned until processed
+        with ExitStack() as pinned:
+            with timer.stage("s3_download"):
+                input_path = pinned.enter_context(_source_cache.open(source.s3_key))
+
+            # Only originals store their packet index
+            stored_index = db_video.frame_index if source is db_video else None
+            frame_index = FrameIndex.from_dict(stored_index) if stored_index else None
+            with timer.stage("probe"):
+                operation = OperationFactory.create_operation(
+                    job.operation_type, input_path, frame_index=frame_index, **params
+                )
+
+            # Videos uploaded before indexing existed get theirs on first use
+            if frame_index is None and source is db_video and operation.frame_index is not None:
+                db_video.frame_index = operation.frame_index.to_dict()
+            job.total_frames = operation.expected_frames
+            _commit(db, timer)
+
+            last_update = time.monotonic()
+
+            def record_progress(frames_written: int) -> None:
+                nonlocal last_update
+                now = time.monotonic()
+                if now - last_update >= PROGRESS_INTERVAL:
+                    job.frames_written = frames_written
+                    _commit(db, timer)
+                    last_update = now
+
+            operation.progress_callback = record_progress
+
+            # Process video
+            with timer.stage("process"):
+                output_path = operation.process()
+            timer.record_operation(operation)
+            # Before the output is stored: an error once it is uploaded would orphan it in S3
+            job.notes = operation.notes or None
+
+        if job.operation_type == "hls":
+            # The package is served from its prefix; there is no single output file
+            prefix = package_prefix(source_id or db_video.video_id, job.fingerprint)
+            with timer.stage("s3_upload"):
+                source.hls_s3_prefix = _store_package(output_path, prefix)
+        else:
+            processed = _processed_video(job, *_store_output(output_path, timer))
+            db.add(processed)
+            if job.operation_type == "proxy":
+                # Previews and thumbnails read the proxy from now on
+                db_video.proxy_s3_key = processed.s3_key
+
+        job.frames_written = operation.frames_written
+        job.status = "done"
+        _commit(db, timer)
+        timer.log(logger, "Job done", job_id=job_id, frames=operation.frames_written,
+                  fps=_frame_rate(operation.frames_written, timer))
+
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+        db.rollback()
+        if job is not None:
+            job.status = "failed"
+            job.error = str(e)
+            db.commit()
+    finally:
+        if in_flight is not None:
+            in_flight.dec()
+        if output_path and os.path.isdir(output_path):
+            shutil.rmtree(output_path, ignore_errors=True)
+        elif output_path and os.path.exists(output_path):
+            os.remove(output_path)
+        db.close()
+
+def run_cut_batch(job_ids: List[str]) -> None:
+    """
+    Execute queued cut jobs on the same source video inside one worker.
+
+    The source is decoded once for all clips (see MultiCutOperation), and
+    the outputs are uploaded concurrently. Jobs whose output already exists
+    are completed without cutting; if the batch fails, every job in it is
+    marked failed.
+    """
+    db = SessionLocal()
+    output_paths: List[str] = []
+    jobs: List[Job] = []
+    timer = StageTimer("cut_batch")
+    in_flight = JOBS_IN_FLIGHT.labels("cut")
+    running = 0
+
+    try:
+        jobs = db.query(Job).filter(Job.job_id.in_(job_ids)).all()
+        pending = []
+        for job in jobs:
+            existing = None
+            if job.fingerprint:
+                existing = db.query(ProcessedVideo).filter(ProcessedVideo.fingerprint == job.fingerprint).first()
+            if existing:
+                job.processed_video_id = existing.processed_video_id
+                job.status = "done"
+            else:
+                job.status = "running"
+                pending.append(job)
+        _commit(db, timer)
+        if not pending:
+            return
+        running = len(pending)
+        in_flight.inc(running)
+
+        video_ids = {job.video_id for job in pending}
+        if len(video_ids) != 1:
+            raise ValueError("A cut batch must share one source video")
+        db_video = db.query(Video).filter(Video.video_id == video_ids.pop()).first()
+        if not db_video:
+            raise ValueError(f"Video not found: {pending[0].video_id}")
+
+        with ExitStack() as pinned:
+            with timer.stage("s3_download"):
+                input_path = pinned.enter_context(_source_cache.open(db_video.s3_key))
+
+            frame_index = FrameIndex.from_dict(db_video.frame_index) if db_video.frame_index else None
+            with timer.stage("probe"):
+                operation = MultiCutOperation(
+                    input_path,
+                    [{"start_time": job.operation_params["start_time"], "end_time": job.operation_params["end_time"]}
+                     for job in pending],
+                    frame_index=frame_index,
+                    # Clips of one batch request share their encoder settings
+                    **{key: pending[0].operation_params.get(key) for key in ("codec", "quality", "preset")},
+                    audio=pending[0].operation_params.get("audio", True)
+                )
+            if frame_index is None:
+                db_video.frame_index = operation.frame_index.to_dict()
+            for job, (start, end) in zip(pending, operation.clips):
+                job.total_frames = end - start
+            _commit(db, timer)
+
+            last_update = time.monotonic()
+
+            def record_progress(frames_written: int) -> None:
+                nonlocal last_update
+                now = time.monotonic()
+                if now - last_update >= PROGRESS_INTERVAL:
+                    for job, frames in zip(pending, operation.clip_frames):
+                        job.frames_written = frames
+                    _commit(db, timer)
+                    last_update = now
+
+            operation.progress_callback = record_progress
+            with timer.stage("process"):
+                output_paths = operation.process()
+            timer.record_operation(operation)
+
+        with ThreadPoolExecutor(max_workers=S3_TRANSFER_SETTINGS["max_concurrency"]) as uploads:
+            stored = list(uploads.map(partial(_store_output, timer=timer), output_paths))
+
+        for job, frames, output in zip(pending, operation.clip_frames, stored):
+            db.add(_processed_video(job, *output))
+            job.frames_written = frames
+            job.status = "done"
+        _commit(db, timer)
+        timer.log(logger, "Cut batch done", job_ids=job_ids, frames=operation.frames_written,
+                  fps=_frame_rate(operation.frames_written, timer))
+
+    except Exception as e:
+        logger.error(f"Cut batch {', '.join(job_ids)} failed: {str(e)}", exc_info=True)
+        db.rollback()
+        for job in jobs:
+            if job.status != "done":
+                job.status = "failed"
+                job.error = str(e)
+        db.commit()
+    finally:
+        in_flight.dec(running)
+        for output_path in output_paths:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+        db.close()
+
+def _store_output(output_path: str, timer: StageTimer) -> Tuple[str, str, str, dict]:
+    """
+    Upload a processed video to S3, probe it and keep it in the local cache
+    so direct downloads skip S3. Safe to call from several threads.
+
+    Returns:
+        Tuple of (processed video ID, S3 key, content type, probe_video info);
+        audio-only outputs have no frame size, rate or count
+    """
+    processed_id = str(uuid.uuid4())
+    extension = os.path.splitext(output_path)[1]
+    content_type = OUTPUT_CONTENT_TYPES[extension]
+    s3_key = f"processed/{processed_id}{extension}"
+
+    with timer.stage("s3_upload"):
+        uploaded = _s3_service.upload_path(output_path, s3_key, content_type)
+    if not uploaded:
+        raise RuntimeError("Failed to upload processed video to S3")
+
+    with timer.stage("probe"):
+        if content_type.startswith("audio/"):
+            processed_info = {"duration": audio_duration(output_path), "width": None, "height": None,
+                              "fps": None, "total_frames": None}
+        else:
+            processed_info = probe_video(output_path)
+
+    etag = _s3_service.get_etag(s3_key)
+    if etag:
+        _source_cache.put(s3_key, etag, output_path)
+    return processed_id, s3_key, content_type, processed_info
+
+def _store_package(output_dir: str, prefix: str) -> str:
+    """
+    Upload an HLS package directory to S3 under prefix, concurrently. The
+    master playlist goes last, so a package is never visible half-uploaded.
+
+    Returns:
+        str: The prefix
+    """
+    files = []
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files.append((path, prefix + os.path.relpath(path, output_dir).replace(os.sep, "/")))
+    master = [item for item in files if item[1] == prefix + MASTER_PLAYLIST]
+    rest = [item for item in files if item[1] != prefix + MASTER_PLAYLIST]
+
+    def upload(item: Tuple[str, str]) -> None:
+        path, s3_key = item
+        if not _s3_service.upload_path(path, s3_key, CONTENT_TYPES[os.path.splitext(path)[1]]):
+            raise RuntimeError(f"Failed to upload {s3_key} to S3")
+
+    with ThreadPoolExecutor(max_workers=S3_TRANSFER_SETTINGS["max_concurrency"]) as uploads:
+        list(uploads.map(upload, rest))
+    for item in master:
+        upload(item)
+    return prefix
+
+def _commit(db, timer: StageTimer) -> None:
+    with timer.stage("db_commit"):
+        db.commit()
+
+def _frame_rate(frames: int, timer: StageTimer) -> Optional[float]:
+    """Frames per second of an operation's processing stage."""
+    seconds = timer.seconds.get("process")
+    return round(frames / seconds, 1) if seconds else None
+
+def _processed_video(job: Job, processed_id: str, s3_key: str, content_type: str,
+                     processed_info: dict) -> ProcessedVideo:
+    """ProcessedVideo row for a job's stored output; also links the job to it."""
+    job.processed_video_id = processed_id
+    return ProcessedVideo(
+        processed_video_id=processed_id,
+        original_video_id=job.video_id,
+        filename=os.path.basename(s3_key),
+        s3_key=s3_key,
+        content_type=content_type,
+        operation_type=job.operation_type,
+        operation_params=job.operation_params,
+        fingerprint=job.fingerprint,
+        duration=processed_info["duration"],
+        width=processed_info["width"],
+        height=processed_info["height"],
+        fps=processed_info["fps"],
+        total_frames=processed_info["total_frames"]
+    )
@@ -0,0 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List
+
+class KeyedLock:
+    """
+    One asyncio.Lock per key, so tasks working on the same key run one at a
+    time while tasks on other keys are never blocked behind them.
+
+    A key's lock exists only while a task holds or waits for it. Use from a
+    single event loop.
+    """
+
+    def __init__(self):
+        # key: [lock, tasks holding or waiting for it]
+        self._locks: Dict[Hashable, List] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        """Number of keys currently locked or waited for."""
+        return len(self._locks)
@@ -1,19 +1,45 @@
+import io
 import os
+import math
 import uuid
+import shutil
+import tempfile
+import asyncio
 import logging
-from typing import Optional
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Depends, Form
-from fastapi.responses import RedirectResponse, FileResponse
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Depends, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
-from video_editing_api.config import MAX_FILE_SIZE, ALLOWED_VIDEO_FORMATS
-from video_editing_api.video_processor import OperationFactory, BaseOperation
-from video_editing_api.database import get_db, Video, ProcessedVideo
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from video_editing_api.config import (
+    MAX_FILE_SIZE, ALLOWED_VIDEO_FORMATS, VIDEO_SETTINGS, CUT_MODES, QUALITY_PRESETS, ENCODER_PRESETS, S3_BUCKET_NAME, UPLOAD_CHUNK_SIZE,
+    S3_TRANSFER_SETTINGS, VIDEO_CACHE_CONTROL, MAX_BATCH_CUTS, RESUMABLE_UPLOAD_SETTINGS, THUMBNAIL_SETTINGS,
+    PROXY_SETTINGS, HLS_SETTINGS
+)
+from video_editing_api.video_processor import OperationFactory, PipelineOperation, check_encoder_settings
+from video_editing_api.database import get_db, init_db, close_db, find_asset, Video, ProcessedVideo, Job, Upload
 from video_editing_api.s3_service import S3Service
+from video_editing_api.cache import SourceCache
+from video_editing_api.frame_index import FrameIndex
+from video_editing_api.probe import probe_video, probe_fileobj
+from video_editing_api.uploads import plan_parts, part_length, check_parts, S3_MAX_PART_SIZE
+from video_editing_api.encoders import ENCODERS
+from video_editing_api.thumbnails import render_sprite, webvtt
+from video_editing_api.hls import MASTER_PLAYLIST, PACKAGE_PATH, CONTENT_TYPES, package_prefix, rendition_sizes
+from video_editing_api.metadata_cache import MetadataCache
+from video_editing_api.locks import KeyedLock
+from video_editing_api.streaming import stream_from_thread
+from video_editing_api.serving import RangeNotSatisfiable, parse_range, is_not_modified, http_date, iter_file_range
+from video_editing_api.jobs import submit_job, submit_cut_batch, shutdown_executor, job_to_dict
+from video_editing_api.metrics import StageTimer, count_bytes, render_metrics, multiprocess_enabled, CONTENT_TYPE_LATEST
+from video_editing_api.logging_config import configure_logging
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging (LOG_LEVEL, LOG_FORMAT)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -29,28 +55,165 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"]  # Allow frontend to see the filename
+    expose_headers=["Content-Disposition", "X-Processing-Notes"]  # Allow frontend to see the filename and notes
 )
 
+# Allowance for multipart boundaries and form fields around an upload
+MULTIPART_OVERHEAD = 64 * 1024
+
+class UploadSizeLimit:
+    """
+    Refuse POST bodies over MAX_FILE_SIZE (plus MULTIPART_OVERHEAD) as they
+    arrive. A declared Content-Length over the limit is refused before the
+    body is read; a chunked or unlabelled body fails as soon as the bytes
+    received pass the limit, while Starlette's form parser is still
+    spooling it, so an oversize upload is never buffered in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        
+        limit = MAX_FILE_SIZE + MULTIPART_OVERHEAD
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse(status_code=400, content={"detail": "File too large"})(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the body parser or the handler, and
+                    # answered like any other HTTPException
+                    raise HTTPException(status_code=400, detail="File too large")
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimit)
+
 # Initialize S3 service
-s3_service = S3Service("my-app-unique-bucket-1742462086")
+s3_service = S3Service(S3_BUCKET_NAME)
+source_cache = SourceCache(s3_service)
+
+# Metadata of recently requested videos, keyed by video ID
+metadata_cache = MetadataCache()
+
+# Serialises enqueue_job's duplicate lookup and insert within this process
+enqueue_lock = asyncio.Lock()
+
+# S3 ETags of rendered thumbnail sprites and WebVTT tracks by (video,
+# interval, width); they never change, so entries only age out by LRU
+thumbnail_cache = MetadataCache(ttl=math.inf)
+
+# Serialises thumbnail rendering per sheet, so concurrent first requests for
+# a sheet render it once without holding up other videos' sheets
+thumbnail_locks = KeyedLock()
+
+@app.on_event("startup")
+async def create_database_schema():
+    """Create missing tables and columns before serving requests."""
+    await init_db()
+
+@app.on_event("startup")
+def check_metrics_dir():
+    """Warn when /metrics cannot see the job workers (see video_editing_api.serve)."""
+    if not multiprocess_enabled():
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set: /metrics reports only the process serving it")
+
+@app.on_event("shutdown")
+def shutdown_job_workers():
+    """Let running jobs finish before the process exits."""
+    shutdown_executor()
+
+@app.on_event("shutdown")
+async def close_database():
+    await close_db()
 
-class CutOperationParams(BaseModel):
+# Request field types, shared by the JSON bodies and the trim form
+CutMode = Literal[tuple(CUT_MODES)]
+Codec = Literal[tuple(ENCODERS)]
+Quality = Literal[tuple(QUALITY_PRESETS)]
+Preset = Literal[tuple(ENCODER_PRESETS)]
+
+class EncodingParams(BaseModel):
+    codec: Optional[Codec] = Field(
+        None, description=f"Encoder for re-encoded output (default {VIDEO_SETTINGS['codec']})"
+    )
+    quality: Optional[Quality] = Field(
+        None, description=f"Rate control level (default {VIDEO_SETTINGS['quality']})"
+    )
+    preset: Optional[Preset] = Field(
+        None, description=f"x264/x265 speed preset (default {VIDEO_SETTINGS['preset']})"
+    )
+
+class CutOperationParams(EncodingParams):
+    start_time: float = Field(..., ge=0, description="Start time in seconds")
+    end_time: float = Field(..., gt=0, description="End time in seconds")
+    output_format: Optional[str] = "mp4"
+    mode: CutMode = Field(
+        VIDEO_SETTINGS["cut_mode"],
+        description="copy: keyframe-aligned remux, smart: re-encode only the edge GOPs (MPEG-4 sources; others are re-encoded in full, see the job notes), reencode: full frame loop, parallel: segments encoded across processes. codec, quality and preset apply to reencode and parallel only"
+    )
+    audio: bool = Field(True, description="Keep the source's audio, trimmed to the cut")
+
+class CutRange(BaseModel):
     start_time: float = Field(..., ge=0, description="Start time in seconds")
     end_time: float = Field(..., gt=0, description="End time in seconds")
+
+class BatchCutParams(EncodingParams):
+    cuts: List[CutRange] = Field(..., min_length=1, max_length=MAX_BATCH_CUTS, description="Clip ranges, in any order")
+    output_format: Optional[str] = "mp4"
+    audio: bool = Field(True, description="Keep the source's audio, trimmed to each clip")
+
+class PipelineStep(BaseModel):
+    type: Literal["cut", "resize", "crop", "rotate", "speed"]
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class PipelineOperationParams(EncodingParams):
+    operations: List[PipelineStep] = Field(..., min_length=1, description="Operations applied in order")
     output_format: Optional[str] = "mp4"
 
+class AudioExtractParams(BaseModel):
+    start_time: float = Field(0.0, ge=0, description="Start time in seconds")
+    end_time: Optional[float] = Field(None, gt=0, description="End time in seconds (default: the end of the video)")
+
+class HlsParams(BaseModel):
+    renditions: Optional[List[int]] = Field(
+        None, min_length=1, max_length=8,
+        description="Rendition heights, e.g. [1080, 720, 360]; heights above the source are dropped "
+                    "(default HLS_RENDITIONS, or one rendition at the source size)"
+    )
+    segment_seconds: float = Field(HLS_SETTINGS["segment_seconds"], ge=1, le=60, description="Segment duration")
+    quality: Optional[Quality] = Field(
+        None, description=f"Rate control level (default {HLS_SETTINGS['quality']})"
+    )
+    preset: Optional[Preset] = Field(
+        None, description=f"x264 speed preset (default {HLS_SETTINGS['preset']})"
+    )
+
 @app.post("/api/v1/videos/upload")
 async def upload_video(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Upload a video file to S3 and store metadata in SQLite.
-    Returns a video ID that can be used for subsequent operations.
+    Returns a video ID that can be used for subsequent operations, and the
+    job generating its proxy rendition.
     """
-    # Log the content type for debugging
-    print(f"Received file with content type: {file.content_type}")
+    logger.debug(f"Received file with content type: {file.content_type}")
+    timer = StageTimer("upload")
     
     # Validate file size
     file_size = 0
@@ -60,10 +223,81 @@ async def upload_video(
     
     if file_size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="File too large")
+    count_bytes("client_upload")(file_size)
     
     # Get file extension and determine content type
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    content_type = file.content_type
+    file_extension, content_type = _resolve_content_type(file.filename, file.content_type)
+    
+    # Generate unique filename and S3 key
+    video_id = str(uuid.uuid4())
+    filename = f"{video_id}{file_extension}"
+    s3_key = f"videos/{filename}"
+    
+    # Drain the spooled upload to a local file in a single pass. The S3
+    # upload and the metadata probe then both read that file concurrently,
+    # so the bytes never make a round trip through S3 just to be probed.
+    temp_path = f"/tmp/{filename}"
+    try:
+        await run_in_threadpool(_spool_to_path, file.file, temp_path)
+        uploaded, video_info = await asyncio.gather(
+            run_in_threadpool(timer.timed("s3_upload", s3_service.upload_path), temp_path, s3_key, content_type),
+            run_in_threadpool(timer.timed("probe", _probe_video), temp_path),
+            return_exceptions=True
+        )
+        
+        # Keep the local copy as a warm cache entry for the first cut
+        if uploaded is True and not isinstance(video_info, Exception):
+            etag = await run_in_threadpool(s3_service.get_etag, s3_key)
+            if etag:
+                await run_in_threadpool(source_cache.put, s3_key, etag, temp_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    if uploaded is not True:
+        raise HTTPException(status_code=500, detail="Failed to upload file to S3")
+    
+    # Get video information
+    try:
+        if isinstance(video_info, Exception):
+            raise video_info
+        
+        # Create database record
+        db_video = _new_video(video_id, filename, s3_key, content_type, video_info)
+        db.add(db_video)
+        with timer.stage("db_commit"):
+            await db.commit()
+        metadata_cache.invalidate(video_id)
+        
+    except Exception as e:
+        # Clean up S3 file if database operation fails
+        await run_in_threadpool(s3_service.delete_file, s3_key)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    timer.log(logger, "Upload done", video_id=video_id, bytes=file_size)
+    return {
+        "video_id": video_id,
+        "proxy_job_id": await _enqueue_proxy(db, background_tasks, db_video),
+        "message": "Video uploaded successfully"
+    }
+
+async def _enqueue_proxy(db: AsyncSession, background_tasks: BackgroundTasks, db_video: Video) -> Optional[str]:
+    """Queue the proxy rendition of a newly stored video; returns the job ID (None if proxies are disabled)."""
+    if not PROXY_SETTINGS["enabled"]:
+        return None
+    params = {key: PROXY_SETTINGS[key] for key in ("height", "keyframe_interval", "codec", "quality", "preset")}
+    job = await enqueue_job(db, background_tasks, db_video, "proxy", params, total_frames=db_video.total_frames)
+    return job["job_id"]
+
+def _resolve_content_type(filename: str, content_type: Optional[str]) -> Tuple[str, str]:
+    """
+    Work out an upload's extension and content type, falling back to the
+    extension when the client sent application/octet-stream.
+    
+    Returns:
+        (file_extension, content_type)
+    """
+    file_extension = os.path.splitext(filename)[1].lower()
     
     # Map file extensions to content types
     extension_to_content_type = {
@@ -74,7 +308,7 @@ async def upload_video(
     }
     
     # If content type is application/octet-stream, try to determine it from extension
-    if content_type == 'application/octet-stream' and file_extension in extension_to_content_type:
+    if content_type in (None, 'application/octet-stream') and file_extension in extension_to_content_type:
         content_type = extension_to_content_type[file_extension]
     
     # Validate content type
@@ -83,206 +317,908 @@ async def upload_video(
             status_code=400, 
             detail=f"Unsupported video format: {content_type}. Allowed formats: {ALLOWED_VIDEO_FORMATS}"
         )
+    return file_extension, content_type
+
+def _new_video(video_id: str, filename: str, s3_key: str, content_type: str, video_info: dict) -> Video:
+    """The database record of a stored source video, from its _probe_video result."""
+    return Video(
+        video_id=video_id,
+        filename=filename,
+        s3_key=s3_key,
+        content_type=content_type,
+        duration=video_info["duration"],
+        width=video_info["width"],
+        height=video_info["height"],
+        fps=video_info["fps"],
+        total_frames=video_info["total_frames"],
+        frame_index=video_info["frame_index"]
+    )
+
+class UploadInitParams(BaseModel):
+    filename: str = Field(..., min_length=1, description="Name of the source file; its extension is kept")
+    size: int = Field(..., gt=0, description="Total size of the file in bytes")
+    content_type: Optional[str] = Field(None, description="Content type (default: from the file extension)")
+
+@app.post("/api/v1/uploads")
+async def create_upload(params: UploadInitParams, db: AsyncSession = Depends(get_db)):
+    """
+    Start a resumable upload.
+    
+    The client then PUTs each part to /api/v1/uploads/{upload_id}/parts/{n}
+    (in any order, several at a time) and POSTs .../complete. Every part goes
+    straight to S3 as a multipart part, so the API never holds the file.
+    """
+    upload = await _start_upload(params, multipart=True)
+    db.add(upload)
+    await db.commit()
+    
+    return _upload_to_dict(upload)
+
+class DirectUploadParams(UploadInitParams):
+    method: Literal["post", "put", "multipart"] = Field(
+        "post",
+        description="post: presigned form POST, put: presigned PUT (both up to 5 GB), multipart: presigned part PUTs"
+    )
+
+@app.post("/api/v1/uploads/direct")
+async def create_direct_upload(params: DirectUploadParams, db: AsyncSession = Depends(get_db)):
+    """
+    Start an upload that the client sends straight to S3 with presigned
+    requests, so no video bytes pass through the API. The client POSTs
+    /api/v1/uploads/{upload_id}/complete once the file is in S3.
+    
+    For "multipart", the URL of each part comes from
+    GET /api/v1/uploads/{upload_id}/parts/{n}/url.
+    """
+    if params.method != "multipart" and params.size > S3_MAX_PART_SIZE:
+        raise HTTPException(status_code=400, detail="Files over 5 GB must use the multipart method")
+    
+    upload = await _start_upload(params, multipart=params.method == "multipart")
+    expiration = RESUMABLE_UPLOAD_SETTINGS["url_expiration"]
+    result = _upload_to_dict(upload)
+    result.update(method=params.method, expires_in=expiration)
+    if params.method == "post":
+        post = await run_in_threadpool(
+            s3_service.generate_upload_post, upload.s3_key, upload.content_type, upload.size, expiration
+        )
+        if not post:
+            raise HTTPException(status_code=500, detail="Failed to generate upload URL")
+        result.update(url=post["url"], fields=post["fields"])
+    elif params.method == "put":
+        url = await run_in_threadpool(s3_service.generate_upload_url, upload.s3_key, upload.content_type, expiration)
+        if not url:
+            raise HTTPException(status_code=500, detail="Failed to generate upload URL")
+        result.update(url=url, headers={"Content-Type": upload.content_type})
+    
+    db.add(upload)
+    await db.commit()
+    
+    return result
+
+async def _start_upload(params: UploadInitParams, multipart: bool) -> Upload:
+    """
+    Validate a new upload and choose where it is stored; multipart uploads
+    are also started in S3. The returned record is not yet added to a session.
+    """
+    if params.size > RESUMABLE_UPLOAD_SETTINGS["max_file_size"]:
+        raise HTTPException(status_code=400, detail="File too large")
+    
+    file_extension, content_type = _resolve_content_type(params.filename, params.content_type)
+    part_size = params.size
+    if multipart:
+        try:
+            part_size, _ = plan_parts(params.size, RESUMABLE_UPLOAD_SETTINGS["part_size"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
-    # Generate unique filename and S3 key
     video_id = str(uuid.uuid4())
     filename = f"{video_id}{file_extension}"
     s3_key = f"videos/{filename}"
+    s3_upload_id = None
+    if multipart:
+        s3_upload_id = await run_in_threadpool(s3_service.create_multipart_upload, s3_key, content_type)
+        if not s3_upload_id:
+            raise HTTPException(status_code=500, detail="Failed to start upload to S3")
     
-    # Upload to S3
-    if not s3_service.upload_file(file.file, s3_key, content_type):
-        raise HTTPException(status_code=500, detail="Failed to upload file to S3")
+    return Upload(
+        upload_id=str(uuid.uuid4()),
+        video_id=video_id,
+        filename=filename,
+        s3_key=s3_key,
+        s3_upload_id=s3_upload_id,
+        content_type=content_type,
+        size=params.size,
+        part_size=part_size,
+        status="pending"
+    )
+
+@app.get("/api/v1/uploads/{upload_id}/parts/{part_number}/url")
+async def get_part_upload_url(upload_id: str, part_number: int, db: AsyncSession = Depends(get_db)):
+    """
+    Get a presigned URL to PUT one part of a multipart upload straight to
+    S3. Ask again for a fresh URL when retrying a part after it expired.
+    """
+    upload = await _get_multipart_upload(db, upload_id)
+    try:
+        length = part_length(upload.size, upload.part_size, part_number)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    expiration = RESUMABLE_UPLOAD_SETTINGS["url_expiration"]
+    url = await run_in_threadpool(
+        s3_service.generate_part_url, upload.s3_key, upload.s3_upload_id, part_number, expiration
+    )
+    if not url:
+        raise HTTPException(status_code=500, detail="Failed to generate upload URL")
+    
+    return {"part_number": part_number, "size": length, "url": url, "expires_in": expiration}
+
+@app.put("/api/v1/uploads/{upload_id}/parts/{part_number}")
+async def upload_part(upload_id: str, part_number: int, request: Request,
+                      db: AsyncSession = Depends(get_db)):
+    """
+    Upload one part of a resumable upload as the raw request body.
+    
+    Part n holds bytes (n - 1) * part_size up to n * part_size of the file;
+    only the last part may be shorter. Sending a part again replaces it, so
+    a failed part is simply retried. An optional Content-MD5 header is
+    checked by S3.
+    """
+    upload = await _get_multipart_upload(db, upload_id)
+    # Parts can take a while to arrive; don't hold a pooled connection meanwhile
+    await db.close()
     
-    # Get video information
     try:
-        # Download the file temporarily to get video info
-        temp_path = f"/tmp/{filename}"
-        with open(temp_path, "wb") as f:
-            f.write(s3_service.download_file(s3_key))
-        
-        video_info = BaseOperation.get_video_info(temp_path)
-        os.remove(temp_path)  # Clean up temporary file
-        
-        # Create database record
-        db_video = Video(
-            video_id=video_id,
-            filename=filename,
-            s3_key=s3_key,
-            content_type=content_type,
-            duration=video_info["duration"],
-            width=video_info["width"],
-            height=video_info["height"],
-            fps=video_info["fps"],
-            total_frames=video_info["total_frames"]
+        length = part_length(upload.size, upload.part_size, part_number)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length != str(length):
+        raise HTTPException(status_code=400, detail=f"Part {part_number} must be {length} bytes")
+    
+    # Stage the part on disk rather than in memory, so parallel parts of
+    # large uploads don't add up to the file size in RAM
+    with tempfile.TemporaryFile() as part:
+        received = await _stream_body_to(request, part, length)
+        if received != length:
+            raise HTTPException(status_code=400, detail=f"Part {part_number} must be {length} bytes")
+        await run_in_threadpool(part.seek, 0)
+        etag = await run_in_threadpool(
+            s3_service.upload_part, upload.s3_key, upload.s3_upload_id, part_number,
+            part, length, request.headers.get("content-md5")
         )
-        db.add(db_video)
-        db.commit()
-        db.refresh(db_video)
-        
-        return {"video_id": video_id, "message": "Video uploaded successfully"}
-        
+    if not etag:
+        raise HTTPException(status_code=500, detail="Failed to upload part to S3")
+    
+    return {"upload_id": upload_id, "part_number": part_number, "size": length, "etag": etag}
+
+@app.get("/api/v1/uploads/{upload_id}")
+async def get_upload(upload_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Get the state of a resumable upload. While it is pending, lists the parts
+    S3 has received and the parts still to send, so a client can resume;
+    single-object direct uploads report whether the object has arrived.
+    """
+    upload = await _get_upload(db, upload_id)
+    result = _upload_to_dict(upload)
+    if upload.status == "pending" and not upload.s3_upload_id:
+        result["received"] = await run_in_threadpool(s3_service.get_metadata, upload.s3_key) is not None
+    elif upload.status == "pending":
+        parts = await run_in_threadpool(s3_service.list_parts, upload.s3_key, upload.s3_upload_id)
+        if parts is None:
+            raise HTTPException(status_code=500, detail="Failed to list uploaded parts")
+        missing, wrong_size = check_parts(parts, upload.size, upload.part_size)
+        result["received_parts"] = [part["PartNumber"] for part in parts if part["PartNumber"] not in wrong_size]
+        result["missing_parts"] = sorted(missing + wrong_size)
+    return result
+
+@app.post("/api/v1/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str, background_tasks: BackgroundTasks,
+                          db: AsyncSession = Depends(get_db)):
+    """
+    Finish an upload: assemble the uploaded parts (multipart uploads) or
+    check the uploaded object (direct uploads), probe the video and store
+    its metadata. Returns the video ID, like the single-request upload.
+    
+    The probe reads the container headers with ranged GETs, so completing
+    a multi-GB upload does not download it; the packet index is built by
+    the first job on the video.
+    """
+    upload = await _get_upload(db, upload_id)
+    if upload.status == "complete":
+        return {"video_id": upload.video_id, "message": "Video uploaded successfully"}
+    if upload.status != "pending":
+        raise HTTPException(status_code=409, detail=f"Upload is {upload.status}")
+    
+    if upload.s3_upload_id:
+        parts = await run_in_threadpool(s3_service.list_parts, upload.s3_key, upload.s3_upload_id)
+        if parts is None:
+            raise HTTPException(status_code=500, detail="Failed to list uploaded parts")
+        missing, wrong_size = check_parts(parts, upload.size, upload.part_size)
+        if missing or wrong_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Upload is incomplete; send parts {sorted(missing + wrong_size)}"
+            )
+    else:
+        metadata = await run_in_threadpool(s3_service.get_metadata, upload.s3_key)
+        if not metadata:
+            raise HTTPException(status_code=400, detail="File has not been uploaded")
+        if metadata["size"] != upload.size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Uploaded file is {metadata['size']} bytes, expected {upload.size}"
+            )
+    
+    # Claim the upload so a concurrent complete request cannot assemble it twice
+    claimed = await db.execute(
+        update(Upload)
+        .where(Upload.upload_id == upload_id, Upload.status == "pending")
+        .values(status="completing")
+    )
+    await db.commit()
+    if claimed.rowcount != 1:
+        raise HTTPException(status_code=409, detail="Upload is already being completed")
+    
+    if upload.s3_upload_id and not await run_in_threadpool(
+            s3_service.complete_multipart_upload, upload.s3_key, upload.s3_upload_id, parts):
+        # Release the claim so the client can retry. The claim was a Core
+        # UPDATE, so the loaded instance still reads "pending" and setting
+        # the attribute back to that would not be flushed.
+        await db.execute(
+            update(Upload)
+            .where(Upload.upload_id == upload_id, Upload.status == "completing")
+            .values(status="pending")
+        )
+        await db.commit()
+        raise HTTPException(status_code=500, detail="Failed to complete upload to S3")
+    
+    try:
+        video_info = await run_in_threadpool(_probe_stored_video, upload.s3_key)
     except Exception as e:
-        # Clean up S3 file if database operation fails
-        s3_service.delete_file(s3_key)
-        raise HTTPException(status_code=500, detail=str(e))
+        await run_in_threadpool(s3_service.delete_file, upload.s3_key)
+        upload.status = "aborted"
+        await db.commit()
+        raise HTTPException(status_code=400, detail=f"Uploaded file is not a readable video: {e}")
+    
+    db_video = _new_video(upload.video_id, upload.filename, upload.s3_key, upload.content_type, video_info)
+    db.add(db_video)
+    upload.status = "complete"
+    await db.commit()
+    metadata_cache.invalidate(upload.video_id)
+    
+    return {
+        "video_id": upload.video_id,
+        "proxy_job_id": await _enqueue_proxy(db, background_tasks, db_video),
+        "message": "Video uploaded successfully"
+    }
+
+@app.delete("/api/v1/uploads/{upload_id}")
+async def abort_upload(upload_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Abort a pending resumable upload and discard the parts stored in S3.
+    """
+    upload = await _get_upload(db, upload_id)
+    if upload.status != "pending":
+        raise HTTPException(status_code=409, detail=f"Upload is {upload.status}")
+    
+    if upload.s3_upload_id:
+        aborted = await run_in_threadpool(s3_service.abort_multipart_upload, upload.s3_key, upload.s3_upload_id)
+    else:
+        # A direct upload may already have stored the object
+        aborted = await run_in_threadpool(s3_service.delete_file, upload.s3_key)
+    if not aborted:
+        raise HTTPException(status_code=500, detail="Failed to abort upload")
+    upload.status = "aborted"
+    await db.commit()
+    
+    return _upload_to_dict(upload)
+
+async def _get_upload(db: AsyncSession, upload_id: str) -> Upload:
+    upload = await db.scalar(select(Upload).where(Upload.upload_id == upload_id))
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+async def _get_multipart_upload(db: AsyncSession, upload_id: str) -> Upload:
+    """A pending upload that takes parts; 409 for finished or single-object uploads."""
+    upload = await _get_upload(db, upload_id)
+    if upload.status != "pending":
+        raise HTTPException(status_code=409, detail=f"Upload is {upload.status}")
+    if not upload.s3_upload_id:
+        raise HTTPException(status_code=409, detail="Upload is a single object; send it to its presigned URL")
+    return upload
+
+def _upload_to_dict(upload: Upload) -> dict:
+    return {
+        "upload_id": upload.upload_id,
+        "video_id": upload.video_id,
+        "status": upload.status,
+        "size": upload.size,
+        "part_size": upload.part_size,
+        "part_count": math.ceil(upload.size / upload.part_size)
+    }
 
 @app.post("/api/v1/videos/{video_id}/cut")
 async def cut_video(
     video_id: str,
     params: CutOperationParams,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Cut a video segment between start_time and end_time.
     Returns a job ID for tracking the processing status.
     """
     # Get video from database
-    db_video = db.query(Video).filter(Video.video_id == video_id).first()
+    db_video = await db.scalar(select(Video).where(Video.video_id == video_id))
     if not db_video:
         raise HTTPException(status_code=404, detail="Video not found")
     
-    try:
-        # Validate times against video duration
-        if params.start_time >= db_video.duration:
+    # Validate times against video duration
+    _validate_cut_range(params.start_time, params.end_time, db_video.duration)
+    _validate_encoder_settings(params.mode, params.codec, params.quality, params.preset)
+    
+    return await enqueue_job(
+        db, background_tasks, db_video, "cut", params.dict(),
+        total_frames=int(params.end_time * db_video.fps) - int(params.start_time * db_video.fps)
+    )
+
+@app.post("/api/v1/videos/{video_id}/cuts")
+async def cut_video_batch(
+    video_id: str,
+    params: BatchCutParams,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cut many clips from one video. The clips are processed together by one
+    worker, which decodes the source once and writes every clip from that
+    single pass (overlapping clips share decoded frames).
+    Returns one job per clip, in request order.
+    """
+    db_video = await db.scalar(select(Video).where(Video.video_id == video_id))
+    if not db_video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    for cut in params.cuts:
+        _validate_cut_range(cut.start_time, cut.end_time, db_video.duration)
+        if int(cut.end_time * db_video.fps) <= int(cut.start_time * db_video.fps):
             raise HTTPException(
                 status_code=400,
-                detail=f"Start time ({params.start_time}s) must be less than video duration ({db_video.duration:.2f}s)"
+                detail=f"Cut {cut.start_time}s-{cut.end_time}s is shorter than one frame"
             )
-        if params.end_time > db_video.duration:
-            raise HTTPException(
-                status_code=400,
-                detail=f"End time ({params.end_time}s) must be less than or equal to video duration ({db_video.duration:.2f}s)"
+    
+    # Each clip is an ordinary re-encoded cut, so it shares results (and
+    # fingerprints) with single cut requests for the same range
+    results, new_job_ids = [], []
+    async with enqueue_lock:
+        for cut in params.cuts:
+            operation_params = {
+                "start_time": cut.start_time,
+                "end_time": cut.end_time,
+                "output_format": params.output_format,
+                "mode": "reencode",
+                "codec": params.codec,
+                "quality": params.quality,
+                "preset": params.preset,
+                "audio": params.audio
+            }
+            result, is_new = await _find_or_add_job(
+                db, db_video, "cut", operation_params,
+                total_frames=int(cut.end_time * db_video.fps) - int(cut.start_time * db_video.fps)
             )
-        
-        # Download video from S3
-        temp_input_path = f"/tmp/{db_video.filename}"
-        with open(temp_input_path, "wb") as f:
-            f.write(s3_service.download_file(db_video.s3_key))
-        
-        # Create cut operation
-        operation = OperationFactory.create_operation(
-            "cut",
-            temp_input_path,
-            start_time=params.start_time,
-            end_time=params.end_time
+            if is_new:
+                new_job_ids.append(result["job_id"])
+            results.append({"start_time": cut.start_time, "end_time": cut.end_time, **result})
+        await db.commit()
+    
+    if new_job_ids:
+        background_tasks.add_task(submit_cut_batch, new_job_ids)
+    
+    return {
+        "video_id": video_id,
+        "jobs": results,
+        "message": f"{len(new_job_ids)} clip(s) queued for processing"
+    }
+
+@app.post("/api/v1/videos/{video_id}/audio")
+async def extract_audio(
+    video_id: str,
+    params: AudioExtractParams,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Extract a video's audio track, or a range of it, to an M4A file. Only
+    audio packets are read and the track is stream-copied when possible, so
+    this costs a fraction of a cut. Videos without audio fail the job.
+    Returns a job ID for tracking the processing status.
+    """
+    db_video = await db.scalar(select(Video).where(Video.video_id == video_id))
+    if not db_video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    _validate_cut_range(params.start_time, params.end_time or db_video.duration, db_video.duration)
+    
+    # Progress counts audio packets, so there is no frame total
+    return await enqueue_job(db, background_tasks, db_video, "extract_audio", params.dict(), total_frames=None)
+
+def _validate_encoder_settings(mode: str, codec: Optional[str], quality: Optional[str], preset: Optional[str]) -> None:
+    """Reject encoder settings that the cut mode would not use."""
+    try:
+        check_encoder_settings(mode, codec, quality, preset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _validate_cut_range(start_time: float, end_time: float, duration: float) -> None:
+    """Reject a cut range that does not fit inside the video."""
+    if start_time >= duration:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Start time ({start_time}s) must be less than video duration ({duration:.2f}s)"
         )
-        
-        # Process video
-        output_path = operation.process()
-        
-        # Upload processed video to S3
-        processed_id = str(uuid.uuid4())
-        processed_filename = f"{processed_id}.mp4"
-        s3_key = f"processed/{processed_filename}"
-        
-        with open(output_path, "rb") as f:
-            if not s3_service.upload_file(f, s3_key, "video/mp4"):
-                raise HTTPException(status_code=500, detail="Failed to upload processed video to S3")
-        
-        # Get processed video information
-        processed_info = BaseOperation.get_video_info(output_path)
-        
-        # Create database record for processed video
-        db_processed = ProcessedVideo(
-            processed_video_id=processed_id,
-            original_video_id=video_id,
-            filename=processed_filename,
-            s3_key=s3_key,
-            content_type="video/mp4",
-            operation_type="cut",
-            operation_params=params.dict(),
-            duration=processed_info["duration"],
-            width=processed_info["width"],
-            height=processed_info["height"],
-            fps=processed_info["fps"],
-            total_frames=processed_info["total_frames"]
+    if end_time > duration:
+        raise HTTPException(
+            status_code=400,
+            detail=f"End time ({end_time}s) must be less than or equal to video duration ({duration:.2f}s)"
         )
-        db.add(db_processed)
-        db.commit()
-        db.refresh(db_processed)
-        
-        # Clean up temporary files
-        os.remove(temp_input_path)
-        os.remove(output_path)
-        
+    if start_time >= end_time:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Start time ({start_time}s) must be less than end time ({end_time}s)"
+        )
+
+@app.post("/api/v1/videos/{video_id}/pipeline")
+async def pipeline_video(
+    video_id: str,
+    params: PipelineOperationParams,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply an ordered list of operations (cut, resize, crop, rotate, speed)
+    in a single decode/encode pass.
+    Returns a job ID for tracking the processing status.
+    """
+    db_video = await db.scalar(select(Video).where(Video.video_id == video_id))
+    if not db_video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    # Validate every stage against the source geometry before queueing
+    operation_params = params.dict()
+    try:
+        plan = PipelineOperation.plan(
+            operation_params["operations"],
+            db_video.width, db_video.height, db_video.total_frames, db_video.fps
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    return await enqueue_job(
+        db, background_tasks, db_video, "pipeline", operation_params,
+        total_frames=plan["output"][2]
+    )
+
+async def enqueue_job(db: AsyncSession, background_tasks: BackgroundTasks, db_video: Video,
+                      operation_type: str, operation_params: dict, total_frames: int) -> dict:
+    """
+    Persist a job and hand it to the worker pool once the response is sent.
+    
+    Identical requests (same source, canonical params and encoder settings)
+    reuse the existing job: finished ones return their result without doing
+    any work, and in-flight ones are coalesced. The lookup and insert await
+    the database, so enqueue_lock keeps concurrent requests in this process
+    from both missing and both inserting; jobs queued twice by separate
+    processes still share one output (see run_job).
+    """
+    async with enqueue_lock:
+        result, is_new = await _find_or_add_job(db, db_video, operation_type, operation_params, total_frames)
+        with StageTimer(operation_type).stage("db_commit"):
+            await db.commit()
+    
+    if is_new:
+        background_tasks.add_task(submit_job, result["job_id"])
+    return result
+
+async def _find_or_add_job(db: AsyncSession, db_video: Video, operation_type: str,
+                           operation_params: dict, total_frames: int) -> Tuple[dict, bool]:
+    """
+    Find a live job with the same fingerprint, or add a queued one to the
+    session (the caller commits, holding enqueue_lock).
+    
+    Returns:
+        Tuple of (response dict for the job, whether it was added)
+    """
+    fingerprint = OperationFactory.fingerprint(operation_type, db_video.video_id, operation_params, db_video.fps)
+    existing_job = await db.scalar(
+        select(Job)
+        .where(Job.fingerprint == fingerprint, Job.status != "failed")
+        .order_by(Job.created_at.desc())
+        .limit(1)
+    )
+    if existing_job:
         return {
-            "processed_video_id": processed_id,
-            "message": "Video processed successfully"
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            "job_id": existing_job.job_id,
+            "status": existing_job.status,
+            "processed_video_id": existing_job.processed_video_id,
+            "message": "Identical request already submitted"
+        }, False
+    
+    job_id = str(uuid.uuid4())
+    db.add(Job(
+        job_id=job_id,
+        video_id=db_video.video_id,
+        operation_type=operation_type,
+        operation_params=operation_params,
+        fingerprint=fingerprint,
+        status="queued",
+        frames_written=0,
+        total_frames=total_frames
+    ))
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "message": "Video queued for processing"
+    }, True
 
-@app.get("/api/v1/videos/{video_id}")
-async def get_video(video_id: str, db: Session = Depends(get_db)):
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db)):
     """
-    Get a processed video file.
+    Get the status and progress of a processing job.
     """
-    # Check both original and processed videos
-    db_video = db.query(Video).filter(Video.video_id == video_id).first()
-    db_processed = db.query(ProcessedVideo).filter(ProcessedVideo.processed_video_id == video_id).first()
+    db_job = await db.scalar(select(Job).where(Job.job_id == job_id))
+    if not db_job:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    if not db_video and not db_processed:
-        raise HTTPException(status_code=404, detail="Video not found")
+    return job_to_dict(db_job)
+
+@app.get("/api/v1/videos/{video_id}")
+async def get_video(video_id: str, request: Request, direct: bool = False,
+                    db: AsyncSession = Depends(get_db)):
+    """
+    Get a processed video file.
     
-    # Use processed video if available, otherwise use original
-    video_data = db_processed if db_processed else db_video
+    Redirects to a presigned S3 URL by default. With direct=true the bytes
+    are served by the API, honouring Range, If-None-Match and
+    If-Modified-Since, from the local cache when it holds the object and
+    from ranged S3 reads otherwise.
+    """
+    video_data = await _get_asset(db, video_id)
+    return await _video_response(request, video_data, direct)
+
+@app.get("/api/v1/videos/{video_id}/preview")
+async def get_video_preview(video_id: str, request: Request, direct: bool = False,
+                            db: AsyncSession = Depends(get_db)):
+    """
+    Get a low-resolution preview for scrubbing and choosing cut points:
+    the video's proxy rendition once it has been generated, and the video
+    itself until then (or for processed videos). Served like get_video.
+    """
+    video_data = await _get_asset(db, video_id)
+    if video_data.get("proxy_s3_key"):
+        video_data = {**video_data, "s3_key": video_data["proxy_s3_key"], "content_type": "video/mp4"}
+    return await _video_response(request, video_data, direct)
+
+async def _video_response(request: Request, video_data: dict, direct: bool) -> Response:
+    if direct:
+        return await _serve_video(request, video_data)
     
     # Generate presigned URL
-    url = s3_service.get_file_url(video_data.s3_key)
+    url = s3_service.get_file_url(video_data["s3_key"])
     if not url:
         raise HTTPException(status_code=500, detail="Failed to generate download URL")
     
     return RedirectResponse(url=url)
 
+async def _serve_video(request: Request, video_data: dict) -> Response:
+    """Serve a stored video with conditional and range request support."""
+    metadata = await run_in_threadpool(s3_service.get_metadata, video_data["s3_key"])
+    if not metadata:
+        raise HTTPException(status_code=500, detail="Failed to read video metadata")
+    
+    size = metadata["size"]
+    headers = {
+        "ETag": metadata["etag"],
+        "Last-Modified": http_date(metadata["last_modified"]),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": VIDEO_CACHE_CONTROL
+    }
+    
+    if is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since"),
+                       metadata["etag"], metadata["last_modified"]):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    
+    return StreamingResponse(
+        _iter_video_bytes(video_data["s3_key"], metadata["etag"], start, end),
+        status_code=status_code,
+        media_type=video_data["content_type"] or metadata["content_type"] or "video/mp4",
+        headers=headers
+    )
+
+def _iter_video_bytes(s3_key: str, etag: str, start: int, end: int):
+    """Yield a byte range from the local cache if the object is there, else from S3."""
+    if end < start:
+        return
+    chunk_size = S3_TRANSFER_SETTINGS["io_chunksize"]
+    with source_cache.open(s3_key, etag, download=False) as path:
+        if path:
+            yield from iter_file_range(path, start, end, chunk_size)
+            return
+    yield from s3_service.iter_range(s3_key, start, end, etag, chunk_size)
+
 @app.get("/api/v1/videos/{video_id}/info")
-async def get_video_info(video_id: str, db: Session = Depends(get_db)):
+async def get_video_info(video_id: str, db: AsyncSession = Depends(get_db)):
     """
     Get information about a video file.
     """
-    # Check both original and processed videos
-    db_video = db.query(Video).filter(Video.video_id == video_id).first()
-    db_processed = db.query(ProcessedVideo).filter(ProcessedVideo.processed_video_id == video_id).first()
+    video_data = await _get_asset(db, video_id)
     
-    if not db_video and not db_processed:
-        raise HTTPException(status_code=404, detail="Video not found")
+    return {
+        "video_id": video_data["video_id"],
+        "filename": video_data["filename"],
+        "content_type": video_data["content_type"],
+        "duration": video_data["duration"],
+        "width": video_data["width"],
+        "height": video_data["height"],
+        "fps": video_data["fps"],
+        "total_frames": video_data["total_frames"],
+        "created_at": video_data["created_at"],
+        "updated_at": video_data["updated_at"],
+        "operation_type": video_data["operation_type"],
+        "operation_params": video_data["operation_params"],
+        "has_proxy": bool(video_data.get("proxy_s3_key"))
+    }
+
+@app.get("/api/v1/videos/{video_id}/thumbnails")
+async def get_thumbnails(
+    video_id: str,
+    request: Request,
+    interval: float = Query(THUMBNAIL_SETTINGS["interval"], ge=0.1, description="Seconds between thumbnails"),
+    width: int = Query(THUMBNAIL_SETTINGS["width"], ge=16, le=1920, description="Thumbnail width in pixels"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get a WebVTT thumbnail track for scrubbing previews: one cue every
+    interval seconds, pointing at a tile of the sprite sheet served by
+    /api/v1/videos/{video_id}/thumbnails/sprite.jpg.
     
-    # Use processed video if available, otherwise use original
-    video_data = db_processed if db_processed else db_video
+    The sheet is rendered from keyframes on the first request, then kept
+    in S3 and the local cache by (video, interval, width).
+    """
+    thumbnails = await _get_thumbnails(db, video_id, interval, width)
+    return await _serve_generated_file(request, thumbnails["vtt_key"], thumbnails["vtt_etag"], "text/vtt")
+
+@app.get("/api/v1/videos/{video_id}/thumbnails/sprite.jpg")
+async def get_thumbnail_sprite(
+    video_id: str,
+    request: Request,
+    interval: float = Query(THUMBNAIL_SETTINGS["interval"], ge=0.1, description="Seconds between thumbnails"),
+    width: int = Query(THUMBNAIL_SETTINGS["width"], ge=16, le=1920, description="Thumbnail width in pixels"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the JPEG sprite sheet that the thumbnail track's cues point into.
+    """
+    thumbnails = await _get_thumbnails(db, video_id, interval, width)
+    return await _serve_generated_file(request, thumbnails["sprite_key"], thumbnails["sprite_etag"], "image/jpeg")
+
+async def _get_thumbnails(db: AsyncSession, video_id: str, interval: float, width: int) -> dict:
+    """S3 keys and ETags of a video's sprite sheet and WebVTT track, rendered on first use."""
+    return await thumbnail_cache.get_or_load_async(
+        f"{video_id}:{interval:g}:{width}", lambda: _load_thumbnails(db, video_id, interval, width)
+    )
+
+async def _load_thumbnails(db: AsyncSession, video_id: str, interval: float, width: int) -> dict:
+    video_data = await _get_asset(db, video_id)
+    prefix = f"thumbnails/{video_id}/{interval:g}_{width}"
+    sprite_key, vtt_key = f"{prefix}.jpg", f"{prefix}.vtt"
     
-    return {
-        "video_id": video_data.video_id if isinstance(video_data, Video) else video_data.processed_video_id,
-        "filename": video_data.filename,
-        "content_type": video_data.content_type,
-        "duration": video_data.duration,
-        "width": video_data.width,
-        "height": video_data.height,
-        "fps": video_data.fps,
-        "total_frames": video_data.total_frames,
-        "created_at": video_data.created_at,
-        "updated_at": video_data.updated_at,
-        "operation_type": getattr(video_data, "operation_type", None),
-        "operation_params": getattr(video_data, "operation_params", None)
+    # Requests that waited for the lock find the files the first one stored
+    async with thumbnail_locks.hold(prefix):
+        sprite_etag, vtt_etag = await asyncio.gather(
+            run_in_threadpool(s3_service.get_etag, sprite_key),
+            run_in_threadpool(s3_service.get_etag, vtt_key)
+        )
+        if not (sprite_etag and vtt_etag):
+            count = math.ceil(video_data["duration"] / interval)
+            if count > THUMBNAIL_SETTINGS["max_tiles"]:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Interval too short: {count} thumbnails, at most {THUMBNAIL_SETTINGS['max_tiles']}"
+                )
+            # The proxy's dense keyframes put every tile close to its time;
+            # its packet index is built from the proxy itself
+            source_key, frame_index = video_data.get("proxy_s3_key"), None
+            if not source_key:
+                source_key = video_data["s3_key"]
+                frame_index = await db.scalar(select(Video.frame_index).where(Video.video_id == video_id))
+            sprite_url = f"thumbnails/sprite.jpg?interval={interval:g}&width={width}"
+            try:
+                sprite_etag, vtt_etag = await run_in_threadpool(
+                    _render_thumbnails, source_key, frame_index, interval, width,
+                    sprite_key, vtt_key, sprite_url
+                )
+            except Exception as e:
+                logger.error(f"Thumbnail generation failed for {video_id}: {e}", exc_info=True)
+                raise HTTPException(status_code=500, detail="Failed to generate thumbnails")
+    
+    return {"sprite_key": sprite_key, "sprite_etag": sprite_etag, "vtt_key": vtt_key, "vtt_etag": vtt_etag}
+
+def _render_thumbnails(s3_key: str, frame_index: Optional[dict], interval: float, width: int,
+                       sprite_key: str, vtt_key: str, sprite_url: str) -> Tuple[str, str]:
+    """
+    Render a sprite sheet and WebVTT track from the source video, upload
+    both to S3 and keep local copies in the source cache.
+    
+    Returns:
+        (sprite ETag, WebVTT ETag)
+    """
+    with source_cache.open(s3_key) as path:
+        index = FrameIndex.from_dict(frame_index) if frame_index else FrameIndex.build(path)
+        sprite, cues = render_sprite(path, index, interval, width)
+    files = ((sprite_key, sprite, "image/jpeg"), (vtt_key, webvtt(cues, sprite_url).encode(), "text/vtt"))
+    
+    etags = []
+    for key, content, content_type in files:
+        if not s3_service.upload_file(io.BytesIO(content), key, content_type):
+            raise RuntimeError(f"Failed to upload {key} to S3")
+        etag = s3_service.get_etag(key)
+        if not etag:
+            raise RuntimeError(f"Failed to read S3 metadata for {key}")
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(content)
+        source_cache.put(key, etag, f.name)
+        etags.append(etag)
+    return etags[0], etags[1]
+
+@app.post("/api/v1/videos/{video_id}/hls")
+async def package_hls(
+    video_id: str,
+    params: HlsParams,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Package an original or processed video for HLS streaming: fixed-length
+    H.264 segments and playlists for each rendition, encoded from one decode
+    pass, stored in S3 and served from the playlist_url once the job is done.
+    Returns a job ID for tracking the packaging.
+    """
+    video_data = await _get_asset(db, video_id)
+    original_id = video_id
+    if video_data["operation_type"] is not None:
+        original_id = await db.scalar(
+            select(ProcessedVideo.original_video_id).where(ProcessedVideo.processed_video_id == video_id)
+        )
+    db_video = await db.scalar(select(Video).where(Video.video_id == original_id))
+    if not db_video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    operation_params = {
+        "renditions": params.renditions or HLS_SETTINGS["renditions"],
+        "segment_seconds": params.segment_seconds,
+        "codec": "h264",
+        "quality": params.quality or HLS_SETTINGS["quality"],
+        "preset": params.preset or HLS_SETTINGS["preset"]
     }
+    if original_id != video_id:
+        operation_params["source_id"] = video_id
+    try:
+        rendition_sizes(video_data["width"], video_data["height"], operation_params["renditions"])
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    result = await enqueue_job(
+        db, background_tasks, db_video, "hls", operation_params, total_frames=video_data["total_frames"]
+    )
+    
+    # Asking again for an earlier package makes it the one served
+    fingerprint = OperationFactory.fingerprint("hls", original_id, operation_params, db_video.fps)
+    prefix = package_prefix(video_id, fingerprint)
+    if result["status"] == "done" and video_data["hls_s3_prefix"] != prefix:
+        if original_id == video_id:
+            statement = update(Video).where(Video.video_id == video_id)
+        else:
+            statement = update(ProcessedVideo).where(ProcessedVideo.processed_video_id == video_id)
+        await db.execute(statement.values(hls_s3_prefix=prefix))
+        await db.commit()
+        metadata_cache.invalidate(video_id)
+    
+    result["playlist_url"] = f"/api/v1/videos/{video_id}/hls/{MASTER_PLAYLIST}"
+    return result
+
+@app.get("/api/v1/videos/{video_id}/hls/{path:path}")
+async def get_hls_file(video_id: str, path: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Serve a video's HLS package: master.m3u8, then {rendition}/index.m3u8
+    and its segments, which the playlists reference by relative URL.
+    Playlists are served by the API; segments redirect to presigned S3 URLs,
+    so segment bytes never pass through the API.
+    """
+    if not PACKAGE_PATH.fullmatch(path):
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    video_data = await _get_asset(db, video_id)
+    if not video_data["hls_s3_prefix"]:
+        # Packaging finishes in a worker process; look past the metadata cache
+        metadata_cache.invalidate(video_id)
+        video_data = await _get_asset(db, video_id)
+    if not video_data["hls_s3_prefix"]:
+        raise HTTPException(status_code=404, detail="Video has not been packaged for HLS")
+    s3_key = video_data["hls_s3_prefix"] + path
+    
+    if path.endswith(".ts"):
+        url = s3_service.get_file_url(s3_key)
+        if not url:
+            raise HTTPException(status_code=500, detail="Failed to generate download URL")
+        return RedirectResponse(url=url)
+    
+    etag = await run_in_threadpool(s3_service.get_etag, s3_key)
+    if not etag:
+        raise HTTPException(status_code=404, detail="Not found")
+    return await _serve_generated_file(request, s3_key, etag, CONTENT_TYPES[".m3u8"])
+
+async def _serve_generated_file(request: Request, s3_key: str, etag: str, media_type: str) -> Response:
+    """Serve a small generated file from the local cache (fetched from S3 on a miss)."""
+    headers = {"ETag": etag, "Cache-Control": VIDEO_CACHE_CONTROL}
+    if is_not_modified(request.headers.get("if-none-match"), None, etag, None):
+        return Response(status_code=304, headers=headers)
+    content = await run_in_threadpool(_read_cached, s3_key, etag)
+    return Response(content, media_type=media_type, headers=headers)
+
+def _read_cached(s3_key: str, etag: str) -> bytes:
+    with source_cache.open(s3_key, etag) as path:
+        with open(path, "rb") as f:
+            return f.read()
+
+async def _get_asset(db: AsyncSession, video_id: str) -> dict:
+    """Metadata of an original or processed video, from the cache or one query."""
+    video_data = await metadata_cache.get_or_load_async(video_id, lambda: find_asset(db, video_id))
+    if video_data is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    return video_data
 
 @app.post("/api/trim-video")
 async def trim_video(
     video: UploadFile = File(...),
     startTime: str = Form(...),
-    endTime: str = Form(...)
+    endTime: str = Form(...),
+    mode: CutMode = Form(VIDEO_SETTINGS["cut_mode"]),
+    stream: bool = Form(False),
+    codec: Optional[Codec] = Form(None),
+    quality: Optional[Quality] = Form(None),
+    preset: Optional[Preset] = Form(None),
+    audio: bool = Form(True)
 ):
     """
     Trim a video file directly without storing it in the database.
-    Returns the trimmed video file.
+    Returns the trimmed video file, or with stream=true, fragmented MP4 that
+    is sent while it is being encoded. With audio=false the output is silent.
     """
+    # Before the upload is read
+    _validate_encoder_settings(mode, codec, quality, preset)
+    
     temp_input_path = None
     temp_output_path = None
     
     try:
-        logger.info(f"Received trim request - File: {video.filename}, Start: {startTime}, End: {endTime}")
+        logger.info(f"Received trim request - File: {video.filename}, Start: {startTime}, End: {endTime}, Mode: {mode}")
+        timer = StageTimer("trim")
         
         # Create temporary directory if it doesn't exist
         os.makedirs("/tmp", exist_ok=True)
@@ -290,15 +1226,13 @@ async def trim_video(
         # Save uploaded file temporarily
         temp_input_path = f"/tmp/input_{uuid.uuid4().hex}_{video.filename}"
         logger.debug(f"Saving uploaded file to: {temp_input_path}")
-        with open(temp_input_path, "wb") as f:
-            content = await video.read()
-            f.write(content)
-        logger.debug(f"File saved, size: {os.path.getsize(temp_input_path)} bytes")
+        file_size = await _stream_to_path(video, temp_input_path, MAX_FILE_SIZE)
+        logger.debug(f"File saved, size: {file_size} bytes")
 
         # Get video duration first
         logger.debug("Getting video info...")
-        video_info = BaseOperation.get_video_info(temp_input_path)
-        logger.info(f"Video info: {video_info}")
+        video_info = await run_in_threadpool(timer.timed("probe", probe_video), temp_input_path)
+        logger.debug(f"Video info: {video_info}")
         
         start_time = float(startTime)
         end_time = float(endTime)
@@ -320,17 +1254,35 @@ async def trim_video(
 
         # Create cut operation
         logger.debug("Creating cut operation...")
-        operation = OperationFactory.create_operation(
+        operation = await run_in_threadpool(
+            timer.timed("probe", OperationFactory.create_operation),
             "cut",
             temp_input_path,
             start_time=start_time,
-            end_time=end_time
+            end_time=end_time,
+            mode=mode,
+            codec=codec,
+            quality=quality,
+            preset=preset,
+            audio=audio
         )
 
-        # Process video
+        if stream:
+            logger.debug("Streaming processed video...")
+            response = StreamingResponse(
+                stream_from_thread(operation.stream),
+                media_type="video/mp4",
+                headers={"Content-Disposition": f'attachment; filename="trimmed_{video.filename}"'},
+                background=BackgroundTasks()
+            )
+            response.background.add_task(cleanup_files, temp_input_path, None)
+            return response
+
+        # Process video off the event loop so concurrent requests keep being served
         logger.debug("Processing video...")
-        temp_output_path = operation.process()
-        logger.info(f"Video processed successfully, output at: {temp_output_path}")
+        temp_output_path = await run_in_threadpool(timer.timed("process", operation.process))
+        timer.record_operation(operation)
+        timer.log(logger, "Trim done", mode=mode, frames=operation.frames_written, bytes=file_size)
 
         # Return the processed video file
         logger.debug("Returning processed video...")
@@ -340,6 +1292,8 @@ async def trim_video(
             filename=f"trimmed_{video.filename}",
             background=BackgroundTasks()
         )
+        if operation.notes:
+            response.headers["X-Processing-Notes"] = "; ".join(operation.notes)
         
         # Add cleanup of files as a background task
         response.background.add_task(cleanup_files, temp_input_path, temp_output_path)
@@ -361,6 +1315,80 @@ async def trim_video(
         cleanup_files(temp_input_path, temp_output_path)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _probe_video(path: str) -> dict:
+    """Read a local video's container metadata and build its packet index."""
+    video_info = probe_video(path)
+    video_info["frame_index"] = FrameIndex.build(path).to_dict()
+    return video_info
+
+async def _stream_to_path(upload: UploadFile, path: str, max_size: int,
+                          chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """
+    Copy an upload to a local file one chunk at a time, writing in the
+    threadpool, and stop as soon as it exceeds max_size.
+    
+    Returns:
+        int: Number of bytes written
+    """
+    size = 0
+    f = await run_in_threadpool(open, path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(status_code=400, detail="File too large")
+            await run_in_threadpool(f.write, chunk)
+    finally:
+        await run_in_threadpool(f.close)
+    count_bytes("client_upload")(size)
+    return size
+
+def _probe_stored_video(s3_key: str) -> dict:
+    """
+    Read an S3 object's container metadata with ranged GETs instead of
+    downloading it. The packet index is left to the first job on the video,
+    which needs the whole file anyway.
+    """
+    reader = s3_service.open_object(s3_key)
+    if reader is None:
+        raise RuntimeError(f"Failed to read S3 metadata for {s3_key}")
+    video_info = probe_fileobj(reader, reader.size, cache_key=f"s3:{s3_key}:{reader.etag}")
+    video_info["frame_index"] = None
+    return video_info
+
+async def _stream_body_to(request: Request, file_obj, max_size: int,
+                          chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """
+    Copy a raw request body to a file in chunk_size writes made in the
+    threadpool, and stop as soon as it exceeds max_size.
+    
+    Returns:
+        int: Number of bytes written
+    """
+    size = 0
+    buffer = bytearray()
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(status_code=400, detail="Request body too large")
+        buffer += chunk
+        if len(buffer) >= chunk_size:
+            await run_in_threadpool(file_obj.write, buffer)
+            buffer.clear()
+    if buffer:
+        await run_in_threadpool(file_obj.write, buffer)
+    count_bytes("client_upload")(size)
+    return size
+
+def _spool_to_path(file_obj, path: str, chunk_size: int = 1024 * 1024):
+    """Copy a spooled upload to a local file in fixed-size chunks."""
+    file_obj.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(file_obj, f, chunk_size)
+
 def cleanup_files(input_path, output_path):
     """Helper function to clean up temporary files"""
     if input_path and os.path.exists(input_path):
@@ -368,6 +1396,23 @@ def cleanup_files(input_path, output_path):
     if output_path and os.path.exists(output_path):
         os.remove(output_path)
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus metrics of the API and its job workers: per-stage latency
+    histograms, frames processed, bytes transferred, jobs in flight and
+    temporary disk usage.
+    """
+    # Passed as a header: media_type would append a second charset
+    return Response(await run_in_threadpool(render_metrics), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+@app.get("/api/v1/cache/stats")
+async def get_cache_stats():
+    """
+    Get hit/miss/eviction counters for the local source video cache.
+    """
+    return await run_in_threadpool(source_cache.stats)
+
 @app.get("/")
 async def root():
     """
@@ -0,0 +1,69 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from video_editing_api.config import METADATA_CACHE_SETTINGS
+
+class MetadataCache:
+    """
+    In-process LRU cache of video metadata dicts with a time-to-live.
+
+    Writes made through this process invalidate their entries directly.
+    Rows changed by other processes (job workers, other API replicas) are
+    picked up once their entry expires, so the TTL bounds staleness.
+    Misses are not cached, so newly inserted videos are visible at once.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = METADATA_CACHE_SETTINGS["ttl"] if ttl is None else ttl
+        self.max_entries = max_entries or METADATA_CACHE_SETTINGS["max_entries"]
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: str, load: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached value for key, calling load() on a miss.
+
+        Cached values are shared between requests; treat them as read-only.
+        """
+        now = time.monotonic()
+        found, value = self._lookup(key, now)
+        if not found:
+            value = load()
+            self._store(key, value, now)
+        return value
+
+    async def get_or_load_async(self, key: str,
+                                load: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        """get_or_load for a coroutine loader, such as an AsyncSession query."""
+        now = time.monotonic()
+        found, value = self._lookup(key, now)
+        if not found:
+            value = await load()
+            self._store(key, value, now)
+        return value
+
+    def _lookup(self, key: str, now: float) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(key)
+                return True, entry[0]
+        return False, None
+
+    def _store(self, key: str, value: Optional[Dict[str, Any]], now: float) -> None:
+        if value is None or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
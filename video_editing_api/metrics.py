@@ -0,0 +1,161 @@
+import os
+import glob
+import time
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from video_editing_api.config import SOURCE_CACHE_DIR
+
+# prometheus_client picks its storage on import: with a multiprocess directory,
+# every process (the API's and the job workers they spawn) writes its samples
+# to files there
+_MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Request and job stages, from a cache hit (milliseconds) to a long encode
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+STAGE_SECONDS = Histogram(
+    "video_stage_seconds",
+    "Time spent in each stage of a request or job: s3_download, probe, decode, "
+    "encode, process (the whole operation), s3_upload and db_commit",
+    ["operation", "stage"],
+    buckets=STAGE_BUCKETS
+)
+FRAMES_PROCESSED = Counter(
+    "video_frames_processed_total",
+    "Frames written by operations; rate() of it is frames per second",
+    ["operation"]
+)
+BYTES_TRANSFERRED = Counter(
+    "video_bytes_transferred_total",
+    "Bytes moved to and from S3 and received from clients",
+    ["direction"]
+)
+JOBS_IN_FLIGHT = Gauge(
+    "video_jobs_in_flight",
+    "Jobs running in worker processes",
+    ["operation"],
+    multiprocess_mode="livesum"
+)
+
+class StageTimer:
+    """
+    Times the stages of one request or job. Each stage is observed in
+    STAGE_SECONDS as it ends, and the per-stage totals are kept for the
+    request's log line. Safe to use from several threads.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name: str, fn: Callable) -> Callable:
+        """fn, timed as stage name on every call (for functions run on other threads)."""
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def record(self, name: str, seconds: float) -> None:
+        STAGE_SECONDS.labels(self.operation, name).observe(seconds)
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def record_operation(self, operation) -> None:
+        """Record the decode and encode time an operation measured, and the frames it wrote."""
+        for name, seconds in operation.stage_seconds.items():
+            self.record(name, seconds)
+        FRAMES_PROCESSED.labels(self.operation).inc(operation.frames_written)
+
+    def log(self, logger: logging.Logger, message: str, **fields) -> None:
+        """Log message at INFO with the operation and its stage totals as structured fields."""
+        stages = {name: round(seconds, 4) for name, seconds in self.seconds.items()}
+        logger.info(message, extra={"operation": self.operation, "stage_seconds": stages, **fields})
+
+def count_bytes(direction: str) -> Callable[[int], None]:
+    """A callback adding the byte counts it is given to BYTES_TRANSFERRED (usable as a boto3 transfer Callback)."""
+    counter = BYTES_TRANSFERRED.labels(direction)
+
+    def add(amount: int) -> None:
+        # boto3 reports a retried chunk's bytes again as a negative amount
+        if amount > 0:
+            counter.inc(amount)
+    return add
+
+class TempDiskCollector:
+    """Disk used by temporary files and the source cache, measured when /metrics is scraped."""
+
+    def __init__(self, temp_dir: str = "/tmp", cache_dir: str = SOURCE_CACHE_DIR):
+        self.temp_dir = temp_dir
+        self.cache_dir = cache_dir
+
+    def collect(self):
+        usage = shutil.disk_usage(self.temp_dir)
+        disk = GaugeMetricFamily(
+            "video_temp_disk_bytes", "Space on the temporary file system", labels=["state"]
+        )
+        disk.add_metric(["used"], usage.used)
+        disk.add_metric(["free"], usage.free)
+        yield disk
+        yield GaugeMetricFamily(
+            "video_source_cache_bytes", "Size of the local source video cache",
+            value=_directory_size(self.cache_dir)
+        )
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                # Evicted or renamed while walking
+                continue
+    return total
+
+def multiprocess_enabled() -> bool:
+    """Whether prometheus_client was imported with PROMETHEUS_MULTIPROC_DIR set."""
+    return _MULTIPROCESS
+
+def render_metrics() -> bytes:
+    """
+    Every process's samples, merged, plus disk usage, in the Prometheus text
+    format. Without a multiprocess directory only this process is reported.
+    """
+    registry = CollectorRegistry()
+    if multiprocess_enabled():
+        MultiProcessCollector(registry)
+    else:
+        registry.register(_ProcessMetrics())
+    registry.register(TempDiskCollector())
+    return generate_latest(registry)
+
+class _ProcessMetrics:
+    """This process's metrics, registered alongside TempDiskCollector in a scrape registry."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+def prepare_metrics_dir(path: str) -> None:
+    """
+    Create path, or delete the sample files earlier runs left in it. Run once
+    by the launcher before any API or job worker process starts: a worker
+    clearing it would delete the live samples of the workers already running.
+    """
+    os.makedirs(path, exist_ok=True)
+    for sample_file in glob.glob(os.path.join(path, "*.db")):
+        os.remove(sample_file)
@@ -0,0 +1,271 @@
+import os
+import copy
+import math
+import struct
+import hashlib
+import av
+import numpy as np
+from fractions import Fraction
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+from video_editing_api.config import PROBE_CACHE_ENTRIES
+from video_editing_api.metadata_cache import MetadataCache
+
+# Sample entry four-character codes and the FFmpeg codec names they map to
+MP4_CODECS = {
+    "avc1": "h264", "avc3": "h264", "hvc1": "hevc", "hev1": "hevc", "mp4v": "mpeg4",
+    "av01": "av1", "vp09": "vp9", "mp4a": "aac", "ac-3": "ac3", "ec-3": "eac3",
+    "Opus": "opus", "fLaC": "flac", ".mp3": "mp3", "alac": "alac", "jpeg": "mjpeg"
+}
+
+# Boxes walked on the way to the sample tables; everything else is skipped
+MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+# Content read from each end of a file to fingerprint it
+FINGERPRINT_BYTES = 64 * 1024
+
+# Probe results by file fingerprint; they never go stale, so entries only age out by LRU
+_probe_cache = MetadataCache(ttl=math.inf, max_entries=PROBE_CACHE_ENTRIES)
+
+def probe_video(video_path: str) -> dict:
+    """
+    Read a video's metadata from its container headers, without decoding.
+
+    MP4/MOV files are answered from the moov box alone (the sample tables
+    hold every frame's duration and sync flag), so the cost does not grow
+    with the size of the media data. Other containers fall back to a
+    packet-only demux. Results are memoized by file fingerprint.
+
+    Returns:
+        dict with "duration" (exact, seconds), "fps" (average), "width",
+        "height", "total_frames", "keyframes" (count), "codec", "bit_rate"
+        (bits/s over the whole file), "rotation" (clockwise degrees to apply
+        for display), "format" and "audio_streams" (list of dicts with
+        "codec", "sample_rate", "channels", "duration" and "bit_rate")
+
+    Raises:
+        ValueError: If the file has no readable video stream
+    """
+    info = _probe_cache.get_or_load(file_fingerprint(video_path), lambda: _probe(video_path))
+    # Callers add their own fields; keep the cached copy pristine
+    return copy.deepcopy(info)
+
+def probe_fileobj(f: BinaryIO, size: int, cache_key: Optional[str] = None) -> dict:
+    """
+    probe_video for a seekable binary file object, such as a ranged reader
+    over an S3 object. MP4/MOV only reads the boxes on the way to the moov
+    box; the demux fallback reads the whole stream.
+
+    Args:
+        f: Seekable binary file object
+        size: Size of the file in bytes
+        cache_key: Memoizes the result under this key (e.g. S3 key and ETag)
+            when given
+
+    Returns:
+        dict: As for probe_video
+    """
+    if cache_key is None:
+        return _probe_file(f, size)
+    info = _probe_cache.get_or_load(cache_key, lambda: _probe_file(f, size))
+    return copy.deepcopy(info)
+
+def file_fingerprint(video_path: str) -> str:
+    """
+    Hash of a file's size and its first and last FINGERPRINT_BYTES, which is
+    where containers keep their headers and indexes.
+    """
+    size = os.path.getsize(video_path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(video_path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(size - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _probe(video_path: str) -> dict:
+    with open(video_path, "rb") as f:
+        return _probe_file(f, os.fstat(f.fileno()).st_size)
+
+def _probe_file(f: BinaryIO, size: int) -> dict:
+    try:
+        info = _probe_mp4(f, size)
+    except (struct.error, ValueError, IndexError):
+        info = None
+    if info is None:
+        f.seek(0)
+        info = _probe_demux(f)
+
+    info["bit_rate"] = int(size * 8 / info["duration"]) if info["duration"] else None
+    return info
+
+def _boxes(f, start: int, end: int):
+    """Yield (type, payload start, payload end) for the ISO BMFF boxes in [start, end)."""
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            raise ValueError("Corrupt box size")
+        yield box_type, position + header, min(position + size, end)
+        position += size
+
+def _read_box(f, start: int, end: int) -> bytes:
+    f.seek(start)
+    return f.read(end - start)
+
+def _probe_mp4(f: BinaryIO, size: int) -> Optional[dict]:
+    """Parse the moov box of an MP4/MOV file; None if it is not one or has no samples there."""
+    top = list(_boxes(f, 0, size))
+    if not top or top[0][0] not in (b"ftyp", b"wide", b"free", b"mdat", b"moov"):
+        return None
+    moov = next(((start, end) for box_type, start, end in top if box_type == b"moov"), None)
+    if moov is None:
+        return None
+    tracks = [_parse_track(f, start, end) for box_type, start, end in _boxes(f, *moov) if box_type == b"trak"]
+
+    video = next((track for track in tracks if track["handler"] == "vide" and track["samples"]), None)
+    if video is None:
+        # Fragmented MP4 keeps its samples in moof boxes
+        return None
+
+    duration = video["sample_duration"] / video["timescale"]
+    return {
+        "format": "mp4",
+        "duration": duration,
+        "fps": video["samples"] / duration,
+        "width": video["width"],
+        "height": video["height"],
+        "total_frames": video["samples"],
+        "keyframes": video["sync_samples"],
+        "codec": video["codec"],
+        "rotation": video["rotation"],
+        "audio_streams": [
+            {
+                "codec": track["codec"],
+                "sample_rate": track["sample_rate"],
+                "channels": track["channels"],
+                "duration": track["sample_duration"] / track["timescale"],
+                "bit_rate": int(track["bytes"] * 8 * track["timescale"] / track["sample_duration"])
+                            if track["sample_duration"] else None
+            }
+            for track in tracks if track["handler"] == "soun"
+        ]
+    }
+
+def _parse_track(f, start: int, end: int) -> Dict[str, Any]:
+    """Collect the fields probe_video needs from one trak box."""
+    track = {"handler": None, "codec": None, "timescale": 1, "samples": 0, "sample_duration": 0,
+             "sync_samples": None, "bytes": 0, "width": 0, "height": 0, "rotation": 0,
+             "sample_rate": None, "channels": None}
+
+    def walk(start: int, end: int) -> None:
+        for box_type, box_start, box_end in _boxes(f, start, end):
+            if box_type in MP4_CONTAINERS:
+                walk(box_start, box_end)
+            elif box_type == b"tkhd":
+                _parse_tkhd(_read_box(f, box_start, box_end), track)
+            elif box_type == b"mdhd":
+                data = _read_box(f, box_start, box_end)
+                track["timescale"] = struct.unpack_from(">I", data, 20 if data[0] == 1 else 12)[0]
+            elif box_type == b"hdlr":
+                track["handler"] = _read_box(f, box_start, box_end)[8:12].decode("latin-1")
+            elif box_type == b"stsd":
+                _parse_stsd(_read_box(f, box_start, box_end), track)
+            elif box_type == b"stts":
+                data = _read_box(f, box_start, box_end)
+                count = struct.unpack_from(">I", data, 4)[0]
+                entries = np.frombuffer(data, dtype=">u4", count=count * 2, offset=8).reshape(-1, 2).astype(np.int64)
+                track["samples"] = int(entries[:, 0].sum())
+                track["sample_duration"] = int((entries[:, 0] * entries[:, 1]).sum())
+            elif box_type == b"stss":
+                track["sync_samples"] = struct.unpack_from(">I", _read_box(f, box_start, box_start + 8), 4)[0]
+            elif box_type == b"stsz":
+                data = _read_box(f, box_start, box_end)
+                sample_size, count = struct.unpack_from(">II", data, 4)
+                if sample_size:
+                    track["bytes"] = sample_size * count
+                else:
+                    track["bytes"] = int(np.frombuffer(data, dtype=">u4", count=count, offset=12).sum(dtype=np.int64))
+
+    walk(start, end)
+    if track["sync_samples"] is None:
+        # No sync sample table: every sample is a keyframe
+        track["sync_samples"] = track["samples"]
+    return track
+
+def _parse_tkhd(data: bytes, track: Dict[str, Any]) -> None:
+    # Matrix and size follow the version-dependent times, duration and reserved fields
+    offset = 4 + (32 if data[0] == 1 else 20) + 16
+    a, b = struct.unpack_from(">ii", data, offset)
+    width, height = struct.unpack_from(">II", data, offset + 36)
+    track["rotation"] = int(round(math.degrees(math.atan2(b, a)))) % 360
+    track["width"], track["height"] = width >> 16, height >> 16
+
+def _parse_stsd(data: bytes, track: Dict[str, Any]) -> None:
+    # First sample entry: size, format, 6 reserved bytes, data reference index
+    fourcc = data[12:16].decode("latin-1")
+    track["codec"] = MP4_CODECS.get(fourcc, fourcc)
+    entry = data[16:]
+    if track["handler"] == "vide":
+        track["width"], track["height"] = struct.unpack_from(">HH", entry, 24)
+    elif track["handler"] == "soun":
+        track["channels"] = struct.unpack_from(">H", entry, 16)[0]
+        track["sample_rate"] = struct.unpack_from(">I", entry, 24)[0] >> 16
+
+def _probe_demux(source: Union[str, BinaryIO]) -> dict:
+    """Probe any container FFmpeg reads by demuxing its video packets (no decoding)."""
+    name = source if isinstance(source, str) else getattr(source, "name", "stream")
+    with av.open(source) as container:
+        if not container.streams.video:
+            raise ValueError(f"No video stream found in {name}")
+        stream = container.streams.video[0]
+        audio_streams: List[Dict[str, Any]] = [
+            {
+                "codec": audio.codec_context.name,
+                "sample_rate": audio.codec_context.sample_rate,
+                "channels": audio.codec_context.channels,
+                "duration": float(audio.duration * audio.time_base) if audio.duration else None,
+                "bit_rate": audio.codec_context.bit_rate or None
+            }
+            for audio in container.streams.audio
+        ]
+        container_format = container.format.name.split(",")[0]
+        width, height = stream.codec_context.width, stream.codec_context.height
+        codec = stream.codec_context.name
+        rotation = int(stream.metadata.get("rotate", 0)) % 360
+        time_base = stream.time_base
+        fps = stream.average_rate or stream.guessed_rate
+
+        frames, keyframes, first_pts, end_pts = 0, 0, None, None
+        for packet in container.demux(stream):
+            if packet.pts is None:
+                continue
+            frames += 1
+            keyframes += packet.is_keyframe
+            duration = packet.duration or (int(round(1 / (fps * time_base))) if fps else 0)
+            first_pts = packet.pts if first_pts is None else min(first_pts, packet.pts)
+            end_pts = packet.pts + duration if end_pts is None else max(end_pts, packet.pts + duration)
+
+    if not frames:
+        raise ValueError(f"No video frames found in {name}")
+
+    duration = float((end_pts - first_pts) * Fraction(time_base))
+    return {
+        "format": container_format,
+        "duration": duration,
+        "fps": frames / duration if duration else float(fps or 0),
+        "width": width,
+        "height": height,
+        "total_frames": frames,
+        "keyframes": keyframes,
+        "codec": codec,
+        "rotation": rotation,
+        "audio_streams": audio_streams
+    }
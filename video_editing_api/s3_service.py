@@ -1,12 +1,27 @@
 import boto3
+import io
 import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
-from typing import Optional, BinaryIO
+from typing import Dict, Iterator, List, Optional, BinaryIO, Tuple
+from video_editing_api.config import S3_TRANSFER_SETTINGS, PRESIGNED_URL_REFRESH_MARGIN
+from video_editing_api.metrics import count_bytes
+
+logger = logging.getLogger(__name__)
 
 class S3Service:
-    def __init__(self, bucket_name: str):
+    def __init__(self, bucket_name: str, transfer_settings: Optional[dict] = None):
         self.s3_client = boto3.client('s3')
         self.bucket_name = bucket_name
+        self.transfer_config = TransferConfig(**(transfer_settings or S3_TRANSFER_SETTINGS))
+        
+        # Presigned URLs by (s3_key, expiration): (url, expiry timestamp)
+        self._url_cache: Dict[Tuple[str, int], Tuple[str, float]] = {}
+        self._url_lock = threading.Lock()
 
     def upload_file(self, file_obj: BinaryIO, s3_key: str, content_type: str) -> bool:
         """
@@ -25,16 +40,170 @@ class S3Service:
                 file_obj,
                 self.bucket_name,
                 s3_key,
-                ExtraArgs={'ContentType': content_type}
+                ExtraArgs={'ContentType': content_type},
+                Config=self.transfer_config,
+                Callback=count_bytes("s3_upload")
+            )
+            return True
+        except ClientError as e:
+            logger.error(f"Error uploading file to S3: {e}")
+            return False
+
+    def upload_path(self, file_path: str, s3_key: str, content_type: str) -> bool:
+        """
+        Upload a local file to S3 as a multipart upload.
+        
+        Parts are read from disk lazily and sent concurrently, so memory use
+        is bounded by the transfer settings rather than the file size.
+        
+        Args:
+            file_path: Path of the local file to upload
+            s3_key: The S3 key (path) where the file will be stored
+            content_type: The content type of the file
+            
+        Returns:
+            bool: True if upload was successful, False otherwise
+        """
+        try:
+            self.s3_client.upload_file(
+                file_path,
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={'ContentType': content_type},
+                Config=self.transfer_config,
+                Callback=count_bytes("s3_upload")
             )
             return True
         except ClientError as e:
-            print(f"Error uploading file to S3: {e}")
+            logger.error(f"Error uploading file to S3: {e}")
+            return False
+
+    def create_multipart_upload(self, s3_key: str, content_type: str) -> Optional[str]:
+        """
+        Start a multipart upload whose parts are sent separately.
+        
+        Args:
+            s3_key: The S3 key (path) where the file will be stored
+            content_type: The content type of the file
+            
+        Returns:
+            str: The S3 upload ID if successful, None otherwise
+        """
+        try:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=s3_key, ContentType=content_type
+            )
+            return response['UploadId']
+        except ClientError as e:
+            logger.error(f"Error starting multipart upload to S3: {e}")
+            return None
+
+    def upload_part(self, s3_key: str, upload_id: str, part_number: int, body: BinaryIO,
+                    content_length: int, content_md5: Optional[str] = None) -> Optional[str]:
+        """
+        Upload one part of a multipart upload. Parts may be sent concurrently
+        and in any order; sending a part number again replaces it.
+        
+        Args:
+            s3_key: The S3 key (path) of the upload
+            upload_id: The S3 upload ID
+            part_number: 1-based part number
+            body: Readable file-like object positioned at the part's first byte
+            content_length: Number of bytes in the part
+            content_md5: Base64 MD5 of the part, checked by S3 if given
+            
+        Returns:
+            str: The part's ETag if successful, None otherwise
+        """
+        params = {
+            'Bucket': self.bucket_name, 'Key': s3_key, 'UploadId': upload_id,
+            'PartNumber': part_number, 'Body': body, 'ContentLength': content_length
+        }
+        if content_md5:
+            params['ContentMD5'] = content_md5
+        try:
+            etag = self.s3_client.upload_part(**params)['ETag']
+            count_bytes("s3_upload")(content_length)
+            return etag
+        except ClientError as e:
+            logger.error(f"Error uploading part to S3: {e}")
+            return None
+
+    def list_parts(self, s3_key: str, upload_id: str) -> Optional[List[dict]]:
+        """
+        List the parts S3 has received for a multipart upload.
+        
+        Args:
+            s3_key: The S3 key (path) of the upload
+            upload_id: The S3 upload ID
+            
+        Returns:
+            list: Dicts with PartNumber, ETag and Size, in part order, or None
+            if the upload does not exist
+        """
+        parts = []
+        try:
+            paginator = self.s3_client.get_paginator('list_parts')
+            for page in paginator.paginate(Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id):
+                parts.extend(
+                    {'PartNumber': part['PartNumber'], 'ETag': part['ETag'], 'Size': part['Size']}
+                    for part in page.get('Parts', [])
+                )
+            return parts
+        except ClientError as e:
+            logger.error(f"Error listing multipart upload parts in S3: {e}")
+            return None
+
+    def complete_multipart_upload(self, s3_key: str, upload_id: str, parts: List[dict]) -> bool:
+        """
+        Assemble the uploaded parts into the final object.
+        
+        Args:
+            s3_key: The S3 key (path) of the upload
+            upload_id: The S3 upload ID
+            parts: Dicts with PartNumber and ETag, in part order
+            
+        Returns:
+            bool: True if the object was created, False otherwise
+        """
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': [
+                    {'PartNumber': part['PartNumber'], 'ETag': part['ETag']} for part in parts
+                ]}
+            )
+            return True
+        except ClientError as e:
+            logger.error(f"Error completing multipart upload to S3: {e}")
+            return False
+
+    def abort_multipart_upload(self, s3_key: str, upload_id: str) -> bool:
+        """
+        Abort a multipart upload and free the parts stored for it.
+        
+        Args:
+            s3_key: The S3 key (path) of the upload
+            upload_id: The S3 upload ID
+            
+        Returns:
+            bool: True if the upload was aborted, False otherwise
+        """
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id)
+            return True
+        except ClientError as e:
+            logger.error(f"Error aborting multipart upload to S3: {e}")
             return False
 
     def download_file(self, s3_key: str) -> Optional[bytes]:
         """
-        Download a file from S3.
+        Download a file from S3 into memory.
+        
+        Prefer download_to_path or download_fileobj for videos; this holds
+        the whole object in memory.
         
         Args:
             s3_key: The S3 key (path) of the file to download
@@ -44,11 +213,132 @@ class S3Service:
         """
         try:
             response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
-            return response['Body'].read()
+            body = response['Body'].read()
+            count_bytes("s3_download")(len(body))
+            return body
         except ClientError as e:
-            print(f"Error downloading file from S3: {e}")
+            logger.error(f"Error downloading file from S3: {e}")
             return None
 
+    def download_to_path(self, s3_key: str, file_path: str) -> bool:
+        """
+        Download a file from S3 straight to disk.
+        
+        Large objects are fetched as concurrent ranged GETs and written in
+        small chunks, so memory use does not grow with the object size.
+        
+        Args:
+            s3_key: The S3 key (path) of the file to download
+            file_path: Local path to write the file to
+            
+        Returns:
+            bool: True if download was successful, False otherwise
+        """
+        try:
+            self.s3_client.download_file(
+                self.bucket_name,
+                s3_key,
+                file_path,
+                Config=self.transfer_config,
+                Callback=count_bytes("s3_download")
+            )
+            return True
+        except ClientError as e:
+            logger.error(f"Error downloading file from S3: {e}")
+            return False
+
+    def download_fileobj(self, s3_key: str, file_obj: BinaryIO) -> bool:
+        """
+        Download a file from S3 into a writable file-like object in chunks.
+        
+        Args:
+            s3_key: The S3 key (path) of the file to download
+            file_obj: Writable binary file-like object
+            
+        Returns:
+            bool: True if download was successful, False otherwise
+        """
+        try:
+            self.s3_client.download_fileobj(
+                self.bucket_name,
+                s3_key,
+                file_obj,
+                Config=self.transfer_config,
+                Callback=count_bytes("s3_download")
+            )
+            return True
+        except ClientError as e:
+            logger.error(f"Error downloading file from S3: {e}")
+            return False
+
+    def get_etag(self, s3_key: str) -> Optional[str]:
+        """
+        Get the ETag of an object without downloading it.
+        
+        Args:
+            s3_key: The S3 key (path) of the file
+            
+        Returns:
+            str: The object's ETag if it exists, None otherwise
+        """
+        metadata = self.get_metadata(s3_key)
+        return metadata['etag'] if metadata else None
+
+    def get_metadata(self, s3_key: str) -> Optional[dict]:
+        """
+        Get an object's metadata without downloading it.
+        
+        Args:
+            s3_key: The S3 key (path) of the file
+            
+        Returns:
+            dict: etag, size, last_modified (datetime) and content_type if
+            the object exists, None otherwise
+        """
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+            return {
+                'etag': response['ETag'],
+                'size': response['ContentLength'],
+                'last_modified': response['LastModified'],
+                'content_type': response.get('ContentType')
+            }
+        except ClientError as e:
+            logger.error(f"Error reading file metadata from S3: {e}")
+            return None
+
+    def iter_range(self, s3_key: str, start: int, end: int, etag: Optional[str] = None,
+                   chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Stream bytes start..end (inclusive) of an object with a ranged GET.
+        
+        Args:
+            s3_key: The S3 key (path) of the file
+            start, end: First and last byte offsets to read
+            etag: If given, the read fails rather than mixing in bytes of a
+                replaced object
+            chunk_size: Size of the chunks yielded
+            
+        Yields:
+            bytes: Consecutive chunks of the range
+            
+        Raises:
+            ClientError: If the read fails, including part way through, so
+                a response streaming the range is aborted, not cut short
+        """
+        params = {'Bucket': self.bucket_name, 'Key': s3_key, 'Range': f"bytes={start}-{end}"}
+        if etag:
+            params['IfMatch'] = etag
+        try:
+            response = self.s3_client.get_object(**params)
+            counted = count_bytes("s3_download")
+            for chunk in response['Body'].iter_chunks(chunk_size or S3_TRANSFER_SETTINGS['io_chunksize']):
+                counted(len(chunk))
+                yield chunk
+        except ClientError as e:
+            logger.error(f"Error reading file range from S3: {e}")
+            raise
+
     def delete_file(self, s3_key: str) -> bool:
         """
         Delete a file from S3.
@@ -61,15 +351,21 @@ class S3Service:
         """
         try:
             self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
+            with self._url_lock:
+                for cache_key in [k for k in self._url_cache if k[0] == s3_key]:
+                    del self._url_cache[cache_key]
             return True
         except ClientError as e:
-            print(f"Error deleting file from S3: {e}")
+            logger.error(f"Error deleting file from S3: {e}")
             return False
 
     def get_file_url(self, s3_key: str, expiration: int = 3600) -> Optional[str]:
         """
         Generate a presigned URL for temporary access to a file.
         
+        URLs are reused until they are within PRESIGNED_URL_REFRESH_MARGIN
+        seconds of expiring, so hot videos are not re-signed on every request.
+        
         Args:
             s3_key: The S3 key (path) of the file
             expiration: URL expiration time in seconds (default: 1 hour)
@@ -77,13 +373,206 @@ class S3Service:
         Returns:
             str: The presigned URL if successful, None otherwise
         """
+        now = time.time()
+        with self._url_lock:
+            cached = self._url_cache.get((s3_key, expiration))
+        if cached and cached[1] - now > min(PRESIGNED_URL_REFRESH_MARGIN, expiration / 2):
+            return cached[0]
+        
         try:
             url = self.s3_client.generate_presigned_url(
                 'get_object',
                 Params={'Bucket': self.bucket_name, 'Key': s3_key},
                 ExpiresIn=expiration
             )
+            with self._url_lock:
+                self._url_cache[(s3_key, expiration)] = (url, now + expiration)
             return url
         except ClientError as e:
-            print(f"Error generating presigned URL: {e}")
-            return None 
\ No newline at end of file
+            logger.error(f"Error generating presigned URL: {e}")
+            return None 
+
+    def generate_upload_post(self, s3_key: str, content_type: str, size: int,
+                             expiration: int = 3600) -> Optional[dict]:
+        """
+        Generate a presigned POST that lets a client upload one object
+        straight to S3 (up to 5 GB). The policy pins the content type and
+        requires the body to be exactly size bytes.
+        
+        Args:
+            s3_key: The S3 key (path) where the file will be stored
+            content_type: The content type the client must send
+            size: Exact size of the file in bytes
+            expiration: Policy expiration time in seconds
+            
+        Returns:
+            dict: "url" and the form "fields" to send with the file, None on error
+        """
+        try:
+            return self.s3_client.generate_presigned_post(
+                self.bucket_name,
+                s3_key,
+                Fields={'Content-Type': content_type},
+                Conditions=[{'Content-Type': content_type}, ['content-length-range', size, size]],
+                ExpiresIn=expiration
+            )
+        except ClientError as e:
+            logger.error(f"Error generating presigned POST: {e}")
+            return None
+
+    def generate_upload_url(self, s3_key: str, content_type: str, expiration: int = 3600) -> Optional[str]:
+        """
+        Generate a presigned PUT URL for uploading one object straight to S3.
+        The client must send the same Content-Type header.
+        
+        Args:
+            s3_key: The S3 key (path) where the file will be stored
+            content_type: The content type the client must send
+            expiration: URL expiration time in seconds
+            
+        Returns:
+            str: The presigned URL if successful, None otherwise
+        """
+        try:
+            return self.s3_client.generate_presigned_url(
+                'put_object',
+                Params={'Bucket': self.bucket_name, 'Key': s3_key, 'ContentType': content_type},
+                ExpiresIn=expiration
+            )
+        except ClientError as e:
+            logger.error(f"Error generating presigned upload URL: {e}")
+            return None
+
+    def generate_part_url(self, s3_key: str, upload_id: str, part_number: int,
+                          expiration: int = 3600) -> Optional[str]:
+        """
+        Generate a presigned PUT URL for one part of a multipart upload.
+        
+        Args:
+            s3_key: The S3 key (path) of the upload
+            upload_id: The S3 upload ID
+            part_number: 1-based part number
+            expiration: URL expiration time in seconds
+            
+        Returns:
+            str: The presigned URL if successful, None otherwise
+        """
+        try:
+            return self.s3_client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': self.bucket_name, 'Key': s3_key,
+                    'UploadId': upload_id, 'PartNumber': part_number
+                },
+                ExpiresIn=expiration
+            )
+        except ClientError as e:
+            logger.error(f"Error generating presigned part URL: {e}")
+            return None
+
+    def open_object(self, s3_key: str, block_size: int = 512 * 1024) -> Optional["S3RangeReader"]:
+        """
+        Open an object as a seekable, read-only file backed by ranged GETs.
+        
+        Args:
+            s3_key: The S3 key (path) of the file
+            block_size: Bytes fetched per block (see S3RangeReader)
+            
+        Returns:
+            S3RangeReader: Reader pinned to the object's current ETag, or None
+            if the object does not exist
+        """
+        metadata = self.get_metadata(s3_key)
+        if not metadata:
+            return None
+        return S3RangeReader(self, s3_key, metadata['size'], metadata['etag'], block_size)
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable read-only file over an S3 object, read with ranged GETs.
+    
+    Reads are served from block_size-aligned blocks; consecutive missing
+    blocks are fetched in one request and the most recent max_blocks are
+    kept, so parsers that hop between a file's headers and its index fetch
+    each region once instead of downloading the object. Every read is
+    pinned to the ETag, so a replaced object fails rather than mixing bytes.
+    """
+
+    def __init__(self, s3_service: S3Service, s3_key: str, size: int, etag: Optional[str] = None,
+                 block_size: int = 512 * 1024, max_blocks: int = 16):
+        self.s3_service = s3_service
+        self.s3_key = s3_key
+        self.name = s3_key
+        self.size = size
+        self.etag = etag
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.requests = 0
+        self._position = 0
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Negative seek position")
+        self._position = offset
+        return offset
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes (all remaining when negative); short only at the end of the object."""
+        end = self.size if size is None or size < 0 else min(self.size, self._position + size)
+        if end <= self._position:
+            return b""
+        first, last = self._position // self.block_size, (end - 1) // self.block_size
+        blocks = self._get_blocks(first, last)
+        data = b"".join(blocks)
+        offset = self._position - first * self.block_size
+        chunk = data[offset:offset + end - self._position]
+        self._position = end
+        return chunk
+
+    def readinto(self, buffer) -> int:
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def _get_blocks(self, first: int, last: int) -> List[bytes]:
+        blocks = {index: self._blocks[index] for index in range(first, last + 1) if index in self._blocks}
+        index = first
+        while index <= last:
+            if index in blocks:
+                index += 1
+                continue
+            # Fetch the whole run of missing blocks in one request
+            run_end = index
+            while run_end + 1 <= last and run_end + 1 not in blocks:
+                run_end += 1
+            start = index * self.block_size
+            stop = min(self.size, (run_end + 1) * self.block_size)
+            data = b"".join(self.s3_service.iter_range(self.s3_key, start, stop - 1, self.etag))
+            self.requests += 1
+            if len(data) != stop - start:
+                raise IOError(f"Failed to read bytes {start}-{stop - 1} of {self.s3_key}")
+            for block in range(index, run_end + 1):
+                offset = (block - index) * self.block_size
+                blocks[block] = data[offset:offset + self.block_size]
+            index = run_end + 1
+
+        for index in range(first, last + 1):
+            self._blocks[index] = blocks[index]
+            self._blocks.move_to_end(index)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return [blocks[index] for index in range(first, last + 1)]
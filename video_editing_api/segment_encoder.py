@@ -0,0 +1,196 @@
+import os
+import av
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fractions import Fraction
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from video_editing_api.config import SEGMENT_SETTINGS
+from video_editing_api.audio import AudioTrack
+from video_editing_api.encoders import VideoEncoder
+from video_editing_api.frame_index import BgrConverter
+
+def split_segments(start_frame: int, end_frame: int, keyframe_indices: List[int],
+                   segment_frames: int) -> List[Tuple[int, int]]:
+    """
+    Split [start_frame, end_frame) into consecutive ranges that each start on
+    a source keyframe (apart from the first) and span at least segment_frames.
+    """
+    segments = []
+    segment_start = start_frame
+    for index in keyframe_indices:
+        if index <= segment_start or index >= end_frame:
+            continue
+        if index - segment_start >= segment_frames:
+            segments.append((segment_start, index))
+            segment_start = index
+    segments.append((segment_start, end_frame))
+    return segments
+
+def encode_segment(video_path: str, output_path: Any, start_pts: int, end_pts: Optional[int],
+                   first_index: int, fps: float, frame_size: Tuple[int, int],
+                   codec: Optional[str] = None, quality: Optional[str] = None,
+                   preset: Optional[str] = None, threads: int = 0,
+                   container_options: Optional[Dict[str, str]] = None,
+                   audio: Optional[AudioTrack] = None) -> int:
+    """
+    Decode frames with start_pts <= pts < end_pts and encode them to output_path
+    (a path, or a writable file object) with a VideoEncoder, as MP4 muxed with
+    container_options, interleaved with audio if given.
+
+    Frames reach the encoder as BGR arrays converted by BgrConverter, exactly
+    as the frame pipeline of a serial reencode cut feeds them, so both paths
+    encode the same pixels. They are numbered from first_index, their
+    position in the whole output (MPEG-4 writes each frame's timestamp into
+    the bitstream).
+
+    Returns:
+        int: Number of frames encoded
+    """
+    writer = VideoEncoder(
+        output_path, fps, frame_size, codec=codec, quality=quality, preset=preset, audio=audio,
+        first_frame=first_index, threads=threads, container_options=container_options
+    )
+    converter, image = BgrConverter(), None
+    try:
+        with av.open(video_path) as source:
+            in_stream = source.streams.video[0]
+            source.seek(start_pts, stream=in_stream, backward=True)
+            for frame in source.decode(in_stream):
+                if frame.pts < start_pts:
+                    continue
+                if end_pts is not None and frame.pts >= end_pts:
+                    break
+                image = converter.convert(frame, image)
+                writer.write(image)
+    finally:
+        writer.release()
+    return writer.frames
+
+class SegmentEncoder:
+    """
+    Re-encode a frame range by splitting it into keyframe-aligned segments,
+    encoding them in a process pool and concatenating the packets.
+
+    Every segment is encoded with the same encoder settings, so they share
+    codec headers, and each one starts on a keyframe of its own. With one
+    worker (or a range too short to split) the whole range is encoded
+    in-process as a single segment.
+    """
+
+    def __init__(self, video_path: str, frame_pts: List[int], keyframe_pts: List[int],
+                 fps: float, frame_size: Tuple[int, int], codec: Optional[str] = None,
+                 quality: Optional[str] = None, preset: Optional[str] = None,
+                 workers: Optional[int] = None, segment_frames: Optional[int] = None):
+        """
+        Args:
+            video_path: Source video
+            frame_pts, keyframe_pts: Output of BaseOperation._scan_packets
+            fps, frame_size: Frame rate and (width, height) of the output
+            codec, quality, preset: Encoder settings (see encoders.py)
+            workers: Encoder processes (1 encodes serially in this process)
+            segment_frames: Minimum frames per segment
+        """
+        self.video_path = video_path
+        self.frame_pts = frame_pts
+        self.keyframe_pts = keyframe_pts
+        self.fps = fps
+        self.frame_size = frame_size
+        self.codec, self.quality, self.preset = codec, quality, preset
+        self.workers = workers or SEGMENT_SETTINGS["workers"]
+        self.segment_frames = segment_frames or SEGMENT_SETTINGS["segment_frames"]
+
+    def segments(self, start_frame: int, end_frame: int) -> List[Tuple[int, int]]:
+        """The (start, end) frame ranges the cut will be encoded as."""
+        if self.workers <= 1:
+            return [(start_frame, end_frame)]
+        index_of = {pts: index for index, pts in enumerate(self.frame_pts)}
+        keyframe_indices = sorted(index_of[pts] for pts in self.keyframe_pts)
+        return split_segments(start_frame, end_frame, keyframe_indices, self.segment_frames)
+
+    def run(self, start_frame: int, end_frame: int, output_path: str,
+            on_segment: Optional[Callable[[int], None]] = None,
+            audio: Optional[AudioTrack] = None) -> int:
+        """
+        Encode [start_frame, end_frame) to output_path.
+
+        Args:
+            on_segment: Called with the frame count of each segment as it finishes
+            audio: Audio muxed in while the segments are concatenated
+
+        Returns:
+            int: Number of frames written
+        """
+        segments = self.segments(start_frame, end_frame)
+        base = os.path.splitext(output_path)[0]
+        parts = [f"{base}.part{number}.mp4" for number in range(len(segments))]
+        # Pool workers encode single-threaded: the segments are the parallelism
+        threads = 0 if len(segments) == 1 else 1
+        jobs = [
+            (self.video_path, part, self.frame_pts[start], self._pts(end), start - start_frame,
+             self.fps, self.frame_size, self.codec, self.quality, self.preset, threads)
+            for (start, end), part in zip(segments, parts)
+        ]
+
+        try:
+            if len(jobs) == 1:
+                frames = encode_segment(*jobs[0])
+                if on_segment:
+                    on_segment(frames)
+            else:
+                # Spawn rather than fork, as for the job pool: this may run
+                # inside a worker that holds DB connections and S3 clients.
+                with ProcessPoolExecutor(
+                    max_workers=min(self.workers, len(jobs)),
+                    mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    futures = [executor.submit(encode_segment, *job) for job in jobs]
+                    for future in as_completed(futures):
+                        if on_segment:
+                            on_segment(future.result())
+                    for future in futures:
+                        future.result()
+
+            return self._concatenate(parts, output_path, audio)
+        finally:
+            for part in parts:
+                if os.path.exists(part):
+                    os.remove(part)
+
+    def _pts(self, index: int) -> Optional[int]:
+        """Presentation timestamp of a frame index, or None past the last frame."""
+        return self.frame_pts[index] if index < len(self.frame_pts) else None
+
+    def _concatenate(self, parts: List[str], output_path: str, audio: Optional[AudioTrack] = None) -> int:
+        """Remux the segments' packets back to back, shifting their timestamps, and interleave the audio."""
+        frames = 0
+        with av.open(parts[0]) as first, av.open(output_path, "w") as output:
+            template = first.streams.video[0]
+            out_stream = output.add_stream(template=template)
+            time_base = Fraction(1, 1) / template.average_rate
+            if audio:
+                audio.attach(output)
+
+            for part in parts:
+                offset = None
+                with av.open(part) as segment:
+                    for packet in segment.demux(segment.streams.video[0]):
+                        # The demuxer yields an empty flush packet at EOF
+                        if packet.dts is None:
+                            continue
+                        # A segment's first packet is its keyframe, which is
+                        # also its earliest frame. Shifting pts and dts alike
+                        # keeps any B-frame reordering within the segment;
+                        # the packet keeps its own time base, which its
+                        # duration (read-only here) is counted in
+                        if offset is None:
+                            offset = int(round(frames * time_base / packet.time_base)) - packet.pts
+                        packet.pts += offset
+                        packet.dts += offset
+                        packet.stream = out_stream
+                        output.mux(packet)
+                        frames += 1
+                        if audio:
+                            audio.mux_until(frames * time_base)
+            if audio:
+                audio.mux_until(None)
+        return frames
@@ -0,0 +1,36 @@
+"""
+Start the API under uvicorn with metrics collected from every process.
+
+Usage:
+    python -m video_editing_api.serve [--host 0.0.0.0] [--port 8000] [--workers 1]
+
+Sets PROMETHEUS_MULTIPROC_DIR (default METRICS_DIR) and empties it before
+uvicorn starts, so the API workers and the job worker processes they spawn
+all inherit it and /metrics merges their samples. Started with plain
+`uvicorn`, /metrics only reports the process that serves the scrape.
+"""
+import os
+import argparse
+
+import uvicorn
+
+from video_editing_api.config import METRICS_DIR
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes")
+    args = parser.parse_args()
+
+    # Before anything imports prometheus_client, which reads it on import
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", METRICS_DIR)
+    from video_editing_api.metrics import prepare_metrics_dir
+    prepare_metrics_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+    uvicorn.run("video_editing_api.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
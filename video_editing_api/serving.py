@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterator, Optional, Tuple
+
+class RangeNotSatisfiable(Exception):
+    """The Range header asks for bytes outside the object."""
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "bytes=" Range header.
+
+    Args:
+        header: The Range header value, if any
+        size: Size of the object in bytes
+
+    Returns:
+        (start, end) inclusive byte offsets, or None to send the whole object
+        (no header, or a form this server does not handle such as multiple ranges)
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the object
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+def is_not_modified(if_none_match: Optional[str], if_modified_since: Optional[str],
+                    etag: str, last_modified: datetime) -> bool:
+    """
+    Evaluate conditional GET headers (RFC 9110: If-None-Match takes
+    precedence, and If-Modified-Since is ignored when it is present).
+    """
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison: W/"x" matches "x"
+        return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None or last_modified.tzinfo is None:
+            return False
+        # HTTP dates have whole-second precision
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def http_date(value: datetime) -> str:
+    """Format a timezone-aware datetime for Last-Modified."""
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def iter_file_range(path: str, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+    """Yield bytes start..end (inclusive) of a local file."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,101 @@
+import queue
+import logging
+import threading
+from typing import AsyncIterator, Callable, Optional
+from fastapi.concurrency import run_in_threadpool
+from video_editing_api.config import STREAMING_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the byte stream on the queue
+_END = object()
+
+class StreamCancelled(Exception):
+    """Raised in the producer thread when the client has gone away."""
+
+class ChunkStream:
+    """
+    Write-only file object whose bytes are read back by an async consumer.
+
+    A producer thread (e.g. a muxer) writes into a bounded queue, so a slow
+    client applies backpressure instead of the output piling up in memory.
+    """
+
+    def __init__(self, buffered_chunks: Optional[int] = None):
+        self.queue = queue.Queue(maxsize=buffered_chunks or STREAMING_SETTINGS["buffered_chunks"])
+        self.cancelled = threading.Event()
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        while True:
+            if self.cancelled.is_set():
+                raise StreamCancelled()
+            try:
+                self.queue.put(chunk, timeout=0.1)
+                return len(chunk)
+            except queue.Full:
+                continue
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """
+        Signal the end of the stream, or with error, that it failed; never
+        blocks on a full queue.
+        """
+        while True:
+            try:
+                self.queue.put(_END if error is None else error, timeout=0.1)
+                return
+            except queue.Full:
+                if self.cancelled.is_set():
+                    return
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """
+        Yield the written chunks until the stream ends.
+
+        Raises:
+            Exception: The producer's error, if it failed
+        """
+        while True:
+            chunk = await run_in_threadpool(self.queue.get)
+            if chunk is _END:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+
+def stream_from_thread(produce: Callable[[ChunkStream], None]) -> AsyncIterator[bytes]:
+    """
+    Run produce(stream) on a background thread and yield what it writes.
+
+    If the consumer stops early (the client disconnected), the producer's
+    next write raises StreamCancelled so it stops encoding. If the producer
+    fails, its error is logged and re-raised by the iterator: after the first
+    byte the response status can no longer change, but the response is
+    aborted rather than ended, so the client never mistakes a truncated
+    output for a complete one.
+    """
+    stream = ChunkStream()
+
+    def run() -> None:
+        error = None
+        try:
+            produce(stream)
+        except StreamCancelled:
+            pass
+        except Exception as e:
+            logger.error(f"Streaming failed: {str(e)}", exc_info=True)
+            error = e
+        finally:
+            stream.finish(error)
+
+    async def iterate() -> AsyncIterator[bytes]:
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            async for chunk in stream.chunks():
+                yield chunk
+        finally:
+            stream.cancelled.set()
+
+    return iterate()
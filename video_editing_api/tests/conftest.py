@@ -0,0 +1,92 @@
+import os
+import tempfile
+import av
+import cv2
+import numpy as np
+import pytest
+from fractions import Fraction
+
+# Settings are read when video_editing_api.config is imported, so they are set
+# here, before any test module imports it: fake credentials for moto (tests
+# never reach AWS) and a scratch database and source cache
+_scratch_dir = tempfile.mkdtemp(prefix="video_editing_api_tests_")
+os.environ.update({
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_SESSION_TOKEN": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "S3_BUCKET_NAME": "video-editing-api-tests",
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_scratch_dir}/video_editing.db",
+    "SOURCE_CACHE_DIR": os.path.join(_scratch_dir, "video_cache")
+})
+
+
+@pytest.fixture
+def make_video(tmp_path):
+    """
+    Factory for synthetic test videos in tmp_path, returning the file's path.
+
+    Frame i is filled with colour (i, 0, 255 - i) (mod 256) and, with label,
+    shows its number, so every frame differs; with noise, frames are seeded
+    random pixels instead, which compress badly and so make large files. codec "mp4v" writes through
+    OpenCV like the videos users upload; any other codec (an FFmpeg encoder
+    name) or an audio track writes through PyAV, with encoder options and a
+    440 Hz stereo tone at audio_rate interleaved frame by frame.
+    """
+    def make(name="test_video.mp4", seconds=10, fps=30, size=(320, 240), codec="mp4v", label=True,
+             gop_size=None, options=None, audio_rate=None, noise=False):
+        path = str(tmp_path / name)
+        width, height = size
+        rng = np.random.default_rng(0)
+        frames = (
+            rng.integers(0, 256, (height, width, 3), dtype=np.uint8) if noise else _video_frame(i, width, height, label)
+            for i in range(int(fps * seconds))
+        )
+
+        if codec == "mp4v" and not audio_rate:
+            out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+            for frame in frames:
+                out.write(frame)
+            out.release()
+            return path
+
+        with av.open(path, "w") as container:
+            video = container.add_stream("mpeg4" if codec == "mp4v" else codec, rate=fps)
+            video.width, video.height, video.pix_fmt = width, height, "yuv420p"
+            if gop_size:
+                video.codec_context.gop_size = gop_size
+            if options:
+                video.options = options
+            if audio_rate:
+                audio = container.add_stream("aac", rate=audio_rate)
+                audio.layout = "stereo"
+
+            samples = 0
+            for i, image in enumerate(frames):
+                frame = av.VideoFrame.from_ndarray(image, format="bgr24")
+                frame.pts = i
+                container.mux(video.encode(frame))
+                if audio_rate:
+                    # Audio up to the end of this frame
+                    until = (i + 1) * audio_rate // fps
+                    t = np.arange(samples, until) / audio_rate
+                    tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+                    chunk = av.AudioFrame.from_ndarray(np.stack([tone, tone]), format="fltp", layout="stereo")
+                    chunk.sample_rate = audio_rate
+                    chunk.pts = samples
+                    chunk.time_base = Fraction(1, audio_rate)
+                    container.mux(audio.encode(chunk))
+                    samples = until
+            container.mux(video.encode(None))
+            if audio_rate:
+                container.mux(audio.encode(None))
+        return path
+
+    return make
+
+
+def _video_frame(i, width, height, label):
+    frame = np.full((height, width, 3), (i % 256, 0, 255 - i % 256), dtype=np.uint8)
+    if label:
+        cv2.putText(frame, str(i), (width // 4, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+    return frame
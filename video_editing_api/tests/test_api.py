@@ -1,53 +1,36 @@
 import os
-import cv2
-import numpy as np
+import json
+import time
+import asyncio
+import boto3
 import pytest
+import requests
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.testclient import TestClient
-from video_editing_api.main import app
-from video_editing_api.config import UPLOAD_DIR, PROCESSED_DIR
+from moto import mock_aws
+from video_editing_api import jobs, main
+from video_editing_api.main import app, s3_service, MULTIPART_OVERHEAD
+from video_editing_api.config import MAX_FILE_SIZE, S3_BUCKET_NAME, PROXY_SETTINGS
 
 client = TestClient(app)
 
+@pytest.fixture(scope="module", autouse=True)
+def app_lifespan():
+    """
+    Run the app against a moto S3 bucket, with jobs on worker threads (pool
+    processes would not see the mock), around its startup and shutdown.
+    """
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket=S3_BUCKET_NAME)
+        jobs._executor = ThreadPoolExecutor(max_workers=2, initializer=jobs._init_worker)
+        with client:
+            yield
+
 @pytest.fixture
-def test_video():
-    """Create a test video file."""
-    test_video_path = os.path.join(UPLOAD_DIR, "test_video.mp4")
-    
-    # Create a test video using OpenCV
-    width, height = 640, 480
-    fps = 30
-    duration = 10  # seconds
-    
-    # Create video writer
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(test_video_path, fourcc, fps, (width, height))
-    
-    # Generate frames
-    for _ in range(fps * duration):
-        # Create a colored frame with some text
-        frame = np.zeros((height, width, 3), dtype=np.uint8)
-        frame[:] = (0, 0, 255)  # Red background
-        cv2.putText(frame, 'Test Video', (width//4, height//2),
-                   cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 2)
-        out.write(frame)
-    
-    out.release()
-    return test_video_path
-
-@pytest.fixture(autouse=True)
-def cleanup():
-    """Clean up test files after each test."""
-    yield
-    for file in os.listdir(UPLOAD_DIR):
-        try:
-            os.remove(os.path.join(UPLOAD_DIR, file))
-        except:
-            pass
-    for file in os.listdir(PROCESSED_DIR):
-        try:
-            os.remove(os.path.join(PROCESSED_DIR, file))
-        except:
-            pass
+def test_video(make_video):
+    """A 10 second 30 fps 640x480 test video."""
+    return make_video(size=(640, 480))
 
 def test_root_endpoint():
     """Test the root endpoint."""
@@ -81,24 +64,164 @@ def test_cut_video(test_video):
         }
     )
     assert response.status_code == 200
-    assert "processed_video_id" in response.json()
-    return response.json()["processed_video_id"]
+    assert "job_id" in response.json()
+    
+    # Wait for the worker pool to finish the job
+    job_id = response.json()["job_id"]
+    for _ in range(60):
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+    assert job["status"] == "done"
+    assert job["progress"] == 1.0
+    assert job["notes"] == []
+    return job["processed_video_id"]
 
 def test_get_video(test_video):
     """Test getting a processed video."""
     # First upload and process a video
     processed_id = test_cut_video(test_video)
     
-    # Test getting the processed video
-    response = client.get(f"/api/v1/videos/{processed_id}")
+    # Test getting the processed video: a redirect to S3, or the bytes with direct=true
+    response = client.get(f"/api/v1/videos/{processed_id}", follow_redirects=False)
+    assert response.status_code == 307
+    assert S3_BUCKET_NAME in response.headers["location"]
+    response = client.get(f"/api/v1/videos/{processed_id}?direct=true")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "video/mp4"
+
+def test_direct_range_aborts_when_s3_read_fails(test_video, monkeypatch):
+    """A ranged response whose S3 read fails is aborted, never sent short of its Content-Length."""
+    video_id = test_upload_video(test_video)
+    response = client.get(f"/api/v1/videos/{video_id}?direct=true", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"].startswith("bytes 100-199/")
+    assert len(response.content) == 100
+    
+    # Metadata of an object that has since been replaced: the read pinned to its ETag fails
+    metadata = s3_service.get_metadata
+    monkeypatch.setattr(s3_service, "get_metadata", lambda key: {**metadata(key), "etag": '"replaced"'})
+    with pytest.raises(ClientError):
+        client.get(f"/api/v1/videos/{video_id}?direct=true", headers={"Range": "bytes=100-199"})
+
+def test_upload_generates_proxy(test_video):
+    """Uploads queue a proxy rendition that previews switch to once it is done."""
+    with open(test_video, "rb") as f:
+        response = client.post(
+            "/api/v1/videos/upload",
+            files={"file": ("test_video.mp4", f, "video/mp4")}
+        )
+    video_id, job_id = response.json()["video_id"], response.json()["proxy_job_id"]
+    for _ in range(60):
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+    assert job["status"] == "done"
+    assert job["operation_type"] == "proxy"
+    
+    response = client.get(f"/api/v1/videos/{video_id}/preview?direct=true")
     assert response.status_code == 200
     assert response.headers["content-type"] == "video/mp4"
+    assert int(response.headers["content-length"]) < os.path.getsize(test_video)
+
+def test_hls_packaging(test_video):
+    """A packaged video serves its master playlist, media playlists and segments."""
+    video_id = test_upload_video(test_video)
+    response = client.post(f"/api/v1/videos/{video_id}/hls", json={"renditions": [240, 120], "segment_seconds": 2})
+    assert response.status_code == 200
+    job_id, playlist_url = response.json()["job_id"], response.json()["playlist_url"]
+    for _ in range(60):
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+    assert job["status"] == "done"
+    
+    master = client.get(playlist_url)
+    assert master.status_code == 200
+    assert master.headers["content-type"] == "application/vnd.apple.mpegurl"
+    assert "120p/index.m3u8" in master.text
+    media = client.get(f"/api/v1/videos/{video_id}/hls/120p/index.m3u8")
+    assert "segment_00000.ts" in media.text
+    segment = client.get(f"/api/v1/videos/{video_id}/hls/120p/segment_00000.ts", follow_redirects=False)
+    assert segment.status_code in (302, 307)
+
+def test_extract_audio(make_video):
+    """Audio is extracted from a video with a soundtrack and the job finishes."""
+    video_id = test_upload_video(make_video(seconds=4, codec="libx264", audio_rate=48000))
+    response = client.post(f"/api/v1/videos/{video_id}/audio", json={"start_time": 1.0, "end_time": 3.0})
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+    for _ in range(60):
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+    assert job["status"] == "done", job["error"]
+    assert job["processed_video_id"]
+    assert job["notes"] == []
+
+def test_extract_audio_from_silent_video(test_video):
+    """The test video has no audio track, so extraction is queued and then fails."""
+    video_id = test_upload_video(test_video)
+    response = client.post(f"/api/v1/videos/{video_id}/audio", json={"start_time": 1.0, "end_time": 3.0})
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+    for _ in range(60):
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+    assert job["status"] == "failed"
+    assert "no audio" in job["error"]
+
+    response = client.post(f"/api/v1/videos/{video_id}/audio", json={"start_time": 60.0})
+    assert response.status_code == 400
 
 def test_invalid_video_id():
     """Test getting a non-existent video."""
     response = client.get("/api/v1/videos/nonexistent")
     assert response.status_code == 404
 
+def test_invalid_job_id():
+    """Test getting a non-existent job."""
+    response = client.get("/api/v1/jobs/nonexistent")
+    assert response.status_code == 404
+
+def test_batch_cut_video(test_video):
+    """Test cutting several clips in one request."""
+    video_id = test_upload_video(test_video)
+    cuts = [
+        {"start_time": 4.0, "end_time": 6.0},
+        {"start_time": 1.0, "end_time": 3.0},
+        {"start_time": 2.0, "end_time": 5.0},
+        {"start_time": 1.0, "end_time": 3.0}
+    ]
+    response = client.post(f"/api/v1/videos/{video_id}/cuts", json={"cuts": cuts})
+    assert response.status_code == 200
+    jobs = response.json()["jobs"]
+    assert [job["start_time"] for job in jobs] == [4.0, 1.0, 2.0, 1.0]
+    assert jobs[1]["job_id"] == jobs[3]["job_id"]
+    
+    for job in jobs:
+        for _ in range(60):
+            status = client.get(f"/api/v1/jobs/{job['job_id']}").json()
+            if status["status"] in ("done", "failed"):
+                break
+            time.sleep(0.5)
+        assert status["status"] == "done"
+
+def test_batch_cut_rejects_out_of_range_clip(test_video):
+    """One invalid clip rejects the whole batch."""
+    video_id = test_upload_video(test_video)
+    response = client.post(
+        f"/api/v1/videos/{video_id}/cuts",
+        json={"cuts": [{"start_time": 1.0, "end_time": 2.0}, {"start_time": 8.0, "end_time": 12.0}]}
+    )
+    assert response.status_code == 400
+
 def test_invalid_cut_parameters(test_video):
     """Test cutting with invalid parameters."""
     video_id = test_upload_video(test_video)
@@ -112,4 +235,168 @@ def test_invalid_cut_parameters(test_video):
             "output_format": "mp4"
         }
     )
-    assert response.status_code == 500 
\ No newline at end of file
+    assert response.status_code == 400 
+def test_cut_rejects_encoder_settings_for_copy_modes(test_video):
+    """copy and smart cuts keep the source's codec, so encoder settings are refused."""
+    video_id = test_upload_video(test_video)
+    for mode in ("copy", "smart"):
+        response = client.post(
+            f"/api/v1/videos/{video_id}/cut",
+            json={"start_time": 1.0, "end_time": 2.0, "mode": mode, "codec": "h264"}
+        )
+        assert response.status_code == 400
+        assert "codec" in response.json()["detail"]
+
+def test_trim_video_validates_form_fields(test_video):
+    """The trim form's mode and encoder fields are checked like the JSON bodies."""
+    with open(test_video, "rb") as f:
+        data = f.read()
+    for fields, status in [
+        ({"mode": "fast"}, 422),
+        ({"codec": "vp9"}, 422),
+        ({"quality": "best"}, 422),
+        ({"mode": "copy", "preset": "fast"}, 400),
+        ({"mode": "copy", "stream": "true", "codec": "hevc"}, 400)
+    ]:
+        response = client.post(
+            "/api/trim-video",
+            files={"video": ("test_video.mp4", data, "video/mp4")},
+            data={"startTime": "1", "endTime": "2", **fields}
+        )
+        assert response.status_code == status, fields
+
+def test_trim_video_rejects_oversize_upload():
+    """Test that a trim upload over MAX_FILE_SIZE is refused before processing."""
+    response = client.post(
+        "/api/trim-video",
+        files={"video": ("big.mp4", b"\0" * (MAX_FILE_SIZE + MULTIPART_OVERHEAD + 1), "video/mp4")},
+        data={"startTime": "0", "endTime": "1"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File too large"
+
+def test_trim_video_rejects_unlabelled_oversize_upload(monkeypatch):
+    """A chunked body without Content-Length is refused once it passes the limit, before it is all read."""
+    monkeypatch.setattr(main, "MAX_FILE_SIZE", 1024 * 1024)
+    head = (b'--limit\r\nContent-Disposition: form-data; name="video"; filename="big.mp4"\r\n'
+            b'Content-Type: video/mp4\r\n\r\n')
+    chunks = [head] + [b"\0" * 64 * 1024] * 160  # 10 MB
+    received, sent = [], []
+
+    async def receive():
+        received.append(chunks[len(received)])
+        return {"type": "http.request", "body": received[-1], "more_body": len(received) < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/trim-video", "raw_path": b"/api/trim-video", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=limit")],
+        "server": ("testserver", 80), "client": ("testclient", 50000)
+    }
+    asyncio.run(app(scope, receive, send))
+    assert sent[0]["status"] == 400
+    assert json.loads(sent[1]["body"])["detail"] == "File too large"
+    # Stopped just past the limit and its multipart allowance
+    assert len(received) < 20
+
+def test_resumable_upload(test_video):
+    """Test the init, PUT parts, complete upload flow."""
+    with open(test_video, "rb") as f:
+        data = f.read()
+    response = client.post("/api/v1/uploads", json={"filename": "test_video.mp4", "size": len(data)})
+    assert response.status_code == 200
+    upload = response.json()
+    part_size = upload["part_size"]
+    
+    # Nothing is complete until every part has arrived
+    assert client.get(f"/api/v1/uploads/{upload['upload_id']}").json()["missing_parts"] == \
+        list(range(1, upload["part_count"] + 1))
+    assert client.post(f"/api/v1/uploads/{upload['upload_id']}/complete").status_code == 400
+    
+    for part_number in range(1, upload["part_count"] + 1):
+        body = data[(part_number - 1) * part_size:part_number * part_size]
+        response = client.put(f"/api/v1/uploads/{upload['upload_id']}/parts/{part_number}", content=body)
+        assert response.status_code == 200
+    
+    response = client.post(f"/api/v1/uploads/{upload['upload_id']}/complete")
+    assert response.status_code == 200
+    assert response.json()["video_id"] == upload["video_id"]
+    info = client.get(f"/api/v1/videos/{upload['video_id']}/info").json()
+    assert info["total_frames"] == 300
+
+def test_resumable_upload_retries_failed_complete(test_video, monkeypatch):
+    """If S3 fails to assemble the parts, the upload is pending again and can be completed later."""
+    with open(test_video, "rb") as f:
+        data = f.read()
+    upload = client.post("/api/v1/uploads", json={"filename": "test_video.mp4", "size": len(data)}).json()
+    for part_number in range(1, upload["part_count"] + 1):
+        body = data[(part_number - 1) * upload["part_size"]:part_number * upload["part_size"]]
+        client.put(f"/api/v1/uploads/{upload['upload_id']}/parts/{part_number}", content=body)
+    
+    with monkeypatch.context() as m:
+        m.setattr(s3_service, "complete_multipart_upload", lambda *args: False)
+        response = client.post(f"/api/v1/uploads/{upload['upload_id']}/complete")
+    assert response.status_code == 500
+    assert client.get(f"/api/v1/uploads/{upload['upload_id']}").json()["status"] == "pending"
+    
+    response = client.post(f"/api/v1/uploads/{upload['upload_id']}/complete")
+    assert response.status_code == 200
+    assert response.json()["video_id"] == upload["video_id"]
+
+def test_resumable_upload_rejects_short_part():
+    """Test that a part must have exactly the planned length."""
+    size = 12 * 1024 * 1024
+    upload = client.post("/api/v1/uploads", json={"filename": "big.mp4", "size": size}).json()
+    response = client.put(f"/api/v1/uploads/{upload['upload_id']}/parts/1", content=b"\0" * 1024)
+    assert response.status_code == 400
+    assert client.delete(f"/api/v1/uploads/{upload['upload_id']}").json()["status"] == "aborted"
+
+def test_direct_upload(make_video, monkeypatch):
+    """
+    Upload straight to S3 with a presigned PUT, then complete: the upload is
+    checked and probed with ranged GETs, without downloading the object.
+    """
+    # Noise keeps the frames large, so the file spans many probe blocks
+    path = make_video("noise.mp4", seconds=3, noise=True)
+    with open(path, "rb") as f:
+        data = f.read()
+    # No proxy job, whose download would race with the probe's reads
+    monkeypatch.setitem(PROXY_SETTINGS, "enabled", False)
+    
+    upload = client.post(
+        "/api/v1/uploads/direct", json={"filename": "noise.mp4", "size": len(data), "method": "put"}
+    ).json()
+    assert client.get(f"/api/v1/uploads/{upload['upload_id']}").json()["received"] is False
+    assert client.post(f"/api/v1/uploads/{upload['upload_id']}/complete").status_code == 400
+    
+    assert requests.put(upload["url"], data=data, headers=upload["headers"]).status_code == 200
+    assert client.get(f"/api/v1/uploads/{upload['upload_id']}").json()["received"] is True
+    
+    ranges = []
+    
+    def record_range(params, **kwargs):
+        ranges.append(params.get("Range"))
+    
+    events = s3_service.s3_client.meta.events
+    events.register("provide-client-params.s3.GetObject", record_range)
+    try:
+        response = client.post(f"/api/v1/uploads/{upload['upload_id']}/complete")
+    finally:
+        events.unregister("provide-client-params.s3.GetObject", record_range)
+    assert response.status_code == 200
+    assert response.json()["video_id"] == upload["video_id"]
+    
+    assert ranges and all(r and r.startswith("bytes=") for r in ranges)
+    fetched = 0
+    for r in ranges:
+        first, last = map(int, r[len("bytes="):].split("-"))
+        fetched += min(last, len(data) - 1) - first + 1
+    assert fetched < len(data) / 2
+    
+    info = client.get(f"/api/v1/videos/{upload['video_id']}/info").json()
+    assert info["total_frames"] == 90
+    assert (info["width"], info["height"]) == (320, 240)
+    assert client.get(f"/api/v1/uploads/{upload['upload_id']}").json()["status"] == "complete"
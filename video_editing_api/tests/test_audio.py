@@ -0,0 +1,69 @@
+import av
+import pytest
+from video_editing_api.audio import AudioTrack
+from video_editing_api.video_processor import OperationFactory
+
+
+@pytest.fixture
+def test_video(make_video):
+    """A 10 second 30 fps 320x240 H.264 video with a 48 kHz stereo AAC track."""
+    return make_video(codec="libx264", gop_size=30, audio_rate=48000)
+
+
+def _durations(path):
+    """Duration in seconds of each stream, by type, from the container headers."""
+    with av.open(path) as container:
+        return {stream.type: float(stream.duration * stream.time_base) for stream in container.streams}
+
+
+@pytest.mark.parametrize("mode", ["reencode", "smart", "parallel"])
+def test_cut_keeps_sample_accurate_audio(test_video, mode):
+    """Exact cuts carry the audio of exactly the cut range."""
+    operation = OperationFactory.create_operation("cut", test_video, start_time=2.0, end_time=5.5, mode=mode)
+    durations = _durations(operation.process())
+    assert durations["audio"] == pytest.approx(3.5, abs=1 / 48000)
+    assert durations["video"] == pytest.approx(3.5, abs=1 / 30)
+
+
+def test_copy_cut_stream_copies_audio(test_video):
+    """copy mode never re-encodes: the audio packets are the source's."""
+    operation = OperationFactory.create_operation("cut", test_video, start_time=2.0, end_time=5.0, mode="copy")
+    output_path = operation.process()
+
+    with av.open(test_video) as source:
+        source_packets = {bytes(packet) for packet in source.demux(audio=0) if packet.size}
+    with av.open(output_path) as output:
+        output_packets = [bytes(packet) for packet in output.demux(audio=0) if packet.size]
+    assert output_packets and all(packet in source_packets for packet in output_packets)
+    # The video starts on a keyframe; the audio covers it, to the packet
+    durations = _durations(output_path)
+    assert durations["audio"] == pytest.approx(durations["video"], abs=1024 / 48000)
+
+
+def test_audio_track_copies_only_when_the_end_is_a_packet_boundary(test_video):
+    # AAC packets are 1024 samples long
+    assert AudioTrack(test_video, 0.0, 1024 * 10 / 48000).copy
+    assert not AudioTrack(test_video, 0.0, 1.0).copy
+    assert AudioTrack(test_video, 0.0, 1.0, exact=False).copy
+
+
+def test_cut_without_audio(test_video):
+    operation = OperationFactory.create_operation("cut", test_video, start_time=2.0, end_time=5.0, audio=False)
+    assert set(_durations(operation.process())) == {"video"}
+
+
+def test_extract_audio_writes_only_audio(test_video):
+    operation = OperationFactory.create_operation("extract_audio", test_video, start_time=1.0, end_time=4.0)
+    output_path = operation.process()
+
+    assert output_path.endswith(".m4a")
+    assert _durations(output_path) == {"audio": pytest.approx(3.0, abs=1 / 48000)}
+    assert operation.frames_written > 0
+
+
+def test_extract_audio_rejects_silent_videos(test_video):
+    silent_path = OperationFactory.create_operation(
+        "cut", test_video, start_time=0.0, end_time=2.0, audio=False
+    ).process()
+    with pytest.raises(ValueError, match="no audio"):
+        OperationFactory.create_operation("extract_audio", silent_path)
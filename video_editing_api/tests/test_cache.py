@@ -0,0 +1,136 @@
+import os
+import time
+import shutil
+import threading
+import pytest
+from video_editing_api.cache import SourceCache
+
+
+class FakeS3Service:
+    """In-memory stand-in for S3Service that counts downloads."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.downloads = 0
+        self.lock = threading.Lock()
+
+    def get_etag(self, s3_key):
+        return f'"{hash(self.objects[s3_key])}"' if s3_key in self.objects else None
+
+    def download_to_path(self, s3_key, file_path):
+        with self.lock:
+            self.downloads += 1
+        time.sleep(0.1)  # Give concurrent readers a chance to race
+        with open(file_path, "wb") as f:
+            f.write(self.objects[s3_key])
+        return True
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    path = str(tmp_path / "cache")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def test_hit_after_miss(cache_dir):
+    """A second read of the same object is served from disk."""
+    s3 = FakeS3Service({"videos/a.mp4": b"a" * 100})
+    cache = SourceCache(s3, cache_dir, max_bytes=1000)
+
+    with cache.open("videos/a.mp4") as path:
+        assert open(path, "rb").read() == b"a" * 100
+    with cache.open("videos/a.mp4") as path:
+        assert path.endswith(".mp4")
+
+    stats = cache.stats()
+    assert s3.downloads == 1
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+def test_concurrent_misses_download_once(cache_dir):
+    """Simultaneous readers of a missing object share one download."""
+    s3 = FakeS3Service({"videos/a.mp4": b"a" * 100})
+    cache = SourceCache(s3, cache_dir, max_bytes=1000)
+
+    def read():
+        with cache.open("videos/a.mp4") as path:
+            assert os.path.getsize(path) == 100
+
+    threads = [threading.Thread(target=read) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert s3.downloads == 1
+
+
+def test_lru_eviction_skips_pinned_entries(cache_dir):
+    """Least recently used entries are evicted, but never while in use."""
+    s3 = FakeS3Service({f"videos/{name}.mp4": name.encode() * 100 for name in "abc"})
+    cache = SourceCache(s3, cache_dir, max_bytes=250)
+
+    with cache.open("videos/a.mp4") as pinned_path:
+        with cache.open("videos/b.mp4"):
+            pass
+        with cache.open("videos/c.mp4"):
+            pass
+        # Over budget: "b" is the only unpinned entry other than the newest
+        assert os.path.exists(pinned_path)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_eviction_and_failed_downloads_remove_lock_files(cache_dir):
+    """Lock files go with their entry, so only live entries leave files behind."""
+    s3 = FakeS3Service({f"videos/{name}.mp4": name.encode() * 100 for name in "abc"})
+    cache = SourceCache(s3, cache_dir, max_bytes=250)
+
+    for name in "abc":
+        with cache.open(f"videos/{name}.mp4"):
+            pass
+    with cache.open("videos/a.mp4", etag='"missing"', download=False) as path:
+        assert path is None
+
+    s3.download_to_path = lambda s3_key, file_path: False
+    with pytest.raises(RuntimeError):
+        with cache.open("videos/a.mp4", etag='"changed"'):
+            pass
+
+    live = [os.path.basename(path) for path, _, _ in cache._entries()]
+    assert len(live) == 2
+    assert {name for name in os.listdir(cache_dir) if not name.startswith(".")} == {
+        name + suffix for name in live for suffix in ("", ".lock", ".download")
+    }
+
+
+def test_changed_etag_is_a_miss(cache_dir):
+    """Replacing an object in S3 invalidates its cache entry."""
+    s3 = FakeS3Service({"videos/a.mp4": b"old"})
+    cache = SourceCache(s3, cache_dir, max_bytes=1000)
+
+    with cache.open("videos/a.mp4"):
+        pass
+    s3.objects["videos/a.mp4"] = b"new"
+    with cache.open("videos/a.mp4") as path:
+        assert open(path, "rb").read() == b"new"
+
+    assert s3.downloads == 2
+
+
+def test_open_without_download_yields_none_on_miss(cache_dir):
+    """Lookups that must not block on S3 see misses as None."""
+    s3 = FakeS3Service({"videos/a.mp4": b"a" * 100})
+    cache = SourceCache(s3, cache_dir, max_bytes=1000)
+
+    with cache.open("videos/a.mp4", download=False) as path:
+        assert path is None
+    with cache.open("videos/a.mp4"):
+        pass
+    with cache.open("videos/a.mp4", download=False) as path:
+        assert open(path, "rb").read() == b"a" * 100
+
+    assert s3.downloads == 1
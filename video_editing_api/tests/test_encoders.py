@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+import pytest
+from video_editing_api.encoders import EncoderBackend, VideoEncoder, encoder_options, resolve_settings
+from video_editing_api.probe import probe_video
+from video_editing_api.video_processor import OperationFactory
+
+
+def write_clip(path, codec, quality, size=(320, 240), frames=30):
+    writer = VideoEncoder(path, 30, size, codec=codec, quality=quality)
+    rng = np.random.default_rng(0)
+    texture = cv2.GaussianBlur(rng.integers(0, 256, (size[1], size[0] * 2, 3), dtype=np.uint8), (0, 0), 2)
+    for i in range(frames):
+        writer.write(np.ascontiguousarray(texture[:, i * 4:i * 4 + size[0]]))
+    writer.release()
+
+
+def test_quality_maps_to_encoder_options():
+    assert encoder_options("h264", "high", "fast") == {"codec": "libx264", "crf": "19", "preset": "fast"}
+    assert encoder_options("h264", "low", "fast")["crf"] == "28"
+    assert encoder_options("mp4v", "medium", "fast") == {"codec": "mpeg4", "qmin": "5", "qmax": "5"}
+    with pytest.raises(ValueError):
+        resolve_settings(codec="vp8")
+
+
+def test_backends_must_define_options():
+    class Incomplete(EncoderBackend):
+        codec_name = "libx264"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_h264_is_smaller_than_mpeg4(tmp_path):
+    mpeg4_path, h264_path = str(tmp_path / "mpeg4.mp4"), str(tmp_path / "h264.mp4")
+    write_clip(mpeg4_path, "mp4v", "high")
+    write_clip(h264_path, "h264", "high")
+
+    info = probe_video(h264_path)
+    assert (info["codec"], info["total_frames"]) == ("h264", 30)
+    assert info["bit_rate"] < probe_video(mpeg4_path)["bit_rate"]
+
+
+def test_h264_drops_odd_row_and_column(tmp_path):
+    path = str(tmp_path / "odd.mp4")
+    write_clip(path, "h264", "low", size=(161, 121), frames=5)
+    info = probe_video(path)
+    assert (info["width"], info["height"], info["total_frames"]) == (160, 120, 5)
+
+
+def test_encoder_settings_change_fingerprint():
+    params = {"start_time": 1.0, "end_time": 2.0}
+    default = OperationFactory.fingerprint("cut", "video", params, 30.0)
+    assert OperationFactory.fingerprint("cut", "video", {**params, "codec": None}, 30.0) == default
+    assert OperationFactory.fingerprint("cut", "video", {**params, "codec": "hevc"}, 30.0) != default
+    assert OperationFactory.fingerprint("cut", "video", {**params, "quality": "low"}, 30.0) != default
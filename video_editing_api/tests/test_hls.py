@@ -0,0 +1,52 @@
+import os
+import av
+import pytest
+from video_editing_api.hls import (
+    MASTER_PLAYLIST, MEDIA_PLAYLIST, codec_string, parse_media_playlist, rendition_sizes
+)
+from video_editing_api.video_processor import HlsOperation, OperationFactory
+
+
+@pytest.fixture
+def test_video(make_video):
+    """A 10 second 30 fps 320x240 video whose frames all differ."""
+    return make_video()
+
+
+def test_rendition_sizes_keep_aspect_and_never_upscale():
+    assert rendition_sizes(1920, 1080, None) == [(1920, 1080)]
+    assert rendition_sizes(1920, 1080, [360, 2160, 720]) == [(1920, 1080), (1280, 720), (640, 360)]
+    assert rendition_sizes(320, 240, [121]) == [(160, 120)]
+    with pytest.raises(ValueError):
+        rendition_sizes(320, 240, [0])
+
+
+def test_codec_string_reads_the_sps():
+    assert codec_string(b"\x00\x00\x00\x01\x67\x64\x00\x1f\xac") == "avc1.64001f"
+
+
+def test_ladder_is_segmented_at_the_same_keyframes(test_video):
+    """Every rendition has fixed-length segments that decode on their own, and the master lists them all."""
+    operation = HlsOperation(test_video, renditions=[240, 120], segment_seconds=2)
+    output_dir = operation.process()
+
+    with open(os.path.join(output_dir, MASTER_PLAYLIST)) as f:
+        master = f.read()
+    assert "RESOLUTION=320x240" in master and "RESOLUTION=160x120" in master
+    assert master.count("#EXT-X-STREAM-INF:BANDWIDTH=") == 2
+
+    for name, width in (("240p", 320), ("120p", 160)):
+        with open(os.path.join(output_dir, name, MEDIA_PLAYLIST)) as f:
+            segments = parse_media_playlist(f.read())
+        assert [duration for duration, _ in segments] == [2.0] * 5
+        with av.open(os.path.join(output_dir, name, segments[2][1])) as container:
+            frames = list(container.decode(video=0))
+        assert len(frames) == 60
+        assert frames[0].key_frame and frames[0].width == width
+    assert operation.frames_written == 300
+
+
+def test_fingerprint_ignores_rendition_order():
+    params = {"codec": "h264", "quality": "medium", "preset": "veryfast", "segment_seconds": 6.0}
+    assert (OperationFactory.fingerprint("hls", "v", {**params, "renditions": [720, 360]}, 30.0)
+            == OperationFactory.fingerprint("hls", "v", {**params, "renditions": [360, 720, 360]}, 30.0))
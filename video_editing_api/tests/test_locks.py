@@ -0,0 +1,35 @@
+import asyncio
+from video_editing_api.locks import KeyedLock
+
+
+def test_same_key_waits_and_other_keys_do_not():
+    locks = KeyedLock()
+    order = []
+
+    async def work(key, name, seconds):
+        async with locks.hold(key):
+            order.append(f"{name} start")
+            await asyncio.sleep(seconds)
+            order.append(f"{name} end")
+
+    async def main():
+        await asyncio.gather(work("a", "a1", 0.2), work("a", "a2", 0), work("b", "b1", 0))
+
+    asyncio.run(main())
+    # b1 ran while a1 held "a"; a2 waited for a1
+    assert order == ["a1 start", "b1 start", "b1 end", "a1 end", "a2 start", "a2 end"]
+    assert len(locks) == 0
+
+
+def test_lock_is_dropped_when_the_holder_fails():
+    locks = KeyedLock()
+
+    async def fail():
+        async with locks.hold("a"):
+            raise ValueError("render failed")
+
+    try:
+        asyncio.run(fail())
+    except ValueError:
+        pass
+    assert len(locks) == 0
@@ -0,0 +1,75 @@
+import time
+import asyncio
+from video_editing_api.metadata_cache import MetadataCache
+
+
+class Loader:
+    """Counts how often the cache falls through to the database."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hit_skips_loader_until_invalidated():
+    cache = MetadataCache(ttl=60, max_entries=10)
+    load = Loader({"video_id": "a"})
+
+    assert cache.get_or_load("a", load) == {"video_id": "a"}
+    assert cache.get_or_load("a", load) == {"video_id": "a"}
+    assert load.calls == 1
+
+    cache.invalidate("a")
+    cache.get_or_load("a", load)
+    assert load.calls == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = MetadataCache(ttl=0.05, max_entries=10)
+    load = Loader({"video_id": "a"})
+
+    cache.get_or_load("a", load)
+    time.sleep(0.1)
+    cache.get_or_load("a", load)
+    assert load.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = MetadataCache(ttl=60, max_entries=2)
+    loads = {key: Loader({"video_id": key}) for key in "abc"}
+
+    cache.get_or_load("a", loads["a"])
+    cache.get_or_load("b", loads["b"])
+    cache.get_or_load("a", loads["a"])  # "b" is now the least recently used
+    cache.get_or_load("c", loads["c"])
+
+    cache.get_or_load("a", loads["a"])
+    cache.get_or_load("b", loads["b"])
+    assert loads["a"].calls == 1
+    assert loads["b"].calls == 2
+
+
+def test_misses_are_not_cached():
+    """A video inserted after a 404 is found on the next request."""
+    cache = MetadataCache(ttl=60, max_entries=10)
+    load = Loader(None)
+
+    assert cache.get_or_load("a", load) is None
+    load.value = {"video_id": "a"}
+    assert cache.get_or_load("a", load) == {"video_id": "a"}
+
+
+def test_async_loader_shares_entries():
+    cache = MetadataCache(ttl=60, max_entries=10)
+    load = Loader({"video_id": "a"})
+
+    async def load_async():
+        return load()
+
+    assert asyncio.run(cache.get_or_load_async("a", load_async)) == {"video_id": "a"}
+    assert cache.get_or_load("a", load) == {"video_id": "a"}
+    assert load.calls == 1
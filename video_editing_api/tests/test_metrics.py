@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import logging
+import subprocess
+import uuid
+from prometheus_client.parser import text_string_to_metric_families
+from video_editing_api.metrics import StageTimer, count_bytes, render_metrics, prepare_metrics_dir
+from video_editing_api.logging_config import JsonFormatter
+
+
+def _samples():
+    """Every sample /metrics would serve, as {(name, sorted labels): value}."""
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(render_metrics().decode())
+        for sample in family.samples
+    }
+
+
+def test_stage_timer_observes_each_stage_and_keeps_totals():
+    operation = f"test_{uuid.uuid4().hex[:8]}"
+    timer = StageTimer(operation)
+    with timer.stage("probe"):
+        pass
+    timer.record("encode", 1.5)
+    timer.record("encode", 0.5)
+
+    assert timer.seconds["encode"] == 2.0
+    assert set(timer.seconds) == {"probe", "encode"}
+    samples = _samples()
+    assert samples[("video_stage_seconds_count", (("operation", operation), ("stage", "encode")))] == 2
+    assert samples[("video_stage_seconds_sum", (("operation", operation), ("stage", "encode")))] == 2.0
+
+
+def test_count_bytes_ignores_retried_chunks():
+    direction = f"test_{uuid.uuid4().hex[:8]}"
+    add = count_bytes(direction)
+    add(100)
+    add(-40)
+    add(20)
+    assert _samples()[("video_bytes_transferred_total", (("direction", direction),))] == 120
+
+
+def test_metrics_report_disk_usage():
+    samples = _samples()
+    assert samples[("video_temp_disk_bytes", (("state", "free"),))] > 0
+    assert ("video_source_cache_bytes", ()) in samples
+
+
+def test_prepare_metrics_dir_clears_earlier_samples(tmp_path):
+    (tmp_path / "counter_123.db").write_bytes(b"stale")
+    (tmp_path / "keep.txt").write_text("not a sample file")
+    prepare_metrics_dir(str(tmp_path))
+    assert [path.name for path in tmp_path.iterdir()] == ["keep.txt"]
+    prepare_metrics_dir(str(tmp_path / "new"))
+    assert (tmp_path / "new").is_dir()
+
+
+def test_metrics_merge_samples_of_other_processes(tmp_path):
+    """With a multiprocess directory, /metrics includes what job workers recorded."""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+
+    def run(code):
+        return subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True).stdout
+
+    run("from video_editing_api.metrics import StageTimer; StageTimer('worker_test').record('encode', 2.5)")
+    rendered = run("from video_editing_api.metrics import render_metrics; print(render_metrics().decode())")
+    assert 'video_stage_seconds_sum{operation="worker_test",stage="encode"} 2.5' in rendered
+
+
+def test_json_formatter_keeps_extra_fields():
+    record = logging.LogRecord("video_editing_api.jobs", logging.INFO, __file__, 1, "Job %s done", ("j1",), None)
+    record.stage_seconds = {"encode": 1.25}
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Job j1 done"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "video_editing_api.jobs"
+    assert entry["stage_seconds"] == {"encode": 1.25}
+    assert "args" not in entry
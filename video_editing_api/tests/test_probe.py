@@ -0,0 +1,108 @@
+import struct
+import av
+import pytest
+from video_editing_api import probe
+from video_editing_api.probe import probe_video, probe_fileobj, file_fingerprint
+from video_editing_api.s3_service import S3RangeReader
+from video_editing_api.frame_index import FrameIndex
+
+
+@pytest.fixture
+def av_video(make_video):
+    """A 4 second 25 fps MPEG-4 video with a keyframe every 12 frames and a stereo AAC track."""
+    return make_video("av.mp4", seconds=4, fps=25, size=(160, 120), gop_size=12, audio_rate=44100)
+
+
+def test_mp4_probe_matches_packet_index(av_video):
+    info = probe_video(av_video)
+    index = FrameIndex.build(av_video)
+
+    assert info["total_frames"] == index.total_frames == 100
+    assert info["duration"] == pytest.approx(index.duration) == pytest.approx(4.0)
+    assert info["keyframes"] == len(index.keyframes)
+    assert info["format"] == "mp4"
+    assert info["fps"] == pytest.approx(25.0)
+    assert (info["width"], info["height"], info["codec"], info["rotation"]) == (160, 120, "mpeg4", 0)
+    assert info["bit_rate"] > 0
+
+    [audio] = info["audio_streams"]
+    assert (audio["codec"], audio["sample_rate"], audio["channels"]) == ("aac", 44100, 2)
+    assert audio["duration"] == pytest.approx(4.0, abs=0.1)
+
+
+def test_other_containers_fall_back_to_demuxing(av_video, tmp_path):
+    """A Matroska remux of the same streams reports the same metadata."""
+    mkv_path = str(tmp_path / "av.mkv")
+    with av.open(av_video) as source, av.open(mkv_path, "w") as output:
+        streams = {stream.index: output.add_stream(template=stream) for stream in source.streams}
+        for packet in source.demux():
+            if packet.dts is not None:
+                packet.stream = streams[packet.stream.index]
+                output.mux(packet)
+
+    mp4_info, mkv_info = probe_video(av_video), probe_video(mkv_path)
+    assert mkv_info["format"] == "matroska"
+    for field in ("total_frames", "keyframes", "width", "height", "codec"):
+        assert mkv_info[field] == mp4_info[field]
+    assert mkv_info["duration"] == pytest.approx(mp4_info["duration"], abs=0.01)
+    assert [stream["codec"] for stream in mkv_info["audio_streams"]] == ["aac"]
+
+
+class FakeS3Service:
+    """Serves ranged reads of an in-memory object and records them."""
+
+    def __init__(self, data):
+        self.data = data
+        self.ranges = []
+
+    def iter_range(self, s3_key, start, end, etag=None, chunk_size=None):
+        self.ranges.append((start, end))
+        yield self.data[start:end + 1]
+
+
+def test_probe_over_ranged_reads(av_video, tmp_path):
+    """Probing an S3 object reads its headers, not the whole object."""
+    # Put 4 MB in front of the moov box, as a large mdat would be
+    data = open(av_video, "rb").read()
+    padded = bytearray(data)
+    padded[:0] = struct.pack(">I4s", 8 + 4 * 1024 * 1024, b"free") + bytes(4 * 1024 * 1024)
+    padded_path = tmp_path / "padded.mp4"
+    padded_path.write_bytes(padded)
+    s3 = FakeS3Service(bytes(padded))
+    reader = S3RangeReader(s3, "videos/padded.mp4", len(padded), block_size=64 * 1024)
+
+    info = probe_fileobj(reader, len(padded))
+    expected = probe_video(str(padded_path))
+    for field in ("total_frames", "duration", "keyframes", "width", "height", "codec"):
+        assert info[field] == expected[field]
+    assert sum(end - start + 1 for start, end in s3.ranges) < len(padded) // 10
+
+
+def test_rotation_comes_from_track_matrix(av_video):
+    """A portrait phone recording stores a 90 degree matrix in tkhd."""
+    data = bytearray(open(av_video, "rb").read())
+    tkhd = data.index(b"tkhd") + 4  # Payload of the first (video) track header
+    assert data[tkhd] == 0  # Version 0 layout
+    matrix = (0, 1 << 16, 0, -(1 << 16), 0, 0, 0, 0, 1 << 30)
+    struct.pack_into(">9i", data, tkhd + 40, *matrix)
+    with open(av_video, "wb") as f:
+        f.write(data)
+
+    assert probe_video(av_video)["rotation"] == 90
+
+
+def test_results_are_memoized_by_content(av_video, tmp_path, monkeypatch):
+    calls = []
+    original = probe._probe
+    monkeypatch.setattr(probe, "_probe", lambda path: calls.append(path) or original(path))
+    probe._probe_cache.clear()
+
+    copy_path = tmp_path / "copy.mp4"
+    copy_path.write_bytes(open(av_video, "rb").read())
+    first = probe_video(av_video)
+    first["frame_index"] = "added by the caller"
+    second = probe_video(str(copy_path))
+
+    assert file_fingerprint(av_video) == file_fingerprint(str(copy_path))
+    assert len(calls) == 1
+    assert "frame_index" not in second
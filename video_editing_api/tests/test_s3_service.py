@@ -0,0 +1,62 @@
+import os
+import random
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from video_editing_api.s3_service import S3Service, S3RangeReader
+from video_editing_api.tests.test_probe import FakeS3Service
+
+
+def test_range_reader_reads_like_a_file(tmp_path):
+    data = os.urandom(300 * 1024)
+    path = tmp_path / "object.bin"
+    path.write_bytes(data)
+    reader = S3RangeReader(FakeS3Service(data), "object.bin", len(data), block_size=16 * 1024, max_blocks=4)
+
+    rng = random.Random(0)
+    with open(path, "rb") as f:
+        for _ in range(200):
+            position, size = rng.randrange(len(data) + 10), rng.randrange(-1, 40 * 1024)
+            f.seek(position)
+            reader.seek(position)
+            assert reader.read(size) == f.read(size)
+            assert reader.tell() == f.tell()
+        reader.seek(-10, os.SEEK_END)
+        assert reader.read() == data[-10:]
+
+
+def test_range_reader_fetches_each_block_once():
+    data = bytes(range(256)) * 1024
+    s3 = FakeS3Service(data)
+    reader = S3RangeReader(s3, "object.bin", len(data), block_size=16 * 1024)
+
+    reader.seek(20 * 1024)
+    reader.read(40 * 1024)
+    # Blocks 1-3 in a single request
+    assert s3.ranges == [(16 * 1024, 64 * 1024 - 1)]
+    reader.seek(30 * 1024)
+    reader.read(8)
+    reader.seek(0)
+    reader.read(8)
+    assert s3.ranges == [(16 * 1024, 64 * 1024 - 1), (0, 16 * 1024 - 1)]
+
+
+@mock_aws
+def test_iter_range_reads_ranges_and_raises_on_replaced_objects():
+    """Ranged reads from (moto) S3 are exact, and a failed read raises instead of ending the stream early."""
+    boto3.client("s3").create_bucket(Bucket="bucket")
+    s3 = S3Service("bucket")
+    data = os.urandom(100 * 1024)
+    s3.s3_client.put_object(Bucket="bucket", Key="videos/a.mp4", Body=data)
+    etag = s3.get_etag("videos/a.mp4")
+
+    assert b"".join(s3.iter_range("videos/a.mp4", 10, 50009, etag, chunk_size=4096)) == data[10:50010]
+    reader = s3.open_object("videos/a.mp4", block_size=16 * 1024)
+    reader.seek(-100, os.SEEK_END)
+    assert reader.read() == data[-100:]
+
+    # Pinned to the old ETag, the read of a replaced object fails
+    s3.s3_client.put_object(Bucket="bucket", Key="videos/a.mp4", Body=b"replaced")
+    with pytest.raises(ClientError):
+        list(s3.iter_range("videos/a.mp4", 0, 99, etag))
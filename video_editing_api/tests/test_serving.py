@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+import pytest
+from video_editing_api.serving import RangeNotSatisfiable, parse_range, is_not_modified, http_date
+
+
+def test_parse_range():
+    """Single byte ranges are clamped to the object; unsupported forms fall back to the full body."""
+    assert parse_range(None, 1000) is None
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=900-5000", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=1000-", 1000)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=50-10", 1000)
+
+
+def test_conditional_requests():
+    """If-None-Match wins over If-Modified-Since and compares ETags weakly."""
+    modified = datetime(2024, 1, 2, 3, 4, 5, 600000, tzinfo=timezone.utc)
+    etag = '"abc"'
+
+    assert is_not_modified('"abc"', None, etag, modified)
+    assert is_not_modified('"x", W/"abc"', None, etag, modified)
+    assert is_not_modified("*", None, etag, modified)
+    assert not is_not_modified('"x"', http_date(modified), etag, modified)
+
+    assert is_not_modified(None, http_date(modified), etag, modified)
+    assert not is_not_modified(None, "Mon, 01 Jan 2024 00:00:00 GMT", etag, modified)
+    assert not is_not_modified(None, "not a date", etag, modified)
+    assert not is_not_modified(None, None, etag, modified)
@@ -0,0 +1,32 @@
+import asyncio
+import pytest
+from video_editing_api.streaming import stream_from_thread
+
+
+async def collect(iterator):
+    return [chunk async for chunk in iterator]
+
+
+def test_stream_yields_what_the_producer_writes():
+    def produce(stream):
+        for chunk in (b"ab", b"cd", b"ef"):
+            stream.write(chunk)
+
+    assert asyncio.run(collect(stream_from_thread(produce))) == [b"ab", b"cd", b"ef"]
+
+
+def test_producer_error_aborts_the_stream():
+    """A failed encode is raised after the bytes already sent, not ended like a complete output."""
+    received = []
+
+    def produce(stream):
+        stream.write(b"moov")
+        raise RuntimeError("encoder failed")
+
+    async def consume():
+        async for chunk in stream_from_thread(produce):
+            received.append(chunk)
+
+    with pytest.raises(RuntimeError, match="encoder failed"):
+        asyncio.run(consume())
+    assert received == [b"moov"]
@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+import pytest
+from video_editing_api.frame_index import FrameIndex
+from video_editing_api.thumbnails import sample_keyframes, render_sprite, webvtt
+
+
+@pytest.fixture
+def test_video(make_video):
+    """A 10 second 30 fps video whose frame i is filled with colour (i, 0, 255 - i)."""
+    return make_video(label=False)
+
+
+def test_samples_are_keyframes_at_or_before_each_interval(test_video):
+    index = FrameIndex.build(test_video)
+    samples = sample_keyframes(index, 2.0)
+
+    assert len(samples) == 5
+    keyframes = set(index.keyframes)
+    for i, frame in enumerate(samples):
+        assert frame in keyframes
+        assert index.pts[frame] <= index.pts[0] + i * 2.0 / index.time_base
+
+
+def test_sprite_tiles_show_the_sampled_keyframes(test_video):
+    index = FrameIndex.build(test_video)
+    samples = sample_keyframes(index, 2.0)
+    jpeg, cues = render_sprite(test_video, index, 2.0, width=80, columns=2)
+    sheet = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+    # 5 tiles of 80x60 on 2 columns
+    assert sheet.shape == (3 * 60, 2 * 80, 3)
+    assert [cue[:2] for cue in cues] == [(0.0, 2.0), (2.0, 4.0), (4.0, 6.0), (6.0, 8.0), (8.0, 10.0)]
+    for frame, (_, _, x, y, w, h) in zip(samples, cues):
+        tile = sheet[y:y + h, x:x + w].reshape(-1, 3).mean(axis=0)
+        assert tile == pytest.approx((frame % 256, 0, 255 - frame % 256), abs=6)
+
+
+def test_webvtt_cues_point_into_the_sprite():
+    track = webvtt([(0.0, 10.0, 0, 0, 160, 90), (3590.0, 3600.5, 160, 0, 160, 90)], "sprite.jpg")
+    assert track.splitlines() == [
+        "WEBVTT",
+        "",
+        "00:00:00.000 --> 00:00:10.000",
+        "sprite.jpg#xywh=0,0,160,90",
+        "",
+        "00:59:50.000 --> 01:00:00.500",
+        "sprite.jpg#xywh=160,0,160,90"
+    ]
@@ -0,0 +1,33 @@
+import pytest
+from video_editing_api.uploads import plan_parts, part_length, check_parts, S3_MIN_PART_SIZE, S3_MAX_PARTS
+
+MB = 1024 * 1024
+
+def test_plan_parts_uses_preferred_size():
+    assert plan_parts(100 * MB, 16 * MB) == (16 * MB, 7)
+    assert plan_parts(1, 16 * MB) == (16 * MB, 1)
+
+def test_plan_parts_respects_s3_limits():
+    # Never below the S3 minimum part size
+    assert plan_parts(20 * MB, MB) == (S3_MIN_PART_SIZE, 4)
+    # Large files get larger parts rather than more than S3_MAX_PARTS
+    part_size, part_count = plan_parts(500 * 1024 * MB, 16 * MB)
+    assert part_count <= S3_MAX_PARTS
+    assert part_size * part_count >= 500 * 1024 * MB
+    with pytest.raises(ValueError):
+        plan_parts(0, 16 * MB)
+
+def test_part_length():
+    size = 2 * S3_MIN_PART_SIZE + 10
+    assert part_length(size, S3_MIN_PART_SIZE, 1) == S3_MIN_PART_SIZE
+    assert part_length(size, S3_MIN_PART_SIZE, 3) == 10
+    with pytest.raises(ValueError):
+        part_length(size, S3_MIN_PART_SIZE, 4)
+
+def test_check_parts():
+    size = 2 * S3_MIN_PART_SIZE + 10
+    parts = [
+        {"PartNumber": 1, "ETag": '"a"', "Size": S3_MIN_PART_SIZE},
+        {"PartNumber": 3, "ETag": '"c"', "Size": 9}
+    ]
+    assert check_parts(parts, size, S3_MIN_PART_SIZE) == ([2], [3])
@@ -0,0 +1,399 @@
+import os
+import json
+import hashlib
+import random
+import time
+import av
+import cv2
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from video_editing_api.video_processor import CutOperation, MultiCutOperation, OperationFactory, PipelineOperation, ProxyOperation
+from video_editing_api.frame_pipeline import FramePipeline
+from video_editing_api import segment_encoder
+from video_editing_api.segment_encoder import SegmentEncoder, split_segments
+from video_editing_api.frame_index import FrameIndex, IndexedCapture
+from video_editing_api.config import SEGMENT_SETTINGS, VIDEO_SETTINGS, QUALITY_PRESETS
+
+
+def read_frames(path):
+    """Decode every frame of a video with OpenCV."""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+@pytest.fixture
+def test_video(make_video):
+    """A 10 second 30 fps 320x240 video whose frames all differ."""
+    return make_video()
+
+
+@pytest.mark.parametrize("mode", ["reencode", "smart", "parallel"])
+def test_cut_is_frame_exact(test_video, mode):
+    """Re-encode, smart and parallel cuts contain exactly the requested frames."""
+    operation = CutOperation(test_video, 0.5, 7.1, mode=mode)
+    output_path = operation.process()
+    try:
+        source = read_frames(test_video)[operation.start_frame:operation.end_frame]
+        frames = read_frames(output_path)
+        assert len(frames) == operation.end_frame - operation.start_frame
+        for expected, actual in zip(source, frames):
+            assert np.abs(expected.astype(int) - actual.astype(int)).mean() < 5
+    finally:
+        os.remove(output_path)
+
+
+def test_copy_cut_starts_on_keyframe(test_video):
+    """Copy cuts never drop requested frames; at most the leading partial GOP is added."""
+    operation = CutOperation(test_video, 0.5, 7.1, mode="copy")
+    output_path = operation.process()
+    try:
+        frame_pts, keyframe_pts = operation._scan_packets()
+        start_pts = frame_pts[operation.start_frame]
+        snapped_frame = frame_pts.index(max(pts for pts in keyframe_pts if pts <= start_pts))
+        frames = read_frames(output_path)
+        assert len(frames) == operation.end_frame - snapped_frame
+    finally:
+        os.remove(output_path)
+
+
+@pytest.fixture
+def bframe_video(make_video):
+    """A 3 second 30 fps H.264 video with B-frames."""
+    # Fixed IBBP pattern: P-frame 3k is stored before the B-frames 3k - 2, 3k - 1
+    return make_video("bframes.mp4", seconds=3, size=(160, 120), codec="libx264", options={
+        "x264-params": "keyint=30:min-keyint=30:scenecut=0:bframes=2:b-adapt=0:b-pyramid=none"
+    })
+
+
+def test_copy_cut_keeps_trailing_b_frames(bframe_video):
+    """B-frames before the end are copied along with the later frame they reference."""
+    # Ends on frame 66, whose P-frame is stored before the B-frames 64 and 65
+    operation = CutOperation(bframe_video, 0.5, 2.2, mode="copy", audio=False)
+    output_path = operation.process()
+    try:
+        # The cut starts on the first keyframe, frame 0
+        times, _ = read_timestamps(output_path)
+        assert set(range(operation.end_frame)) <= {round(time * 30) for time in times}
+    finally:
+        os.remove(output_path)
+
+
+def test_smart_cut_reports_fallback(bframe_video):
+    """H.264 sources cannot be spliced: the smart cut is re-encoded in full and says so."""
+    operation = CutOperation(bframe_video, 0.5, 2.2, mode="smart", audio=False)
+    output_path = operation.process()
+    try:
+        assert len(read_frames(output_path)) == operation.end_frame - operation.start_frame
+        assert len(operation.notes) == 1 and "h264" in operation.notes[0]
+    finally:
+        os.remove(output_path)
+
+
+def test_invalid_cut_mode(test_video):
+    """Unknown modes are rejected."""
+    with pytest.raises(ValueError):
+        CutOperation(test_video, 0.0, 1.0, mode="bogus")
+
+
+def test_fingerprint_canonicalises_cut_params():
+    """Cuts covering the same frames share a fingerprint; other changes do not."""
+    base = {"start_time": 1.0, "end_time": 2.0, "output_format": "mp4", "mode": "smart"}
+    fingerprint = OperationFactory.fingerprint("cut", "video", base, 30.0)
+
+    same_frames = dict(base, start_time=1.01)
+    assert OperationFactory.fingerprint("cut", "video", same_frames, 30.0) == fingerprint
+    assert OperationFactory.fingerprint("cut", "video", dict(base, mode="copy"), 30.0) != fingerprint
+    assert OperationFactory.fingerprint("cut", "other", base, 30.0) != fingerprint
+
+
+def test_copy_cut_ignores_encoder_settings(test_video, monkeypatch):
+    """Copy cuts refuse encoder settings, and their fingerprint does not depend on the defaults."""
+    with pytest.raises(ValueError):
+        CutOperation(test_video, 1.0, 2.0, mode="copy", codec="hevc")
+    with pytest.raises(ValueError):
+        CutOperation(test_video, 1.0, 2.0, mode="smart", quality="low")
+
+    copy = {"start_time": 1.0, "end_time": 2.0, "mode": "copy"}
+    reencode = dict(copy, mode="reencode")
+    fingerprints = [OperationFactory.fingerprint("cut", "video", params, 30.0) for params in (copy, reencode)]
+    monkeypatch.setitem(VIDEO_SETTINGS, "codec", "mp4v")
+    assert OperationFactory.fingerprint("cut", "video", copy, 30.0) == fingerprints[0]
+    assert OperationFactory.fingerprint("cut", "video", reencode, 30.0) != fingerprints[1]
+
+
+def test_pipeline_single_pass(test_video):
+    """Chained stages produce the composed geometry and frame count."""
+    operation = PipelineOperation(test_video, [
+        {"type": "cut", "params": {"start_time": 1.0, "end_time": 5.0}},
+        {"type": "resize", "params": {"width": 160}},
+        {"type": "crop", "params": {"x": 0, "y": 0, "width": 100, "height": 80}},
+        {"type": "rotate", "params": {"degrees": 90}},
+        {"type": "speed", "params": {"factor": 2.0}}
+    ])
+    # Only the cut range is decoded
+    assert (operation.start_frame, operation.end_frame) == (30, 149)
+
+    output_path = operation.process()
+    try:
+        frames = read_frames(output_path)
+        assert len(frames) == operation.expected_frames == 60
+        assert frames[0].shape[:2] == (100, 80)
+    finally:
+        os.remove(output_path)
+
+
+def test_pipeline_cut_after_speed_maps_to_source(test_video):
+    """A cut after a speed change selects frames on the sped-up timeline."""
+    operation = PipelineOperation(test_video, [
+        {"type": "speed", "params": {"factor": 0.5}},
+        {"type": "cut", "params": {"start_time": 2.0, "end_time": 3.0}}
+    ])
+    assert (operation.start_frame, operation.end_frame) == (30, 45)
+
+    output_path = operation.process()
+    try:
+        source = read_frames(test_video)
+        frames = read_frames(output_path)
+        assert len(frames) == 30
+        # Slowed down 2x: every source frame appears twice
+        assert np.abs(frames[0].astype(int) - source[30].astype(int)).mean() < 5
+        assert np.abs(frames[2].astype(int) - source[31].astype(int)).mean() < 5
+    finally:
+        os.remove(output_path)
+
+
+def test_pipeline_rejects_invalid_stages():
+    """Stages are validated against the geometry they receive."""
+    with pytest.raises(ValueError):
+        PipelineOperation.plan([
+            {"type": "resize", "params": {"width": 100, "height": 100}},
+            {"type": "crop", "params": {"x": 0, "y": 0, "width": 200, "height": 10}}
+        ], 320, 240, 300, 30.0)
+
+
+def test_frame_pipeline_keeps_order_with_workers(test_video, tmp_path):
+    """Out-of-order worker completion still writes frames in source order."""
+    def jittery_copy(frame):
+        time.sleep(random.random() * 0.002)
+        return frame.copy()
+
+    output_path = str(tmp_path / "out.mp4")
+    cap = cv2.VideoCapture(test_video)
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (320, 240))
+    written = FramePipeline(cap, writer, 10, 100, (240, 320, 3), transform=jittery_copy, workers=4).run()
+    writer.release()
+
+    source = read_frames(test_video)[10:100]
+    frames = read_frames(output_path)
+    assert written == len(frames) == 90
+    for expected, actual in zip(source, frames):
+        assert np.abs(expected.astype(int) - actual.astype(int)).mean() < 5
+
+
+def test_frame_pipeline_propagates_errors(test_video, tmp_path):
+    """A failing transform stops every thread and surfaces the error."""
+    def broken(frame):
+        raise RuntimeError("transform failed")
+
+    cap = cv2.VideoCapture(test_video)
+    writer = cv2.VideoWriter(str(tmp_path / "out.mp4"), cv2.VideoWriter_fourcc(*'mp4v'), 30, (320, 240))
+    with pytest.raises(RuntimeError):
+        FramePipeline(cap, writer, 0, 300, (240, 320, 3), transform=broken, workers=2).run()
+    writer.release()
+
+
+def read_timestamps(path):
+    """Presentation time of every video frame, and the container duration, in seconds."""
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        times = [float(frame.pts * frame.time_base) for frame in container.decode(stream)]
+        return times, container.duration / av.time_base
+
+
+@pytest.mark.parametrize("codec", ["h264", "mp4v"])
+def test_parallel_cut_matches_reencode(test_video, monkeypatch, codec):
+    """Segmented encoding gives the frames and timestamps of a serial reencode cut."""
+    monkeypatch.setitem(SEGMENT_SETTINGS, "workers", 2)
+    monkeypatch.setitem(SEGMENT_SETTINGS, "segment_frames", 30)
+    serial = CutOperation(test_video, 0.5, 9.5, mode="reencode", codec=codec)
+    parallel = CutOperation(test_video, 0.5, 9.5, mode="parallel", codec=codec)
+    frame_pts, keyframe_pts = parallel._scan_packets()
+    segments = SegmentEncoder(test_video, frame_pts, keyframe_pts, parallel.fps, (320, 240)).segments(
+        parallel.start_frame, parallel.end_frame
+    )
+    assert len(segments) > 1
+
+    serial_path, parallel_path = serial.process(), parallel.process()
+    try:
+        serial_frames, parallel_frames = read_frames(serial_path), read_frames(parallel_path)
+        assert len(parallel_frames) == len(serial_frames) == serial.end_frame - serial.start_frame
+        for expected, actual in zip(serial_frames, parallel_frames):
+            assert np.abs(expected.astype(int) - actual.astype(int)).mean() < 3
+
+        serial_times, serial_duration = read_timestamps(serial_path)
+        parallel_times, parallel_duration = read_timestamps(parallel_path)
+        assert parallel_times == pytest.approx(serial_times)
+        assert parallel_duration == pytest.approx(serial_duration, abs=1 / 30)
+
+        with av.open(parallel_path) as container:
+            assert container.streams.video[0].codec_context.name == {"h264": "h264", "mp4v": "mpeg4"}[codec]
+    finally:
+        os.remove(serial_path)
+        os.remove(parallel_path)
+
+
+def test_parallel_cut_frames_equal_reencode_when_lossless(test_video, monkeypatch):
+    """
+    Encoded losslessly, every frame of a parallel cut hashes equal to the
+    same frame of a serial reencode cut, so a segment boundary can neither
+    drop, repeat nor reorder a frame.
+    """
+    monkeypatch.setitem(SEGMENT_SETTINGS, "workers", 3)
+    monkeypatch.setitem(SEGMENT_SETTINGS, "segment_frames", 30)
+    monkeypatch.setitem(QUALITY_PRESETS, "lossless", {"crf": 0, "qscale": 1})
+    # Threads, so the segments see the patched presets
+    monkeypatch.setattr(
+        segment_encoder, "ProcessPoolExecutor",
+        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)
+    )
+    serial = CutOperation(test_video, 0.5, 9.5, mode="reencode", quality="lossless")
+    parallel = CutOperation(test_video, 0.5, 9.5, mode="parallel", quality="lossless")
+
+    serial_path, parallel_path = serial.process(), parallel.process()
+    try:
+        serial_hashes = [hashlib.md5(frame.tobytes()).hexdigest() for frame in read_frames(serial_path)]
+        parallel_hashes = [hashlib.md5(frame.tobytes()).hexdigest() for frame in read_frames(parallel_path)]
+        assert len(serial_hashes) == serial.end_frame - serial.start_frame
+        assert parallel_hashes == serial_hashes
+        # Every source frame differs, so a repeated frame could not hash equal
+        assert len(set(serial_hashes)) == len(serial_hashes)
+    finally:
+        os.remove(serial_path)
+        os.remove(parallel_path)
+
+
+def test_multi_cut_matches_single_cuts(test_video):
+    """Every clip of a batch equals the same range cut on its own, overlaps included."""
+    cuts = [
+        {"start_time": 6.0, "end_time": 7.5},
+        {"start_time": 0.5, "end_time": 2.0},
+        {"start_time": 1.5, "end_time": 3.0},  # Overlaps the previous clip
+        {"start_time": 3.1, "end_time": 3.6}   # Starts inside the same GOP: decoded through
+    ]
+    operation = MultiCutOperation(test_video, cuts)
+    assert len(operation.spans()) == 2
+
+    output_paths = operation.process()
+    try:
+        assert operation.clip_frames == [end - start for start, end in operation.clips]
+        assert operation.frames_written == operation.expected_frames
+        for cut, output_path in zip(cuts, output_paths):
+            single = CutOperation(test_video, cut["start_time"], cut["end_time"], mode="reencode")
+            single_path = single.process()
+            try:
+                expected = [hashlib.md5(frame.tobytes()).hexdigest() for frame in read_frames(single_path)]
+                actual = [hashlib.md5(frame.tobytes()).hexdigest() for frame in read_frames(output_path)]
+                assert len(actual) == single.end_frame - single.start_frame
+                assert actual == expected
+            finally:
+                os.remove(single_path)
+    finally:
+        for output_path in output_paths:
+            os.remove(output_path)
+
+
+def test_split_segments_start_on_keyframes():
+    """Segments cover the range without gaps and only break at keyframes."""
+    segments = split_segments(5, 100, [0, 12, 24, 36, 48, 60, 72, 84, 96], segment_frames=20)
+    assert segments == [(5, 36), (36, 60), (60, 84), (84, 100)]
+
+
+def test_frame_index_round_trips_and_counts_exactly(test_video):
+    """The packet index counts every frame and survives JSON storage."""
+    index = FrameIndex.build(test_video)
+    assert index.total_frames == 300
+    assert index.duration == pytest.approx(10.0)
+    assert index.keyframes[0] == 0
+
+    restored = FrameIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+    assert restored.pts == index.pts
+    assert restored.keyframe_pts == index.keyframe_pts
+    assert restored.duration == index.duration
+
+
+def test_indexed_capture_seeks_to_exact_frame(test_video):
+    """Seeking lands on the requested frame, including frames between keyframes."""
+    frames = read_frames(test_video)
+    index = FrameIndex.build(test_video)
+    cap = IndexedCapture(test_video, index)
+    try:
+        for target in (0, 1, index.keyframes[2], index.keyframes[2] + 5, 299):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            ret, frame = cap.read()
+            assert ret
+            assert np.abs(frame.astype(int) - frames[target].astype(int)).mean() < 2
+        assert cap.read()[0] is False
+    finally:
+        cap.release()
+
+
+def test_indexed_capture_reads_into_buffer(test_video):
+    """Reading into a buffer of the frame's shape fills that buffer with the BGR frame."""
+    frames = read_frames(test_video)
+    cap = IndexedCapture(test_video, FrameIndex.build(test_video))
+    buffer = np.empty((240, 320, 3), dtype=np.uint8)
+    try:
+        for expected in frames[:30]:
+            ret, frame = cap.read(buffer)
+            assert ret and frame is buffer
+            assert np.abs(frame.astype(int) - expected.astype(int)).mean() < 2
+        # A buffer of another shape is left alone
+        ret, frame = cap.read(np.empty((10, 10, 3), dtype=np.uint8))
+        assert ret and frame.shape == (240, 320, 3)
+    finally:
+        cap.release()
+
+
+def test_cut_stream_writes_fragmented_mp4(test_video, tmp_path):
+    """Streamed cuts are fragmented MP4 containing exactly the requested frames."""
+    class Sink:
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, data):
+            self.chunks.append(bytes(data))
+            return len(data)
+
+    sink = Sink()
+    operation = CutOperation(test_video, 0.5, 7.1, mode="reencode")
+    operation.stream(sink)
+
+    assert len(sink.chunks) > 1
+    output_path = str(tmp_path / "streamed.mp4")
+    with open(output_path, "wb") as f:
+        f.write(b"".join(sink.chunks))
+    assert b"moof" in b"".join(sink.chunks)
+    assert len(read_frames(output_path)) == operation.end_frame - operation.start_frame
+
+
+@pytest.mark.parametrize("height, expected", [(120, (160, 120)), (480, (320, 240))])
+def test_proxy_scales_down_with_dense_keyframes(test_video, height, expected):
+    """Proxies are scaled to the target height (never up) with a keyframe every interval."""
+    operation = ProxyOperation(test_video, height=height, keyframe_interval=0.5)
+    output_path = operation.process()
+    try:
+        frames = read_frames(output_path)
+        assert len(frames) == 300
+        assert (frames[0].shape[1], frames[0].shape[0]) == expected
+        keyframes = FrameIndex.build(output_path).keyframes
+        assert max(b - a for a, b in zip(keyframes, keyframes[1:] + [300])) <= 15
+    finally:
+        os.remove(output_path)
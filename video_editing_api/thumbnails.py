@@ -0,0 +1,105 @@
+import math
+import av
+import cv2
+import numpy as np
+from bisect import bisect_right
+from typing import List, Tuple
+from video_editing_api.frame_index import FrameIndex
+from video_editing_api.config import THUMBNAIL_SETTINGS
+
+# One WebVTT cue: start and end (seconds) and the tile's x, y, width, height in the sprite
+Cue = Tuple[float, float, int, int, int, int]
+
+def sample_keyframes(index: FrameIndex, interval: float) -> List[int]:
+    """
+    The keyframe shown for each thumbnail: the last keyframe at or before
+    every multiple of interval. Neighbouring samples may share a keyframe
+    when the GOP is longer than the interval.
+
+    Returns:
+        list: Frame indices (into index.pts), one per thumbnail
+    """
+    count = max(1, math.ceil(index.duration / interval))
+    first_pts = index.pts[0]
+    samples = []
+    for i in range(count):
+        target = first_pts + int(i * interval / index.time_base)
+        frame = max(bisect_right(index.pts, target) - 1, 0)
+        samples.append(index.keyframe_before(frame))
+    return samples
+
+def render_sprite(video_path: str, index: FrameIndex, interval: float,
+                  width: int = THUMBNAIL_SETTINGS["width"],
+                  columns: int = THUMBNAIL_SETTINGS["columns"],
+                  jpeg_quality: int = THUMBNAIL_SETTINGS["jpeg_quality"]) -> Tuple[bytes, List[Cue]]:
+    """
+    Render a JPEG sprite sheet with a thumbnail every interval seconds.
+
+    Only keyframes are decoded: each distinct keyframe is reached with one
+    seek, the decoder skips non-key frames, and frames are scaled to tile
+    size by the decoder's scaler instead of being converted at full size.
+
+    Args:
+        video_path: Local path of the video
+        index: Its packet index
+        interval: Seconds between thumbnails
+        width: Tile width; the height keeps the aspect ratio
+        columns: Tiles per sprite row
+        jpeg_quality: JPEG quality (0-100)
+
+    Returns:
+        (jpeg bytes, cues): The sprite sheet and one cue per tile
+    """
+    samples = sample_keyframes(index, interval)
+    keyframes = sorted(set(samples))
+
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"
+        source_width, source_height = stream.codec_context.width, stream.codec_context.height
+        height = max(2, int(round(width * source_height / source_width / 2)) * 2)
+
+        tiles = {}
+        for keyframe in keyframes:
+            pts = index.pts[keyframe]
+            container.seek(pts, stream=stream, backward=True)
+            for frame in container.decode(stream):
+                if frame.pts is None or frame.pts >= pts:
+                    tiles[keyframe] = frame.reformat(width, height, format="bgr24").to_ndarray()
+                    break
+
+    # Lay the tiles out row-major in one array: (rows, columns, h, w, 3) -> (rows * h, columns * w, 3)
+    columns = min(columns, len(samples))
+    rows = math.ceil(len(samples) / columns)
+    grid = np.zeros((rows * columns, height, width, 3), dtype=np.uint8)
+    for position, keyframe in enumerate(samples):
+        if keyframe in tiles:
+            grid[position] = tiles[keyframe]
+    sheet = grid.reshape(rows, columns, height, width, 3).transpose(0, 2, 1, 3, 4).reshape(rows * height, columns * width, 3)
+
+    ok, jpeg = cv2.imencode(".jpg", sheet, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    if not ok:
+        raise ValueError("Failed to encode sprite sheet")
+
+    duration = index.duration
+    cues = [
+        (i * interval, min((i + 1) * interval, duration),
+         (i % columns) * width, (i // columns) * height, width, height)
+        for i in range(len(samples))
+    ]
+    return jpeg.tobytes(), cues
+
+def webvtt(cues: List[Cue], sprite_url: str) -> str:
+    """A WebVTT thumbnail track whose cues point at tiles of the sprite (media fragment #xywh)."""
+    lines = ["WEBVTT", ""]
+    for start, end, x, y, w, h in cues:
+        lines.append(f"{_timestamp(start)} --> {_timestamp(end)}")
+        lines.append(f"{sprite_url}#xywh={x},{y},{w},{h}")
+        lines.append("")
+    return "\n".join(lines)
+
+def _timestamp(seconds: float) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600 * 1000)
+    minutes, milliseconds = divmod(milliseconds, 60 * 1000)
+    return f"{hours:02d}:{minutes:02d}:{milliseconds / 1000:06.3f}"
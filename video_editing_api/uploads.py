@@ -0,0 +1,58 @@
+import math
+from typing import Dict, List, Tuple
+
+# S3 multipart limits: every part but the last must be at least 5 MiB, at
+# most 5 GiB, and an upload has at most 10,000 parts
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MAX_PART_SIZE = 5 * 1024 * 1024 * 1024
+S3_MAX_PARTS = 10000
+
+def plan_parts(size: int, part_size: int) -> Tuple[int, int]:
+    """
+    Split a file of the given size into S3 multipart parts.
+
+    Args:
+        size: Total size of the file in bytes
+        part_size: Preferred part size; raised to the S3 minimum, and to
+            whatever keeps the part count within S3_MAX_PARTS
+
+    Returns:
+        (part_size, part_count)
+
+    Raises:
+        ValueError: If the file cannot be uploaded in S3_MAX_PARTS parts
+    """
+    if size <= 0:
+        raise ValueError("Upload size must be positive")
+    part_size = max(part_size, S3_MIN_PART_SIZE, math.ceil(size / S3_MAX_PARTS))
+    if part_size > S3_MAX_PART_SIZE:
+        raise ValueError("File too large")
+    return part_size, math.ceil(size / part_size)
+
+def part_length(size: int, part_size: int, part_number: int) -> int:
+    """Number of bytes in the 1-based part part_number; only the last part is short."""
+    part_count = math.ceil(size / part_size)
+    if not 1 <= part_number <= part_count:
+        raise ValueError(f"Part number must be between 1 and {part_count}")
+    return min(part_size, size - (part_number - 1) * part_size)
+
+def check_parts(parts: List[Dict], size: int, part_size: int) -> Tuple[List[int], List[int]]:
+    """
+    Compare the parts S3 holds for an upload with the parts it needs.
+
+    Args:
+        parts: Parts as returned by S3Service.list_parts
+        size, part_size: The upload's total size and part size
+
+    Returns:
+        (missing, wrong_size): Part numbers not yet received, and part
+        numbers whose stored size does not match the plan
+    """
+    part_count = math.ceil(size / part_size)
+    received = {part["PartNumber"]: part["Size"] for part in parts}
+    missing = [n for n in range(1, part_count + 1) if n not in received]
+    wrong_size = [
+        n for n, length in sorted(received.items())
+        if n > part_count or length != part_length(size, part_size, n)
+    ]
+    return missing, wrong_size
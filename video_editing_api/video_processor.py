@@ -1,15 +1,63 @@
 import os
+import time
+import av
+import shutil
+import tempfile
+import json
+import math
+import hashlib
 import cv2
 import numpy as np
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Tuple
-from video_editing_api.config import VIDEO_SETTINGS
+from fractions import Fraction
+from typing import Dict, Any, BinaryIO, Callable, List, Optional, Tuple
+from video_editing_api.config import VIDEO_SETTINGS, CUT_MODES, ENCODER_CUT_MODES, STREAMING_SETTINGS, PROXY_SETTINGS, HLS_SETTINGS, AUDIO_SETTINGS
+from video_editing_api.frame_pipeline import FramePipeline
+from video_editing_api.segment_encoder import SegmentEncoder, encode_segment
+from video_editing_api.frame_index import FrameIndex, IndexedCapture
+from video_editing_api.probe import probe_video
+from video_editing_api.encoders import VideoEncoder, resolve_settings, encoder_options
+from video_editing_api.hls import HlsWriter, rendition_sizes
+from video_editing_api.audio import AudioTrack
+
+# Codecs whose re-encoded edge GOPs can be spliced in front of / behind
+# stream-copied packets without rewriting the container's codec headers.
+# H.264 and HEVC are not among them: an edge encoded by x264/x265 carries its
+# own SPS/PPS, which the copied packets' stream headers would not match.
+SMART_CUT_CODECS = {"mpeg4"}
+
+def check_encoder_settings(mode: str, codec: Optional[str] = None, quality: Optional[str] = None,
+                           preset: Optional[str] = None) -> None:
+    """Reject encoder settings for a cut mode that does not re-encode with them (see ENCODER_CUT_MODES)."""
+    given = [name for name, value in (("codec", codec), ("quality", quality), ("preset", preset)) if value is not None]
+    if given and mode not in ENCODER_CUT_MODES:
+        raise ValueError(
+            f"{', '.join(given)} only apply to {' and '.join(ENCODER_CUT_MODES)} cuts; "
+            f"{mode} cuts keep the source's codec"
+        )
+
+def _round_floats(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Round float parameters so insignificant differences compare equal."""
+    return {
+        key: round(value, 6) if isinstance(value, float) else value
+        for key, value in params.items()
+    }
 
 class BaseOperation(ABC):
     """Base class for all video operations."""
     
-    def __init__(self, video_path: str):
+    def __init__(self, video_path: str, frame_index: Optional[FrameIndex] = None,
+                 codec: Optional[str] = None, quality: Optional[str] = None, preset: Optional[str] = None):
+        """
+        Args:
+            video_path: Local path of the source video
+            frame_index: Packet index of the source, if already known (it is
+                stored with the Video row); built here otherwise
+            codec, quality, preset: Encoder settings for re-encoded output
+                (see encoders.py); unset ones come from VIDEO_SETTINGS
+        """
         self.video_path = video_path
+        self.codec, self.quality, self.preset = resolve_settings(codec, quality, preset)
         self.cap = cv2.VideoCapture(video_path)
         if not self.cap.isOpened():
             raise ValueError(f"Could not open video file: {video_path}")
@@ -18,32 +66,48 @@ class BaseOperation(ABC):
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
         self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        self.duration = self.total_frames / self.fps
+        
+        # Exact frame count and duration come from the packet index
+        self.frame_index = frame_index or FrameIndex.build(video_path)
+        self.total_frames = self.frame_index.total_frames
+        self.duration = self.frame_index.duration
+        self._init_bookkeeping(self.total_frames)
+        
+        # Whether outputs carry the source's audio (set by operations that
+        # keep the source timeline)
+        self.audio = False
+    
+    def _init_bookkeeping(self, expected_frames: Optional[int]) -> None:
+        """Set up the progress, timing and notes every operation reports, whichever constructor runs."""
+        # Progress reporting: called with the running count of output frames
+        self.frames_written = 0
+        self.expected_frames = expected_frames
+        self.progress_callback: Optional[Callable[[int], None]] = None
+        
+        # Seconds spent decoding and encoding, where those are separate steps
+        # ("decode", "encode"); copy cuts and parallel segments record none
+        self.stage_seconds: Dict[str, float] = {}
+        
+        # How the output departs from what was asked for, reported with the job
+        self.notes: List[str] = []
     
     @classmethod
     def get_video_info(cls, video_path: str) -> dict:
-        """Get video information without creating an operation instance."""
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video file: {video_path}")
-        
-        try:
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps
-            
-            return {
-                "duration": duration,
-                "fps": fps,
-                "width": frame_width,
-                "height": frame_height,
-                "total_frames": total_frames
-            }
-        finally:
-            cap.release()
+        """Get video information without creating an operation instance (see probe_video)."""
+        return probe_video(video_path)
+    
+    @classmethod
+    def canonical_params(cls, params: Dict[str, Any], fps: float) -> Dict[str, Any]:
+        """
+        Normalise request parameters so that requests producing the same
+        output compare equal. Subclasses refine this for their own params.
+        """
+        return _round_floats(params)
+    
+    @classmethod
+    def uses_encoder(cls, params: Dict[str, Any]) -> bool:
+        """Whether the encoder settings can change the output of an operation with these params."""
+        return True
     
     @abstractmethod
     def process(self) -> str:
@@ -54,16 +118,79 @@ class BaseOperation(ABC):
         """Generate a unique output path for the processed video."""
         return f"/tmp/{operation_name}_{os.urandom(4).hex()}.mp4"
     
-    def _create_video_writer(self, output_path: str) -> cv2.VideoWriter:
-        """Create a video writer with the specified output path."""
-        fourcc = cv2.VideoWriter_fourcc(*VIDEO_SETTINGS["codec"])
-        return cv2.VideoWriter(
+    def _create_video_writer(self, output_path: str,
+                             frame_size: Optional[Tuple[int, int]] = None,
+                             audio: Optional[AudioTrack] = None) -> VideoEncoder:
+        """Create a video writer with the specified output path (and size, if it differs from the source)."""
+        return VideoEncoder(
             output_path,
-            fourcc,
             self.fps,
-            (self.frame_width, self.frame_height)
+            frame_size or (self.frame_width, self.frame_height),
+            codec=self.codec,
+            quality=self.quality,
+            preset=self.preset,
+            audio=audio
         )
     
+    def _open_audio(self, start_frame: int, end_frame: int, exact: bool = True) -> Optional[AudioTrack]:
+        """
+        The source audio under frames [start_frame, end_frame), or None when
+        the operation drops audio or the source has none.
+        
+        Args:
+            exact: Whether the end must be sample-accurate (see AudioTrack)
+        """
+        if not self.audio:
+            return None
+        frame_pts, time_base = self.frame_index.pts, self.frame_index.time_base
+        start = frame_pts[min(start_frame, len(frame_pts) - 1)] * time_base
+        end = frame_pts[end_frame] * time_base if end_frame < len(frame_pts) else None
+        return AudioTrack.open(self.video_path, start, end, exact)
+    
+    def _run_frame_pipeline(self, writer: VideoEncoder, start_frame: int, end_frame: int,
+                            transform: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                            output_indices: Optional[Callable[[int], List[int]]] = None) -> int:
+        """
+        Decode [start_frame, end_frame), optionally transform each frame and
+        write it, with decoding, transforms and encoding on separate threads.
+        
+        Returns:
+            int: Number of frames written
+        """
+        # Seek through the packet index rather than CAP_PROP_POS_FRAMES, which
+        # some backends implement by decoding from the start or approximately
+        cap = IndexedCapture(self.video_path, self.frame_index)
+        try:
+            pipeline = FramePipeline(
+                cap,
+                writer,
+                start_frame,
+                end_frame,
+                frame_shape=(self.frame_height, self.frame_width, 3),
+                transform=transform,
+                output_indices=output_indices,
+                on_frame=self._frame_written
+            )
+            try:
+                return pipeline.run()
+            finally:
+                self._add_pipeline_seconds(pipeline)
+        finally:
+            cap.release()
+    
+    def _add_stage_seconds(self, stage: str, seconds: float) -> None:
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+    
+    def _add_pipeline_seconds(self, pipeline: FramePipeline) -> None:
+        self._add_stage_seconds("decode", pipeline.decode_seconds)
+        self._add_stage_seconds("encode", pipeline.encode_seconds)
+    
+    def _frame_written(self) -> None:
+        """Record one output frame and notify the progress callback."""
+        self.frames_written += 1
+        if self.progress_callback:
+            self.progress_callback(self.frames_written)
+    
     def _frame_to_time(self, frame_number: int) -> float:
         """Convert frame number to time in seconds."""
         return frame_number / self.fps
@@ -72,6 +199,16 @@ class BaseOperation(ABC):
         """Convert time in seconds to frame number."""
         return int(time * self.fps)
     
+    def _scan_packets(self) -> Tuple[List[int], List[int]]:
+        """
+        Frame timestamps from the packet index.
+        
+        Returns:
+            Tuple of (presentation timestamps of every frame in display order,
+            presentation timestamps of the keyframes), both in the stream time base.
+        """
+        return self.frame_index.pts, self.frame_index.keyframe_pts
+    
     def __del__(self):
         """Clean up resources."""
         if hasattr(self, 'cap'):
@@ -80,14 +217,23 @@ class BaseOperation(ABC):
 class CutOperation(BaseOperation):
     """Operation for cutting/trimming a video."""
     
-    def __init__(self, video_path: str, start_time: float, end_time: float):
-        super().__init__(video_path)
+    def __init__(self, video_path: str, start_time: float, end_time: float,
+                 mode: Optional[str] = None, frame_index: Optional[FrameIndex] = None,
+                 audio: bool = True, **encoding):
+        super().__init__(video_path, frame_index, **encoding)
         
         if start_time >= end_time:
             raise ValueError("Start time must be less than end time")
+        
+        mode = mode or VIDEO_SETTINGS["cut_mode"]
+        if mode not in CUT_MODES:
+            raise ValueError(f"Unsupported cut mode: {mode}. Allowed modes: {CUT_MODES}")
+        check_encoder_settings(mode, **encoding)
             
         self.start_time = start_time
         self.end_time = end_time
+        self.mode = mode
+        self.audio = audio
         
         # Convert times to frame numbers
         self.start_frame = self._time_to_frame(start_time)
@@ -98,47 +244,968 @@ class CutOperation(BaseOperation):
             raise ValueError("Start time is beyond video duration")
         if self.end_frame > self.total_frames:
             raise ValueError("End time is beyond video duration")
+        
+        self.expected_frames = self.end_frame - self.start_frame
+    
+    @classmethod
+    def canonical_params(cls, params: Dict[str, Any], fps: float) -> Dict[str, Any]:
+        """Express the range in frames, since that is all the output depends on."""
+        canonical = super().canonical_params(params, fps)
+        canonical["start_frame"] = int(canonical.pop("start_time") * fps)
+        canonical["end_frame"] = int(canonical.pop("end_time") * fps)
+        canonical.setdefault("mode", VIDEO_SETTINGS["cut_mode"])
+        canonical.setdefault("audio", True)
+        if canonical["audio"]:
+            # Re-encoded audio depends on these too
+            canonical["audio_settings"] = dict(AUDIO_SETTINGS)
+        return canonical
+    
+    @classmethod
+    def uses_encoder(cls, params: Dict[str, Any]) -> bool:
+        """Copy cuts never re-encode video; smart cuts do when they fall back to a full re-encode."""
+        return (params.get("mode") or VIDEO_SETTINGS["cut_mode"]) != "copy"
     
     def process(self) -> str:
         """Cut the video between start_time and end_time."""
         try:
-            # Set the starting frame
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+            if self.mode == "copy":
+                return self._process_copy()
+            if self.mode == "smart":
+                return self._process_smart()
+            if self.mode == "parallel":
+                return self._process_parallel()
+            return self._process_reencode()
+            
+        except Exception as e:
+            raise Exception(f"Error processing video: {str(e)}")
+    
+    def _process_reencode(self) -> str:
+        """Decode every frame in the range and re-encode it, muxing the audio in as it goes."""
+        # Create output video writer
+        output_path = self._get_output_path("cut")
+        out = self._create_video_writer(output_path, audio=self._open_audio(self.start_frame, self.end_frame))
+        
+        # Process frames
+        self._run_frame_pipeline(out, self.start_frame, self.end_frame)
+        
+        # Clean up
+        out.release()
+        
+        return output_path
+    
+    def _process_copy(self) -> str:
+        """
+        Remux packets without decoding them.
+        
+        The start is snapped back to the nearest keyframe at or before
+        start_frame, so the output may begin slightly early when the cut
+        point is not keyframe-aligned.
+        """
+        frame_pts, keyframe_pts = self._scan_packets()
+        start_pts = self._copy_start_pts(frame_pts, keyframe_pts)
+        end_pts = self._end_pts(frame_pts)
+        
+        # The audio follows the copied video, which may start early
+        audio = self._open_audio(frame_pts.index(start_pts), self.end_frame, exact=False)
+        output_path = self._get_output_path("cut")
+        try:
+            with av.open(self.video_path) as source, av.open(output_path, "w") as output:
+                in_stream = source.streams.video[0]
+                out_stream = output.add_stream(template=in_stream)
+                if audio:
+                    audio.attach(output)
+                self._copy_packets(source, in_stream, output, out_stream, start_pts, end_pts, start_pts, audio)
+                if audio:
+                    audio.mux_until(None)
+        finally:
+            if audio:
+                audio.close()
+        
+        return output_path
+    
+    def _process_smart(self) -> str:
+        """
+        Frame-exact cut that stream-copies every complete GOP in the range
+        and re-encodes only the partial GOPs at either edge.
+        
+        Falls back to the re-encode path when the source codec cannot be
+        spliced (see SMART_CUT_CODECS), and says so in notes: H.264 and HEVC
+        sources come out in VIDEO_SETTINGS' codec rather than their own.
+        """
+        frame_pts, keyframe_pts = self._scan_packets()
+        if len(frame_pts) < self.end_frame:
+            return self._process_reencode()
+        
+        start_pts = frame_pts[self.start_frame]
+        end_pts = self._end_pts(frame_pts)
+        
+        # First keyframe inside the range, and the last keyframe before its end
+        head_end = next((pts for pts in keyframe_pts if pts >= start_pts), None)
+        last_pts = end_pts if end_pts is not None else frame_pts[-1] + 1
+        tail_start = max(pts for pts in keyframe_pts if pts < last_pts)
+        
+        # The whole range sits inside a single GOP, so there is nothing to copy
+        if head_end is None or head_end >= last_pts:
+            return self._process_reencode()
+        
+        with av.open(self.video_path) as source:
+            in_stream = source.streams.video[0]
+            if in_stream.codec_context.name not in SMART_CUT_CODECS:
+                self.notes.append(
+                    f"smart cut re-encoded in full with {self.codec}: "
+                    f"{in_stream.codec_context.name} sources cannot be spliced"
+                )
+                return self._process_reencode()
             
-            # Create output video writer
+            audio = self._open_audio(self.start_frame, self.end_frame)
             output_path = self._get_output_path("cut")
-            out = self._create_video_writer(output_path)
+            try:
+                with av.open(output_path, "w") as output:
+                    out_stream = output.add_stream(template=in_stream)
+                    if audio:
+                        audio.attach(output)
+                    
+                    if start_pts < head_end:
+                        self._encode_range(source, in_stream, output, out_stream, start_pts, head_end, start_pts, audio)
+                    self._copy_packets(source, in_stream, output, out_stream, head_end,
+                                       tail_start if end_pts is not None else None, start_pts, audio,
+                                       references=False)
+                    if end_pts is not None and tail_start < end_pts:
+                        self._encode_range(source, in_stream, output, out_stream, tail_start, end_pts, start_pts, audio)
+                    if audio:
+                        audio.mux_until(None)
+            finally:
+                if audio:
+                    audio.close()
+        
+        return output_path
+    
+    def _process_parallel(self) -> str:
+        """
+        Re-encode the range as keyframe-aligned segments on several processes
+        and concatenate them (see SegmentEncoder).
+        """
+        frame_pts, keyframe_pts = self._scan_packets()
+        if len(frame_pts) < self.end_frame:
+            return self._process_reencode()
+        
+        def segment_done(frames: int) -> None:
+            for _ in range(frames):
+                self._frame_written()
+        
+        output_path = self._get_output_path("cut")
+        encoder = SegmentEncoder(
+            self.video_path, frame_pts, keyframe_pts, self.fps, (self.frame_width, self.frame_height),
+            codec=self.codec, quality=self.quality, preset=self.preset
+        )
+        audio = self._open_audio(self.start_frame, self.end_frame)
+        try:
+            encoder.run(self.start_frame, self.end_frame, output_path, on_segment=segment_done, audio=audio)
+        finally:
+            if audio:
+                audio.close()
+        return output_path
+    
+    def stream(self, output: BinaryIO) -> None:
+        """
+        Write the cut to a writable file object as fragmented MP4, one
+        fragment every STREAMING_SETTINGS["fragment_seconds"], so it can be
+        sent while it is still being produced.
+        
+        copy mode remuxes packets exactly as process() does; the other modes
+        re-encode the exact frame range in one pass with the requested
+        encoder, since splicing edges or segments needs a finished file.
+        Audio is interleaved as in process().
+        """
+        audio = None
+        try:
+            frame_pts, keyframe_pts = self._scan_packets()
+            end_pts = self._end_pts(frame_pts)
+            # The moov waits for the first fragment (delay_moov) so it can
+            # carry the edit list that trims the audio's leading samples
+            options = {
+                "movflags": "frag_keyframe+empty_moov+delay_moov+default_base_moof",
+                "frag_duration": str(int(STREAMING_SETTINGS["fragment_seconds"] * 1_000_000)),
+                "use_editlist": "1"
+            }
+            
+            if self.mode == "copy":
+                start_pts = self._copy_start_pts(frame_pts, keyframe_pts)
+                audio = self._open_audio(frame_pts.index(start_pts), self.end_frame, exact=False)
+                with av.open(self.video_path) as source, \
+                        av.open(output, "w", format="mp4", options=options) as container:
+                    in_stream = source.streams.video[0]
+                    out_stream = container.add_stream(template=in_stream)
+                    if audio:
+                        audio.attach(container)
+                    self._copy_packets(source, in_stream, container, out_stream, start_pts, end_pts, start_pts, audio)
+                    if audio:
+                        audio.mux_until(None)
+                return
+            
+            start_pts = frame_pts[self.start_frame]
+            audio = self._open_audio(self.start_frame, self.end_frame)
+            self.frames_written = encode_segment(
+                self.video_path, output, start_pts, end_pts, 0,
+                self.fps, (self.frame_width, self.frame_height),
+                self.codec, self.quality, self.preset,
+                container_options=options, audio=audio
+            )
+            
+        except Exception as e:
+            raise Exception(f"Error processing video: {str(e)}")
+        finally:
+            if audio:
+                audio.close()
+    
+    def _copy_start_pts(self, frame_pts: List[int], keyframe_pts: List[int]) -> int:
+        """Timestamp of the keyframe at or before start_frame, where a copy cut begins."""
+        start_pts = frame_pts[min(self.start_frame, len(frame_pts) - 1)]
+        return max(pts for pts in keyframe_pts if pts <= start_pts)
+    
+    def _end_pts(self, frame_pts: List[int]) -> Optional[int]:
+        """Presentation timestamp of end_frame, or None when cutting to the end."""
+        if self.end_frame >= len(frame_pts):
+            return None
+        return frame_pts[self.end_frame]
+    
+    def _copy_packets(self, source, in_stream, output, out_stream,
+                      start_pts: int, end_pts: Optional[int], offset: int,
+                      audio: Optional[AudioTrack] = None, references: bool = True) -> None:
+        """
+        Remux packets with start_pts <= pts < end_pts, shifted back by offset, interleaving the audio.
+        
+        Packets are read in decode order until one decodes at or after
+        end_pts: B-frames shown before end_pts are stored after the later
+        frame they reference. With references, a frame at or after end_pts
+        that such B-frames follow is kept too, so they decode (the output
+        then runs past end_pts by that frame); without, end_pts must start
+        a closed GOP, as the keyframes smart cuts splice at do.
+        """
+        held = []
+        source.seek(start_pts, stream=in_stream, backward=True)
+        for packet in source.demux(in_stream):
+            # The demuxer yields an empty flush packet at EOF
+            if packet.dts is None:
+                continue
+            if end_pts is not None and packet.dts >= end_pts:
+                break
+            if packet.pts < start_pts:
+                continue
+            if end_pts is not None and packet.pts >= end_pts:
+                if references:
+                    held.append(packet)
+                continue
+            for kept in held + [packet]:
+                kept.pts -= offset
+                kept.dts -= offset
+                kept.stream = out_stream
+                output.mux(kept)
+                self._frame_written()
+                if audio:
+                    audio.mux_until(float(kept.pts * in_stream.time_base))
+            held = []
+    
+    def _encode_range(self, source, in_stream, output, out_stream,
+                      start_pts: int, end_pts: Optional[int], offset: int,
+                      audio: Optional[AudioTrack] = None) -> None:
+        """Decode frames with start_pts <= pts < end_pts and re-encode them with the source codec, interleaving the audio."""
+        codec_context = in_stream.codec_context
+        encoder = av.CodecContext.create(codec_context.name, "w")
+        encoder.width = codec_context.width
+        encoder.height = codec_context.height
+        encoder.pix_fmt = codec_context.pix_fmt
+        encoder.bit_rate = codec_context.bit_rate or in_stream.bit_rate or 2_000_000
+        # The encoder writes its time base into the bitstream headers, so it
+        # must match the source's frame rate for the spliced packets to decode.
+        encoder.time_base = Fraction(1, 1) / in_stream.average_rate
+        encoder.framerate = in_stream.average_rate
+        
+        source.seek(start_pts, stream=in_stream, backward=True)
+        frames = source.decode(in_stream)
+        while True:
+            started = time.perf_counter()
+            frame = next(frames, None)
+            self._add_stage_seconds("decode", time.perf_counter() - started)
+            if frame is None:
+                break
+            if frame.pts < start_pts:
+                continue
+            if end_pts is not None and frame.pts >= end_pts:
+                break
+            frame.pts = int(round((frame.pts - offset) * in_stream.time_base / encoder.time_base))
+            frame.time_base = encoder.time_base
+            frame.pict_type = av.video.frame.PictureType.NONE
+            started = time.perf_counter()
+            packets = encoder.encode(frame)
+            self._add_stage_seconds("encode", time.perf_counter() - started)
+            for packet in packets:
+                packet.stream = out_stream
+                output.mux(packet)
+                self._frame_written()
+            if audio:
+                audio.mux_until(float(frame.pts * encoder.time_base))
+        
+        for packet in encoder.encode(None):
+            packet.stream = out_stream
+            output.mux(packet)
+            self._frame_written()
+
+class MultiCutOperation(BaseOperation):
+    """
+    Cut several clips from one source in a single decode pass.
+    
+    The clip ranges are sorted and merged into spans, each span is decoded
+    once, and every decoded frame is written to each clip containing it, so
+    overlapping clips share their frames. Each clip is encoded exactly as a
+    "reencode" CutOperation of the same range would encode it.
+    """
+    
+    def __init__(self, video_path: str, cuts: List[Dict[str, float]],
+                 frame_index: Optional[FrameIndex] = None, audio: bool = True, **encoding):
+        """
+        Args:
+            video_path: Local path of the source video
+            cuts: Clip ranges, each {"start_time": ..., "end_time": ...} in seconds
+            frame_index: Packet index of the source, if already known
+            audio: Whether clips carry the source's audio
+            encoding: codec, quality and preset, as for BaseOperation
+        """
+        super().__init__(video_path, frame_index, **encoding)
+        self.audio = audio
+        
+        if not cuts:
+            raise ValueError("At least one cut is required")
+        
+        self.clips: List[Tuple[int, int]] = []
+        for cut in cuts:
+            if cut["start_time"] >= cut["end_time"]:
+                raise ValueError("Start time must be less than end time")
+            start_frame = self._time_to_frame(cut["start_time"])
+            end_frame = self._time_to_frame(cut["end_time"])
+            if start_frame >= self.total_frames:
+                raise ValueError("Start time is beyond video duration")
+            if end_frame > self.total_frames:
+                raise ValueError("End time is beyond video duration")
+            if end_frame <= start_frame:
+                raise ValueError("Cut is shorter than one frame")
+            self.clips.append((start_frame, end_frame))
+        
+        # Frames written to each clip, in the order the cuts were given
+        self.clip_frames = [0] * len(self.clips)
+        self.expected_frames = sum(end - start for start, end in self.clips)
+    
+    def spans(self) -> List[Tuple[int, int]]:
+        """
+        Source ranges to decode, in order. A clip joins the previous span when
+        it overlaps it, or when its keyframe is inside it, since decoding on
+        through the gap costs no more than seeking.
+        """
+        spans: List[List[int]] = []
+        for start, end in sorted(self.clips):
+            if spans and self.frame_index.keyframe_before(start) <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end])
+        return [(start, end) for start, end in spans]
+    
+    def process(self) -> List[str]:
+        """Write every clip and return their output paths, in the order the cuts were given."""
+        fan_out = _ClipFanOut(self)
+        try:
+            cap = IndexedCapture(self.video_path, self.frame_index)
+            try:
+                for start, end in self.spans():
+                    fan_out.begin_span(start, end)
+                    pipeline = FramePipeline(
+                        cap,
+                        fan_out,
+                        start,
+                        end,
+                        frame_shape=(self.frame_height, self.frame_width, 3),
+                        output_indices=fan_out.output_indices
+                    )
+                    try:
+                        pipeline.run()
+                    finally:
+                        self._add_pipeline_seconds(pipeline)
+            finally:
+                cap.release()
+                fan_out.release()
+            return fan_out.output_paths
+            
+        except Exception as e:
+            for path in fan_out.output_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise Exception(f"Error processing video: {str(e)}")
+
+class _ClipFanOut:
+    """
+    Writer for FramePipeline that passes each source frame to every clip
+    containing it. A clip's VideoWriter opens on its first frame and closes
+    after its last, so only clips that overlap the current frame are open.
+    """
+    
+    def __init__(self, operation: MultiCutOperation):
+        self.operation = operation
+        self.output_paths = [operation._get_output_path("cut") for _ in operation.clips]
+        self._writers: Dict[int, VideoEncoder] = {}
+        self._sources = iter(())
+    
+    def begin_span(self, start: int, end: int) -> None:
+        """Set the source frames the next pipeline run will write, in order."""
+        self._sources = (index for index in range(start, end) if self._covered(index))
+    
+    def output_indices(self, index: int) -> List[int]:
+        """Decode frames some clip needs; skip the gaps between clips in a span."""
+        return [index] if self._covered(index) else []
+    
+    def write(self, frame: np.ndarray) -> None:
+        index = next(self._sources)
+        for clip, (start, end) in enumerate(self.operation.clips):
+            if not start <= index < end:
+                continue
+            writer = self._writers.get(clip)
+            if writer is None:
+                writer = self._writers[clip] = self.operation._create_video_writer(
+                    self.output_paths[clip], audio=self.operation._open_audio(start, end)
+                )
+            writer.write(frame)
+            self.operation.clip_frames[clip] += 1
+            self.operation._frame_written()
+            if index == end - 1:
+                self._writers.pop(clip).release()
+    
+    def release(self) -> None:
+        for writer in self._writers.values():
+            writer.release()
+        self._writers.clear()
+    
+    def _covered(self, index: int) -> bool:
+        return any(start <= index < end for start, end in self.operation.clips)
+
+class FrameStage(ABC):
+    """
+    A frame-level step of a PipelineOperation.
+    
+    A stage is two independent pieces: a mapping from each input frame
+    index to the output indices it produces (timeline stages such as cut
+    and speed), and a per-frame transform (resize, crop, rotate). Timeline
+    stages only select or repeat frames, so they commute with per-frame
+    transforms, which lets the pipeline drop frames before decoding them
+    to BGR and run transforms on worker threads.
+    """
+    
+    def bind(self, width: int, height: int, frame_count: int, fps: float) -> Tuple[int, int, int]:
+        """
+        Validate the stage against its input and return the output
+        (width, height, frame_count). Per-frame stages keep the count.
+        """
+        return width, height, frame_count
+    
+    def source_range(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a range of output frame indices to the input range it needs."""
+        return start, end
+    
+    def output_indices(self, index: int) -> List[int]:
+        """Output frame indices produced by input frame index (empty to drop it)."""
+        return [index]
+    
+    def transform(self, frame: np.ndarray) -> np.ndarray:
+        return frame
+    
+    @property
+    def is_per_frame(self) -> bool:
+        """Whether the stage changes frame content (as opposed to the timeline)."""
+        return type(self).transform is not FrameStage.transform
+    
+    @classmethod
+    def canonical_params(cls, params: Dict[str, Any], fps: float) -> Dict[str, Any]:
+        """See BaseOperation.canonical_params."""
+        return _round_floats(params)
+
+class CutStage(FrameStage):
+    """Keep only the frames between start_time and end_time."""
+    
+    def __init__(self, start_time: float, end_time: float):
+        if start_time < 0:
+            raise ValueError("Start time must be non-negative")
+        if start_time >= end_time:
+            raise ValueError("Start time must be less than end time")
+        self.start_time = start_time
+        self.end_time = end_time
+    
+    def bind(self, width, height, frame_count, fps):
+        self.start_frame = int(self.start_time * fps)
+        self.end_frame = int(self.end_time * fps)
+        if self.start_frame >= frame_count:
+            raise ValueError("Start time is beyond video duration")
+        if self.end_frame > frame_count:
+            raise ValueError("End time is beyond video duration")
+        return width, height, self.end_frame - self.start_frame
+    
+    def source_range(self, start, end):
+        return self.start_frame + start, self.start_frame + end
+    
+    def output_indices(self, index):
+        if self.start_frame <= index < self.end_frame:
+            return [index - self.start_frame]
+        return []
+    
+    @classmethod
+    def canonical_params(cls, params, fps):
+        canonical = super().canonical_params(params, fps)
+        canonical["start_frame"] = int(canonical.pop("start_time") * fps)
+        canonical["end_frame"] = int(canonical.pop("end_time") * fps)
+        return canonical
+
+class ResizeStage(FrameStage):
+    """Scale frames; if only one dimension is given the aspect ratio is kept."""
+    
+    def __init__(self, width: Optional[int] = None, height: Optional[int] = None):
+        if width is None and height is None:
+            raise ValueError("Resize needs a width, a height or both")
+        if (width is not None and width <= 0) or (height is not None and height <= 0):
+            raise ValueError("Resize dimensions must be positive")
+        self.width = width
+        self.height = height
+    
+    def bind(self, width, height, frame_count, fps):
+        self.input_size = (width, height)
+        # Keep derived dimensions even, as most encoders require
+        self.output_size = (
+            self.width or max(2, round(width * self.height / height / 2) * 2),
+            self.height or max(2, round(height * self.width / width / 2) * 2)
+        )
+        return self.output_size[0], self.output_size[1], frame_count
+    
+    def transform(self, frame):
+        downscale = self.output_size[0] * self.output_size[1] < self.input_size[0] * self.input_size[1]
+        interpolation = cv2.INTER_AREA if downscale else cv2.INTER_LINEAR
+        return cv2.resize(frame, self.output_size, interpolation=interpolation)
+
+class CropStage(FrameStage):
+    """Keep a width x height rectangle whose top-left corner is (x, y)."""
+    
+    def __init__(self, x: int, y: int, width: int, height: int):
+        if x < 0 or y < 0 or width <= 0 or height <= 0:
+            raise ValueError("Crop offsets must be non-negative and dimensions positive")
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+    
+    def bind(self, width, height, frame_count, fps):
+        if self.x + self.width > width or self.y + self.height > height:
+            raise ValueError(f"Crop rectangle exceeds the {width}x{height} frame")
+        return self.width, self.height, frame_count
+    
+    def transform(self, frame):
+        # Slicing is a view; the writer needs contiguous memory
+        return np.ascontiguousarray(frame[self.y:self.y + self.height, self.x:self.x + self.width])
+
+class RotateStage(FrameStage):
+    """Rotate frames clockwise by a multiple of 90 degrees."""
+    
+    ROTATIONS = {
+        90: cv2.ROTATE_90_CLOCKWISE,
+        180: cv2.ROTATE_180,
+        270: cv2.ROTATE_90_COUNTERCLOCKWISE
+    }
+    
+    def __init__(self, degrees: int):
+        degrees = int(degrees) % 360
+        if degrees not in self.ROTATIONS and degrees != 0:
+            raise ValueError("Rotation must be a multiple of 90 degrees")
+        self.degrees = degrees
+    
+    def bind(self, width, height, frame_count, fps):
+        if self.degrees in (90, 270):
+            return height, width, frame_count
+        return width, height, frame_count
+    
+    def transform(self, frame):
+        if self.degrees == 0:
+            return frame
+        return cv2.rotate(frame, self.ROTATIONS[self.degrees])
+
+class SpeedStage(FrameStage):
+    """
+    Change playback speed at a constant output frame rate by dropping
+    (factor > 1) or repeating (factor < 1) frames.
+    """
+    
+    def __init__(self, factor: float):
+        if factor <= 0:
+            raise ValueError("Speed factor must be positive")
+        self.factor = factor
+    
+    def bind(self, width, height, frame_count, fps):
+        self.output_frames = math.ceil(frame_count / self.factor)
+        return width, height, self.output_frames
+    
+    def source_range(self, start, end):
+        return int(start * self.factor), int((end - 1) * self.factor) + 1
+    
+    def output_indices(self, index):
+        # Output frame j shows input frame floor(j * factor); start one early
+        # in case ceil() lands past the first match through rounding error
+        indices = []
+        output_index = max(0, math.ceil(index / self.factor) - 1)
+        while output_index < self.output_frames and int(output_index * self.factor) <= index:
+            if int(output_index * self.factor) == index:
+                indices.append(output_index)
+            output_index += 1
+        return indices
+
+class PipelineOperation(BaseOperation):
+    """
+    Run an ordered list of frame-level stages in one streaming pass.
+    
+    The source is decoded once, starting at the first frame any stage needs
+    and stopping after the last, and the result is encoded once. Frames the
+    timeline stages drop are skipped without colour conversion.
+    """
+    
+    stages = {
+        "cut": CutStage,
+        "resize": ResizeStage,
+        "crop": CropStage,
+        "rotate": RotateStage,
+        "speed": SpeedStage
+    }
+    
+    def __init__(self, video_path: str, operations: List[Dict[str, Any]],
+                 frame_index: Optional[FrameIndex] = None, **encoding):
+        super().__init__(video_path, frame_index, **encoding)
+        
+        self.pipeline = self.plan(operations, self.frame_width, self.frame_height, self.total_frames, self.fps)
+        self.output_width, self.output_height, self.expected_frames = self.pipeline["output"]
+        self.start_frame, self.end_frame = self.pipeline["source_range"]
+    
+    @classmethod
+    def plan(cls, operations: List[Dict[str, Any]], width: int, height: int,
+             frame_count: int, fps: float) -> Dict[str, Any]:
+        """
+        Build and validate the stages for a source of the given geometry.
+        
+        Returns:
+            dict with the bound "stages", the "output" (width, height,
+            frame_count) and the "source_range" of frames to decode.
+        """
+        if not operations:
+            raise ValueError("A pipeline needs at least one operation")
+        
+        stages = []
+        for operation in operations:
+            if operation["type"] not in cls.stages:
+                raise ValueError(f"Unsupported pipeline operation: {operation['type']}")
+            try:
+                stage = cls.stages[operation["type"]](**operation.get("params", {}))
+            except TypeError as e:
+                raise ValueError(f"Invalid parameters for {operation['type']}: {str(e)}")
+            width, height, frame_count = stage.bind(width, height, frame_count, fps)
+            stages.append(stage)
+        
+        if frame_count <= 0:
+            raise ValueError("Pipeline produces no frames")
+        
+        # Walk back from the output to find the frames that must be decoded
+        start, end = 0, frame_count
+        for stage in reversed(stages):
+            start, end = stage.source_range(start, end)
+        
+        return {
+            "stages": stages,
+            "output": (width, height, frame_count),
+            "source_range": (start, end)
+        }
+    
+    @classmethod
+    def canonical_params(cls, params: Dict[str, Any], fps: float) -> Dict[str, Any]:
+        canonical = {key: value for key, value in params.items() if key != "operations"}
+        canonical["operations"] = [
+            {
+                "type": operation["type"],
+                "params": cls.stages[operation["type"]].canonical_params(operation.get("params", {}), fps)
+            }
+            for operation in params["operations"]
+        ]
+        return canonical
+    
+    def process(self) -> str:
+        """Decode the needed source range once, run every stage, encode once."""
+        try:
+            output_path = self._get_output_path("pipeline")
+            out = self._create_video_writer(output_path, (self.output_width, self.output_height))
+            
+            per_frame = [stage for stage in self.pipeline["stages"] if stage.is_per_frame]
+            
+            def transform(frame: np.ndarray) -> np.ndarray:
+                for stage in per_frame:
+                    frame = stage.transform(frame)
+                return frame
             
-            # Process frames
-            frame_count = self.start_frame
-            while frame_count < self.end_frame:
-                ret, frame = self.cap.read()
-                if not ret:
-                    break
-                
-                out.write(frame)
-                frame_count += 1
+            self._run_frame_pipeline(
+                out,
+                self.start_frame,
+                self.end_frame,
+                transform=transform if per_frame else None,
+                output_indices=self._output_indices
+            )
             
-            # Clean up
             out.release()
+            return output_path
+            
+        except Exception as e:
+            raise Exception(f"Error processing video: {str(e)}")
+    
+    def _output_indices(self, index: int) -> List[int]:
+        """Compose every stage's index mapping for one source frame."""
+        indices = [index]
+        for stage in self.pipeline["stages"]:
+            indices = [output for i in indices for output in stage.output_indices(i)]
+        return indices
+
+class SingleStageOperation(PipelineOperation):
+    """A standalone operation backed by one pipeline stage."""
+    
+    stage_type: str
+    
+    def __init__(self, video_path: str, frame_index: Optional[FrameIndex] = None,
+                 codec: Optional[str] = None, quality: Optional[str] = None, preset: Optional[str] = None,
+                 **params):
+        super().__init__(video_path, [{"type": self.stage_type, "params": params}], frame_index,
+                         codec=codec, quality=quality, preset=preset)
+    
+    @classmethod
+    def canonical_params(cls, params: Dict[str, Any], fps: float) -> Dict[str, Any]:
+        return cls.stages[cls.stage_type].canonical_params(params, fps)
+
+class ResizeOperation(SingleStageOperation):
+    """Operation for scaling a video (params: width and/or height)."""
+    stage_type = "resize"
+
+class CropOperation(SingleStageOperation):
+    """Operation for cropping a video (params: x, y, width, height)."""
+    stage_type = "crop"
+
+class RotateOperation(SingleStageOperation):
+    """Operation for rotating a video clockwise (params: degrees)."""
+    stage_type = "rotate"
+
+class SpeedOperation(SingleStageOperation):
+    """Operation for changing playback speed (params: factor)."""
+    stage_type = "speed"
+
+class ProxyOperation(PipelineOperation):
+    """
+    Low-resolution preview rendition of a whole video: scaled to a fixed
+    height (never up) with a keyframe every keyframe_interval seconds, so a
+    player can seek anywhere after decoding only a few small frames.
+    """
+    
+    def __init__(self, video_path: str, frame_index: Optional[FrameIndex] = None,
+                 height: Optional[int] = None, keyframe_interval: Optional[float] = None,
+                 codec: Optional[str] = None, quality: Optional[str] = None, preset: Optional[str] = None):
+        self.keyframe_interval = keyframe_interval or PROXY_SETTINGS["keyframe_interval"]
+        super().__init__(
+            video_path,
+            [{"type": "resize", "params": {"height": height or PROXY_SETTINGS["height"]}}],
+            frame_index,
+            codec=codec or PROXY_SETTINGS["codec"],
+            quality=quality or PROXY_SETTINGS["quality"],
+            preset=preset or PROXY_SETTINGS["preset"]
+        )
+    
+    @classmethod
+    def plan(cls, operations, width, height, frame_count, fps):
+        target = operations[0]["params"]["height"]
+        if height <= target:
+            # Small sources keep their size; only the keyframe spacing changes
+            operations = [{"type": "resize", "params": {"width": width - width % 2, "height": height - height % 2}}]
+        return super().plan(operations, width, height, frame_count, fps)
+    
+    @classmethod
+    def canonical_params(cls, params: Dict[str, Any], fps: float) -> Dict[str, Any]:
+        return _round_floats(params)
+    
+    def _create_video_writer(self, output_path: str,
+                             frame_size: Optional[Tuple[int, int]] = None,
+                             audio: Optional[AudioTrack] = None) -> VideoEncoder:
+        return VideoEncoder(
+            output_path,
+            self.fps,
+            frame_size or (self.frame_width, self.frame_height),
+            codec=self.codec,
+            quality=self.quality,
+            preset=self.preset,
+            gop_size=max(1, int(round(self.fps * self.keyframe_interval))),
+            audio=audio
+        )
+
+class HlsOperation(BaseOperation):
+    """
+    Package a video for HLS adaptive streaming (params: renditions,
+    segment_seconds). The source is decoded once and every rendition of the
+    ladder is encoded from the same decoded frames (see HlsWriter).
+    process() returns the package directory rather than a file.
+    """
+    
+    def __init__(self, video_path: str, frame_index: Optional[FrameIndex] = None,
+                 renditions: Optional[List[int]] = None, segment_seconds: Optional[float] = None,
+                 codec: Optional[str] = None, quality: Optional[str] = None, preset: Optional[str] = None):
+        super().__init__(
+            video_path,
+            frame_index,
+            codec=codec or "h264",
+            quality=quality or HLS_SETTINGS["quality"],
+            preset=preset or HLS_SETTINGS["preset"]
+        )
+        if self.codec != "h264":
+            raise ValueError("HLS renditions are encoded with h264")
+        self.segment_seconds = segment_seconds or HLS_SETTINGS["segment_seconds"]
+        self.sizes = rendition_sizes(self.frame_width, self.frame_height, renditions or HLS_SETTINGS["renditions"])
+    
+    @classmethod
+    def canonical_params(cls, params: Dict[str, Any], fps: float) -> Dict[str, Any]:
+        canonical = _round_floats(params)
+        canonical["renditions"] = sorted(set(params.get("renditions") or []), reverse=True)
+        return canonical
+    
+    def process(self) -> str:
+        """Write the package (master playlist, and a media playlist and segments per rendition) to a new directory."""
+        output_dir = tempfile.mkdtemp(prefix="hls_")
+        try:
+            writer = HlsWriter(
+                output_dir,
+                self.fps,
+                self.sizes,
+                self.segment_seconds,
+                self.quality,
+                self.preset,
+                HLS_SETTINGS["bits_per_pixel"]
+            )
+            self._run_frame_pipeline(writer, 0, self.total_frames)
+            writer.release()
+            return output_dir
             
+        except Exception as e:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            raise Exception(f"Error processing video: {str(e)}")
+
+class AudioExtractOperation(BaseOperation):
+    """
+    Extract the audio track, or the [start_time, end_time) range of it, to
+    an M4A file (params: start_time, end_time).
+    
+    Only audio packets are read: the video stream is never opened or
+    decoded, and the audio is stream-copied whenever AudioTrack allows.
+    """
+    
+    def __init__(self, video_path: str, start_time: float = 0.0, end_time: Optional[float] = None,
+                 frame_index: Optional[FrameIndex] = None, **encoding):
+        # BaseOperation.__init__ is skipped on purpose: it opens the video stream
+        self.video_path = video_path
+        self.frame_index = frame_index
+        info = probe_video(video_path)
+        if not info["audio_streams"]:
+            raise ValueError("Video has no audio track")
+        if end_time is not None and start_time >= end_time:
+            raise ValueError("Start time must be less than end time")
+        if start_time >= info["duration"]:
+            raise ValueError("Start time is beyond video duration")
+        
+        self.start_time = start_time
+        self.end_time = end_time
+        self.duration = info["duration"]
+        # Progress counts audio packets, whose number is not known up front
+        self._init_bookkeeping(None)
+    
+    @classmethod
+    def canonical_params(cls, params: Dict[str, Any], fps: float) -> Dict[str, Any]:
+        canonical = _round_floats(params)
+        canonical.setdefault("start_time", 0.0)
+        canonical.setdefault("end_time", None)
+        canonical["audio_settings"] = dict(AUDIO_SETTINGS)
+        return canonical
+    
+    def process(self) -> str:
+        """Write the audio range to a new M4A file."""
+        output_path = f"/tmp/audio_{os.urandom(4).hex()}.m4a"
+        track = None
+        try:
+            # Times count from the start of the container, which need not be 0
+            with av.open(self.video_path) as container:
+                offset = container.start_time / av.time_base if container.start_time else 0.0
+            end = None if self.end_time is None else self.end_time + offset
+            track = AudioTrack(self.video_path, self.start_time + offset, end, on_packet=self._frame_written)
+            with av.open(output_path, "w", format="mp4") as output:
+                track.attach(output)
+                track.mux_until(None)
             return output_path
             
         except Exception as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
             raise Exception(f"Error processing video: {str(e)}")
+        finally:
+            if track:
+                track.close()
 
 class OperationFactory:
     """Factory class for creating video operations."""
     
+    operations = {
+        "cut": CutOperation,
+        "resize": ResizeOperation,
+        "crop": CropOperation,
+        "rotate": RotateOperation,
+        "speed": SpeedOperation,
+        "pipeline": PipelineOperation,
+        "proxy": ProxyOperation,
+        "hls": HlsOperation,
+        "extract_audio": AudioExtractOperation,
+        # Add more operations here as they are implemented
+    }
+    
+    # Settings that change the encoded output of every operation; requests
+    # may set them, and VIDEO_SETTINGS supplies the rest
+    OUTPUT_SETTINGS = ("output_format", "codec", "quality", "preset")
+    
     @staticmethod
     def create_operation(operation_type: str, video_path: str, **kwargs) -> BaseOperation:
         """Create a video operation instance based on the operation type."""
-        operations = {
-            "cut": CutOperation,
-            # Add more operations here as they are implemented
-        }
+        if operation_type not in OperationFactory.operations:
+            raise ValueError(f"Unsupported operation type: {operation_type}")
         
-        if operation_type not in operations:
+        return OperationFactory.operations[operation_type](video_path, **kwargs)
+    
+    @staticmethod
+    def fingerprint(operation_type: str, video_id: str, params: Dict[str, Any], fps: float) -> str:
+        """
+        Deterministic fingerprint of everything that determines an operation's
+        output: the source video, the operation, its canonicalised parameters
+        and the encoder settings, where they can affect it (see uses_encoder).
+        """
+        if operation_type not in OperationFactory.operations:
             raise ValueError(f"Unsupported operation type: {operation_type}")
         
-        return operations[operation_type](video_path, **kwargs) 
\ No newline at end of file
+        params = dict(params)
+        settings = {key: params.pop(key, None) or VIDEO_SETTINGS[key] for key in OperationFactory.OUTPUT_SETTINGS}
+        if OperationFactory.operations[operation_type].uses_encoder(params):
+            # The resolved encoder options, so retuning QUALITY_PRESETS changes fingerprints too
+            settings["encoder"] = encoder_options(settings["codec"], settings["quality"], settings["preset"])
+        else:
+            for key in ("codec", "quality", "preset"):
+                del settings[key]
+        
+        payload = {
+            "video_id": video_id,
+            "operation_type": operation_type,
+            "params": OperationFactory.operations[operation_type].canonical_params(params, fps),
+            "settings": settings
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode()).hexdigest()